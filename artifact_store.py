@@ -0,0 +1,238 @@
+"""
+Atomic publishing of the generator's output files.
+
+Each output is serialized once, to a temporary file next to its final
+location, and renamed into place, so a reader (the dashboard, a validation
+run) only ever sees the previous complete file or the new complete file.
+
+Outputs come in two names: a dated copy (Vessel_Quarterly_Pivot_2025_20260210.csv)
+kept for history, and an undated alias (Vessel_Quarterly_Pivot_2025.csv) that
+everything else reads. The alias is a hard link to the dated copy, so the data
+is written and stored once. Where hard links are unavailable it falls back to
+a relative symlink, then to a copy. The alias is swapped in with a rename too.
+
+Every published file is recorded in a manifest (.artifact_manifest.json), and
+dated copies older than the retention policy are removed in a single
+directory scan. Only the generator should write these names: the alias and
+the dated copy share their data, so writing one in place changes both. The
+recorded sizes let the next run notice such a change and rebuild.
+
+Once a run's outputs are all in place, a new data version token is written
+to .data_version.json. The dashboard keys its caches on it and polls it, so
+an open page refreshes when a run (e.g. from --watch) finishes.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timedelta
+
+ARTIFACT_MANIFEST = '.artifact_manifest.json'
+ARTIFACT_MANIFEST_VERSION = 1
+
+# Default retention: only the newest dated copy of each output
+DEFAULT_KEEP_VERSIONS = 1
+
+DATE_FORMAT = '%Y%m%d'
+
+DATA_VERSION_FILE = '.data_version.json'
+
+
+def dated_path(base_name, date_str, ext='.csv', directory='.'):
+    return os.path.join(directory, f"{base_name}_{date_str}{ext}")
+
+
+def alias_path(base_name, ext='.csv', directory='.'):
+    return os.path.join(directory, f"{base_name}{ext}")
+
+
+def temp_path(path):
+    """Hidden temporary file in the same directory, so the final rename stays on one filesystem."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+
+def _replace_with_alias(target, alias):
+    """Point alias at target with a hard link, a symlink or a copy, swapped in atomically."""
+    staging = temp_path(alias)
+    for method in ('hardlink', 'symlink', 'copy'):
+        try:
+            if method == 'hardlink':
+                os.link(target, staging)
+            elif method == 'symlink':
+                os.symlink(os.path.relpath(target, os.path.dirname(alias) or '.'), staging)
+            else:
+                shutil.copyfile(target, staging)
+        except (OSError, NotImplementedError):
+            _remove_quietly(staging)
+            continue
+        os.replace(staging, alias)
+        return method
+    raise OSError(f"Could not create {alias}")
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def publish_artifact(written_path, base_name, date_str=None, ext='.csv', directory='.', rows=None):
+    """
+    Move a fully written temporary file into place and return its manifest record.
+
+    With a date_str the file becomes the dated copy and the undated name is
+    re-pointed at it; without one it simply replaces the undated file.
+    """
+    alias = alias_path(base_name, ext, directory)
+    if date_str is None:
+        os.replace(written_path, alias)
+        path, link = alias, None
+    else:
+        path = dated_path(base_name, date_str, ext, directory)
+        os.replace(written_path, path)
+        link = _replace_with_alias(path, alias)
+    record = {
+        'path': os.path.basename(path),
+        'alias': os.path.basename(alias),
+        'link': link,
+        'bytes': os.path.getsize(path),
+        'mtime_ns': os.stat(alias).st_mtime_ns,
+        'written_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    if rows is not None:
+        record['rows'] = int(rows)
+    return record
+
+
+def write_artifact(write_func, base_name, date_str=None, ext='.csv', directory='.', rows=None):
+    """
+    Serialize an output once with write_func(path) into a temporary file and
+    publish it. The temporary file is removed if writing fails.
+    """
+    staging = temp_path(alias_path(base_name, ext, directory))
+    try:
+        write_func(staging)
+    except BaseException:
+        _remove_quietly(staging)
+        raise
+    return publish_artifact(staging, base_name, date_str, ext, directory, rows)
+
+
+def artifact_version(path):
+    """(size, mtime_ns) of a published file, or None if it does not exist yet."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_data_version(source_sha256, directory='.'):
+    """
+    Publish a new data version token, atomically. The token is new on every
+    completed run, even when the source is unchanged (e.g. another period was
+    generated). Returns the token.
+    """
+    token = f"{source_sha256[:16]}-{time.time_ns():x}"
+    path = os.path.join(directory, DATA_VERSION_FILE)
+    staging = temp_path(path)
+    with open(staging, 'w') as f:
+        json.dump({'token': token, 'source_sha256': source_sha256,
+                   'generated_at': datetime.now().isoformat(timespec='seconds')}, f)
+    os.replace(staging, path)
+    return token
+
+
+def read_data_version(directory='.'):
+    """Token of the last completed generator run, or None if there has not been one."""
+    try:
+        with open(os.path.join(directory, DATA_VERSION_FILE)) as f:
+            return json.load(f)['token']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_artifact_manifest(directory='.'):
+    try:
+        with open(os.path.join(directory, ARTIFACT_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': ARTIFACT_MANIFEST_VERSION, 'artifacts': {}}
+    if manifest.get('version') != ARTIFACT_MANIFEST_VERSION:
+        return {'version': ARTIFACT_MANIFEST_VERSION, 'artifacts': {}}
+    return manifest
+
+
+def record_artifacts(records, directory='.'):
+    """Add published records to the manifest (keyed by undated name) and save it atomically."""
+    manifest = load_artifact_manifest(directory)
+    for record in records:
+        manifest['artifacts'][record['alias']] = record
+    path = os.path.join(directory, ARTIFACT_MANIFEST)
+    staging = temp_path(path)
+    with open(staging, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(staging, path)
+    return manifest
+
+
+def changed_artifacts(names, directory='.'):
+    """
+    The names (undated, as keyed in the manifest) that are missing, were
+    never recorded, or no longer have the size and modification time
+    recorded when they were published. The alias shares its data with the
+    dated copy, so a program writing the undated name in place rewrites
+    both; the generator then has to rebuild them rather than trust them.
+    """
+    recorded = load_artifact_manifest(directory)['artifacts']
+    changed = []
+    for name in names:
+        record = recorded.get(name)
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            changed.append(name)
+            continue
+        # Records written before mtime_ns was recorded are checked by size only
+        if (record is None or stat.st_size != record['bytes']
+                or stat.st_mtime_ns != record.get('mtime_ns', stat.st_mtime_ns)):
+            changed.append(name)
+    return changed
+
+
+def apply_retention(base_names, keep_versions=DEFAULT_KEEP_VERSIONS, keep_days=None,
+                    ext='.csv', directory='.', today=None):
+    """
+    Remove dated copies of the given outputs that fall outside the retention policy.
+
+    For each base name the newest keep_versions dated copies are kept, plus
+    every copy from the last keep_days days when keep_days is set. The
+    directory is listed once for all outputs. Returns the removed file names.
+    """
+    pattern = re.compile(rf"^({'|'.join(re.escape(name) for name in base_names)})_(\d{{8}}){re.escape(ext)}$")
+    dated = {name: [] for name in base_names}
+    for filename in os.listdir(directory):
+        match = pattern.match(filename)
+        if match:
+            dated[match.group(1)].append((match.group(2), filename))
+
+    cutoff = None
+    if keep_days is not None:
+        cutoff = ((today or datetime.now()) - timedelta(days=keep_days)).strftime(DATE_FORMAT)
+
+    removed = []
+    for name, copies in dated.items():
+        copies.sort(reverse=True)
+        for rank, (date_str, filename) in enumerate(copies):
+            if rank < keep_versions or (cutoff is not None and date_str > cutoff):
+                continue
+            try:
+                os.remove(os.path.join(directory, filename))
+                removed.append(filename)
+            except OSError as e:
+                print(f"  Warning: Could not remove {filename}: {e}")
+    return removed
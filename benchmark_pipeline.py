@@ -0,0 +1,882 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the CSV generator and dashboard data preparation.
+
+Commands:
+    speedup   Compare the original row-by-row quarterly loops (kept here, with
+              the helpers they call, as a reference implementation) against
+              the vectorized interval engine, and check that both produce the
+              same pivot and breakdown.
+    generate  Write a synthetic fleet CSV with the same schema as
+              "Streamer Projects - SWG - AI.csv" (BOM header, M/D/YYYY dates,
+              $-formatted money, overlapping projects and missing dates).
+    suite     Generate synthetic fleets from 10 vessels up to 5k vessels and
+              1M projects, time every pipeline stage, record peak memory and
+              save the results as JSON so runs can be compared.
+
+Usage:
+    python benchmark_pipeline.py speedup [--projects 500 2000 10000] [--vessels 50]
+    python benchmark_pipeline.py generate --vessels 100 --projects 5000 --output fleet.csv
+    python benchmark_pipeline.py suite [--sizes xs s m] [--output results.json] [--compare old.json]
+
+Running without a command is the same as `speedup`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from generate_csv_files import compute_period_overlaps, build_vessel_pivot, build_period_breakdown
+from interval_engine import to_day_numbers, expand_period_overlaps, merged_days_by_group
+from interval_index import build_interval_index, stab, overlapping
+from source_schema import DATE_COLUMNS, read_source, apply_schema
+from period_calendar import PERIOD_KINDS, build_periods, period_bounds_as_dates
+from dashboard_data import (
+    VESSEL_ORDER, vessel_display_names, utilization_table,
+    build_vessel_index, gantt_tasks, utilization_from_index,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Column order of "Streamer Projects - SWG - AI.csv"
+SOURCE_COLUMNS = [
+    'Survey Name', ' ', 'TGS Revenue ', 'TGS Cost', 'SWG Win Rate', 'SWG Cost', 'TGS Duration',
+    'Day Rate', 'Activity', 'Company', 'Survey Company', 'Vessel', 'Client', 'Country', 'Complete',
+    'Mobilisation Location', 'Mobilisation Start', 'Deployment Start', 'Production Start',
+    'Production End', 'Retrieval End', 'Demobilisation End',
+]
+
+# Named fleet sizes for the suite: (vessels, projects)
+SIZE_PRESETS = {
+    'xs': (10, 100),
+    's': (50, 2000),
+    'm': (250, 20000),
+    'l': (1000, 200000),
+    'xl': (5000, 1000000),
+}
+
+# Vocabulary for synthetic rows, modelled on the real source file
+SURVEY_TYPES = ['2D', '3D', '4D', 'OBN']
+ACTIVITIES = ['Source', 'Node Handling', 'Node Layout', 'Node Layout / Source']
+CLIENTS = ['TotalEnergies', 'Petronas', 'ONGC', 'Equinor', 'Shell', 'bp',
+           'Searcher Seismic', 'TGS / Shearwater Multi-Client', 'Multi-Client']
+COUNTRIES = ['India', 'Angola', 'Suriname', 'Norway', 'Brazil', 'Malaysia', 'Egypt', 'Namibia']
+PORTS = ['Kakinada', 'Luanda', 'Paramaribo', 'Bergen', 'Rio de Janeiro', 'Labuan', 'Alexandria', 'Walvis Bay']
+
+
+def make_synthetic_projects(n_projects, n_vessels, year=2025, seed=0):
+    """Create a random project frame with the columns used by the aggregations."""
+    rng = np.random.default_rng(seed)
+    year_start = pd.Timestamp(year=year, month=1, day=1)
+    offsets = rng.integers(-120, 365, n_projects)
+    durations = rng.integers(5, 150, n_projects)
+    starts = year_start + pd.to_timedelta(offsets, unit='D')
+    ends = starts + pd.to_timedelta(durations, unit='D')
+    rates = np.where(rng.random(n_projects) < 0.3,
+                     [f"${r:,}" for r in rng.integers(20000, 500000, n_projects)], '')
+    return pd.DataFrame({
+        'Survey Name': [f'Survey {i}' for i in range(n_projects)],
+        'Activity': rng.choice(['Source', 'Node Handling', None], n_projects),
+        'Vessel': [f'Vessel {v:04d}' for v in rng.integers(0, n_vessels, n_projects)],
+        'Day Rate': rates,
+        'Mobilisation Start': starts,
+        'Demobilisation End': ends,
+    })
+
+
+def _format_dates(days, missing):
+    """Format day numbers as M/D/YYYY strings via a lookup table of the distinct days."""
+    first = int(days.min())
+    calendar = pd.date_range(pd.Timestamp(first, unit='D'), periods=int(days.max()) - first + 1, freq='D')
+    labels = np.array([f'{d.month}/{d.day}/{d.year}' for d in calendar], dtype=object)
+    formatted = labels[days - first]
+    formatted[missing] = ''
+    return formatted
+
+
+def _format_money(values, missing, decimals=False):
+    """Format amounts the way the spreadsheet export does, e.g. ' $437,225 '."""
+    pattern = ' ${:,.1f} ' if decimals else ' ${:,.0f} '
+    return np.array(['' if m else pattern.format(v) for v, m in zip(values, missing)], dtype=object)
+
+
+def make_synthetic_fleet(n_vessels, n_projects, start_year=2024, end_year=2026, seed=0):
+    """
+    Create a raw (all-text) frame with the schema of the source CSV.
+
+    Each vessel works a sequence of projects spread over start_year..end_year.
+    Durations are drawn around each vessel's average slot, so neighbouring
+    projects sometimes overlap and sometimes leave idle gaps. About 3% of
+    projects are ongoing (no demobilisation date), a few have missing phase
+    dates, and a handful of rows are blank apart from the name, like the
+    trailing rows of the real export.
+    """
+    rng = np.random.default_rng(seed)
+    vessel_idx = np.sort(rng.integers(0, n_vessels, n_projects))
+    counts = np.bincount(vessel_idx, minlength=n_vessels)
+    rank = np.arange(n_projects) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    # Spread each vessel's projects evenly over the range, with jitter
+    range_start = np.datetime64(f'{start_year}-01-01', 'D').astype(np.int64)
+    range_days = np.datetime64(f'{end_year + 1}-01-01', 'D').astype(np.int64) - range_start
+    slot = range_days / np.maximum(counts[vessel_idx], 1)
+    mob = range_start + (rank * slot + rng.uniform(-0.2, 0.2, n_projects) * slot).astype(np.int64)
+    duration = np.maximum(3, slot * rng.uniform(0.5, 1.2, n_projects)).astype(np.int64)
+
+    # Split each project into its five phases (mobilisation, deployment,
+    # production, recovery, demobilisation) and place the four inner dates
+    phases = np.column_stack([
+        rng.uniform(0.03, 0.10, n_projects),
+        rng.uniform(0.01, 0.05, n_projects),
+        rng.uniform(0.60, 0.80, n_projects),
+        rng.uniform(0.01, 0.05, n_projects),
+        rng.uniform(0.02, 0.08, n_projects),
+    ])
+    boundaries = np.cumsum(phases, axis=1)[:, :4] / phases.sum(axis=1)[:, None]
+    inner = mob[:, None] + (duration[:, None] * boundaries).astype(np.int64)
+    dates = np.column_stack([mob, inner, mob + duration])
+
+    missing = np.zeros(dates.shape, dtype=bool)
+    missing[:, 5] = rng.random(n_projects) < 0.03          # ongoing projects
+    missing[:, 1] = rng.random(n_projects) < 0.02          # no deployment start recorded
+    missing[:, 4] = rng.random(n_projects) < 0.02          # no retrieval end recorded
+    blank = rng.random(n_projects) < 0.005                 # placeholder rows
+    missing[blank] = True
+
+    survey_type = rng.choice(SURVEY_TYPES, n_projects)
+    country_idx = rng.integers(0, len(COUNTRIES), n_projects)
+    vessels = np.array([f'Vessel {v:04d}' for v in range(n_vessels)], dtype=object)[vessel_idx]
+    day_rate = rng.integers(20000, 500000, n_projects)
+    rate_kind = rng.random(n_projects)
+
+    day_rate_text = _format_money(day_rate, rate_kind < 0.3)
+    day_rate_text[(rate_kind >= 0.3) & (rate_kind < 0.4)] = '#DIV/0!'
+    revenue = day_rate * duration * rng.uniform(0.9, 1.4, n_projects)
+
+    df = pd.DataFrame({
+        'Survey Name': [f'Block {i} {t}' for i, t in zip(range(n_projects), survey_type)],
+        ' ': np.where(rng.random(n_projects) < 0.1, '', survey_type),
+        'TGS Revenue ': _format_money(revenue, rng.random(n_projects) < 0.6),
+        'TGS Cost': _format_money(revenue * 0.85, rng.random(n_projects) < 0.6),
+        'SWG Win Rate': _format_money(revenue * 0.7, rng.random(n_projects) < 0.8, decimals=True),
+        'SWG Cost': '',
+        'TGS Duration': np.where(rng.random(n_projects) < 0.8, '', duration.astype(str)),
+        'Day Rate': day_rate_text,
+        'Activity': np.where(rng.random(n_projects) < 0.5, '', rng.choice(ACTIVITIES, n_projects)),
+        'Company': 'Shearwater',
+        'Survey Company': 'Shearwater',
+        'Vessel': vessels,
+        'Client': rng.choice(CLIENTS, n_projects),
+        'Country': np.array(COUNTRIES, dtype=object)[country_idx],
+        'Complete': np.where(missing[:, 5], 'In Progress', 'Yes'),
+        'Mobilisation Location': [f'Off {PORTS[c]} -  {COUNTRIES[c].upper()}' for c in country_idx],
+    }, columns=SOURCE_COLUMNS[:16])
+    for i, col in enumerate(DATE_COLUMNS):
+        df[col] = _format_dates(dates[:, i], missing[:, i])
+
+    # Blank rows keep only their name, like the placeholders at the end of the export
+    df.loc[blank, SOURCE_COLUMNS[1:16]] = ''
+    return df[SOURCE_COLUMNS]
+
+
+def write_synthetic_csv(df, path):
+    """Write a synthetic fleet with the UTF-8 BOM the spreadsheet export carries."""
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+# ---------------------------------------------------------------------------
+# Original row-by-row helpers of the generator and dashboard, kept only as the
+# reference the vectorized engine is timed and checked against. The generator
+# and dashboard no longer use them.
+# ---------------------------------------------------------------------------
+
+def merge_date_ranges(date_ranges):
+    """
+    Merge overlapping date ranges and return the total unique days.
+    Prevents double-counting when a vessel works on multiple overlapping projects.
+    """
+    if not date_ranges:
+        return 0
+    
+    # Sort by start date
+    sorted_ranges = sorted(date_ranges, key=lambda x: x[0])
+    
+    # Merge overlapping ranges
+    merged = [sorted_ranges[0]]
+    for current_start, current_end in sorted_ranges[1:]:
+        last_start, last_end = merged[-1]
+        
+        # If current range overlaps with the last range, merge them
+        if current_start <= last_end:
+            merged[-1] = (last_start, max(last_end, current_end))
+        else:
+            # No overlap, add as new range
+            merged.append((current_start, current_end))
+    
+    # Calculate total days across all merged ranges
+    total_days = sum((end - start).days + 1 for start, end in merged)
+    return total_days
+
+
+def calculate_days_in_quarter(start_dt, end_dt, year, quarter):
+    """Calculate how many days a project overlaps with a specific quarter."""
+    qtr_start_month = (quarter - 1) * 3 + 1
+    qtr_start = pd.Timestamp(year=year, month=qtr_start_month, day=1)
+    
+    if quarter == 4:
+        qtr_end = pd.Timestamp(year=year, month=12, day=31)
+    else:
+        next_qtr_start = pd.Timestamp(year=year, month=qtr_start_month + 3, day=1)
+        qtr_end = next_qtr_start - pd.Timedelta(days=1)
+    
+    # Calculate overlap
+    overlap_start = max(start_dt, qtr_start)
+    overlap_end = min(end_dt, qtr_end)
+    
+    if overlap_start > overlap_end:
+        return 0
+    
+    return (overlap_end - overlap_start).days + 1
+
+
+def create_gantt_data(df, range_start, range_end, vessel_order=VESSEL_ORDER):
+    """Create data for Gantt chart with project duration and non-productive time"""
+    tasks = []
+    
+    # Sort by vessel and start date
+    df_sorted = df.sort_values(['Vessel_Display', 'Mobilisation Start'])
+    
+    # Track first start and last end date for each vessel
+    vessel_first_start = {}
+    vessel_last_end = {}
+    
+    for idx, row in df_sorted.iterrows():
+        if pd.isna(row['Mobilisation Start']) or pd.isna(row['Demobilisation End']):
+            continue
+        
+        vessel = row['Vessel_Display']
+        if vessel not in vessel_order:
+            continue
+            
+        # Create legend label (Country + Type of Survey)
+        country = str(row['Country']) if pd.notna(row['Country']) else 'Unknown'
+        survey_type_raw = row['Activity']
+        survey_type = 'Unknown'
+        
+        # Handle survey type - check for NaN/None first, then convert to string
+        if pd.notna(survey_type_raw):
+            survey_type = str(survey_type_raw)
+        
+        # If survey type is still unknown, try to infer from Survey Name
+        if survey_type == 'Unknown':
+            # Try to infer from Survey Name column
+            survey_name = str(row['Survey Name'])
+            if '2D' in survey_name:
+                survey_type = '2D'
+            elif '3D' in survey_name:
+                survey_type = '3D'
+            elif '4D' in survey_name:
+                survey_type = '4D'
+            elif 'OBN' in survey_name:
+                survey_type = 'OBN'
+            else:
+                survey_type = 'Survey'
+        legend = f"{country} {survey_type}"
+        
+        # Get Survey Name for labeling
+        survey_name_label = str(row['Survey Name']) if pd.notna(row['Survey Name']) else ''
+        
+        # Determine project type based on Client column
+        client = str(row['Client']) if pd.notna(row['Client']) else ''
+        # Multi-Client projects include those with "/" in client name (indicating multiple parties)
+        # or "Searcher" or explicitly labeled "Multi-Client"
+        is_multi_client = ('/' in client or 
+                          'Searcher' in client or 
+                          'Multi-Client' in client)
+        
+        if is_multi_client:
+            phase_label = 'MC Project Duration (All Activities)'
+        else:
+            phase_label = 'Proprietary Project Duration (All Activities)'
+        
+        # Track first start date for each vessel
+        if vessel not in vessel_first_start:
+            vessel_first_start[vessel] = row['Mobilisation Start']
+        
+        # Check for gap with previous project (non-productive time)
+        if vessel in vessel_last_end:
+            last_end = vessel_last_end[vessel]
+            current_start = row['Mobilisation Start']
+            # If there's a gap of more than 1 day, add non-productive time
+            if (current_start - last_end).days > 1:
+                tasks.append(dict(
+                    Task=vessel,
+                    Start=last_end,
+                    Finish=current_start,
+                    Resource='Non-Productive Time',
+                    Phase='Non-Productive Time',
+                    SurveyName='',
+                    IsMultiClient=False
+                ))
+        
+        # Single project duration (All Activities) - from Mobilization Start to Demobilization End
+        tasks.append(dict(
+            Task=vessel,
+            Start=row['Mobilisation Start'],
+            Finish=row['Demobilisation End'],
+            Resource=legend,
+            Phase=phase_label,
+            SurveyName=survey_name_label,
+            IsMultiClient=is_multi_client
+        ))
+        
+        # Update last end date for this vessel
+        vessel_last_end[vessel] = row['Demobilisation End']
+    
+    # Add pre-project idle period for vessels whose first project doesn't start at the start of the range
+    for vessel in vessel_order:
+        if vessel in vessel_first_start:
+            first_start = vessel_first_start[vessel]
+            # If first project doesn't start at the start of the range, add non-productive time
+            if first_start > range_start:
+                tasks.append(dict(
+                    Task=vessel,
+                    Start=range_start,
+                    Finish=first_start,
+                    Resource='Non-Productive Time',
+                    Phase='Non-Productive Time',
+                    SurveyName='',
+                    IsMultiClient=False
+                ))
+    
+    # Add non-productive time from last project end to the end of the range for each vessel
+    for vessel in vessel_order:
+        if vessel in vessel_last_end:
+            last_end = vessel_last_end[vessel]
+            if last_end < range_end:
+                tasks.append(dict(
+                    Task=vessel,
+                    Start=last_end,
+                    Finish=range_end,
+                    Resource='Non-Productive Time',
+                    Phase='Non-Productive Time',
+                    SurveyName='',
+                    IsMultiClient=False
+                ))
+    
+    return pd.DataFrame(tasks)
+
+
+def calculate_period_utilization(df, periods, vessel_order=VESSEL_ORDER):
+    """Calculate days in project and idle/transit days per vessel per period"""
+    # Clip every project against every period, then merge overlapping projects
+    # per vessel-period so days are never double-counted
+    starts, start_ok = to_day_numbers(df['Mobilisation Start'])
+    ends, end_ok = to_day_numbers(df['Demobilisation End'])
+    vessel_codes = pd.Categorical(df['Vessel_Display'], categories=vessel_order).codes.astype(np.int64)
+    rows = np.flatnonzero(start_ok & end_ok & (vessel_codes >= 0))
+    
+    row_idx, period_idx, clip_starts, clip_ends, _ = expand_period_overlaps(
+        starts[rows], ends[rows], periods['starts'], periods['ends'])
+    
+    n_periods = len(periods['starts'])
+    groups = vessel_codes[rows][row_idx] * n_periods + period_idx
+    days_in_project = merged_days_by_group(
+        groups, clip_starts, clip_ends, len(vessel_order) * n_periods
+    ).reshape(len(vessel_order), n_periods)
+    
+    return utilization_table(days_in_project, periods, vessel_order)
+
+
+def legacy_vessel_pivot(df_2025):
+    """Original vessel pivot: per-row quarter loop plus a nested vessel x quarter filter."""
+    quarterly_data = []
+    for _, row in df_2025.iterrows():
+        if pd.isna(row['Mobilisation Start']) or pd.isna(row['Demobilisation End']):
+            continue
+        start = row['Mobilisation Start']
+        end = row['Demobilisation End']
+        day_rate_str = str(row.get('Day Rate', '')).replace('$', '').replace(',', '').replace(' ', '').replace('#DIV/0!', '').strip()
+        day_rate = float(day_rate_str) if day_rate_str and day_rate_str != 'nan' else 0
+        for quarter in [1, 2, 3, 4]:
+            days = calculate_days_in_quarter(start, end, 2025, quarter)
+            if days > 0:
+                quarterly_data.append({'Vessel': row['Vessel'], 'Quarter': f'Q{quarter} 2025', 'Days': days,
+                                       'Day Rate': day_rate, 'Revenue': 0, 'Start': start, 'End': end})
+    quarterly_df = pd.DataFrame(quarterly_data)
+
+    vessel_quarters = []
+    for vessel in sorted(quarterly_df['Vessel'].unique()):
+        vessel_data = {'Vessel': vessel}
+        for quarter in [1, 2, 3, 4]:
+            q_data = quarterly_df[(quarterly_df['Vessel'] == vessel) & (quarterly_df['Quarter'] == f'Q{quarter} 2025')]
+            if len(q_data) > 0:
+                qtr_start = pd.Timestamp(year=2025, month=(quarter - 1) * 3 + 1, day=1)
+                qtr_end = qtr_start + pd.offsets.QuarterEnd(0)
+                date_ranges = []
+                for _, row in q_data.iterrows():
+                    overlap_start = max(row['Start'], qtr_start)
+                    overlap_end = min(row['End'], qtr_end)
+                    if overlap_start <= overlap_end:
+                        date_ranges.append((overlap_start, overlap_end))
+                unique_days = merge_date_ranges(date_ranges)
+                total_days = q_data['Days'].sum()
+                avg_day_rate = (q_data['Day Rate'] * q_data['Days']).sum() / total_days if total_days > 0 else 0
+                vessel_data[f'Q{quarter} Days'] = unique_days
+                vessel_data[f'Q{quarter} Avg Day Rate'] = avg_day_rate
+                vessel_data[f'Q{quarter} Total Cost'] = avg_day_rate * unique_days
+                vessel_data[f'Q{quarter} Revenue'] = q_data['Revenue'].sum()
+            else:
+                vessel_data[f'Q{quarter} Days'] = 0
+                vessel_data[f'Q{quarter} Avg Day Rate'] = 0
+                vessel_data[f'Q{quarter} Total Cost'] = 0
+                vessel_data[f'Q{quarter} Revenue'] = 0
+        vessel_quarters.append(vessel_data)
+    return pd.DataFrame(vessel_quarters)
+
+
+def legacy_quarterly_breakdown(df_2025):
+    """Original quarterly breakdown: per-row quarter loop plus proportional allocation per group."""
+    vessel_quarter_projects = {}
+    for _, row in df_2025.iterrows():
+        if pd.isna(row['Mobilisation Start']) or pd.isna(row['Demobilisation End']):
+            continue
+        project_name = str(row['Survey Name']).strip() if pd.notna(row['Survey Name']) else ''
+        for quarter in [1, 2, 3, 4]:
+            if calculate_days_in_quarter(row['Mobilisation Start'], row['Demobilisation End'], 2025, quarter) > 0:
+                qtr_start = pd.Timestamp(year=2025, month=(quarter - 1) * 3 + 1, day=1)
+                qtr_end = qtr_start + pd.offsets.QuarterEnd(0)
+                date_range = (max(row['Mobilisation Start'], qtr_start), min(row['Demobilisation End'], qtr_end))
+                vessel_quarter_projects.setdefault((row['Vessel'], quarter), []).append(
+                    {'project': project_name, 'survey_type': row['Activity'], 'date_range': date_range})
+
+    quarterly_records = []
+    for (vessel, quarter), projects in vessel_quarter_projects.items():
+        unique_days = merge_date_ranges([p['date_range'] for p in projects])
+        project_days = [(p['date_range'][1] - p['date_range'][0]).days + 1 for p in projects]
+        if len(projects) == 1:
+            allocated = [unique_days]
+        else:
+            total_individual_days = sum(project_days)
+            allocated = [round(unique_days * d / total_individual_days) for d in project_days]
+            total_allocated = sum(allocated)
+            if total_allocated != unique_days:
+                allocated[allocated.index(max(allocated))] += unique_days - total_allocated
+        for project_info, duration in zip(projects, allocated):
+            quarterly_records.append({
+                'Project': project_info['project'],
+                'Vessel': vessel,
+                'Survey Type': str(project_info['survey_type']) if pd.notna(project_info['survey_type']) else '',
+                'Quarter': f'Q{quarter}-2025',
+                'Duration': duration,
+            })
+    return pd.DataFrame(quarterly_records).sort_values(['Vessel', 'Quarter']).reset_index(drop=True)
+
+
+def vectorized_outputs(df_2025):
+    """Pivot and breakdown from the interval engine."""
+    periods = build_periods('quarter', 2025)
+    overlaps = compute_period_overlaps(df_2025, periods)
+    return build_vessel_pivot(df_2025, overlaps, periods), build_period_breakdown(df_2025, overlaps, periods)
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+# ---------------------------------------------------------------------------
+# Pipeline stages. Each stage reads and extends a shared state dict, in the
+# same order the generator and dashboard run them. Stages flagged `legacy`
+# are row-by-row Python loops and are skipped above --max-legacy-rows.
+# ---------------------------------------------------------------------------
+
+def stage_load(state):
+    state['df'] = read_source(state['csv_path'])
+
+
+def stage_parse_dates(state):
+    # The whole declared schema: dates, numbers and categorical labels
+    df = state['df']
+    apply_schema(df)
+    ongoing = df['Demobilisation End'].isna() & df['Mobilisation Start'].notna()
+    df.loc[ongoing, 'Demobilisation End'] = pd.Timestamp(year=state['periods']['end_year'], month=12, day=31)
+
+
+def stage_phase_durations(state):
+    df = state['df']
+    df['Mobilization (days)'] = (df['Deployment Start'] - df['Mobilisation Start']).dt.days
+    df['Deployment (days)'] = (df['Production Start'] - df['Deployment Start']).dt.days
+    df['Production (days)'] = (df['Production End'] - df['Production Start']).dt.days
+    df['Recovery (days)'] = (df['Retrieval End'] - df['Production End']).dt.days
+    df['Demobilization (days)'] = (df['Demobilisation End'] - df['Retrieval End']).dt.days
+    df['Project Duration'] = (df['Demobilisation End'] - df['Mobilisation Start']).dt.days
+
+
+def stage_range_filter(state):
+    df = state['df']
+    range_start, range_end = period_bounds_as_dates(state['periods'])
+    in_range = ((df['Mobilisation Start'] < pd.Timestamp(range_end[-1]) + pd.Timedelta(days=1)) &
+                (df['Demobilisation End'] >= pd.Timestamp(range_start[0])))
+    state['df_range'] = df[in_range].copy()
+
+
+def stage_merge_date_ranges(state):
+    df = state['df_range'].dropna(subset=['Mobilisation Start', 'Demobilisation End'])
+    ranges = {}
+    for vessel, start, end in zip(df['Vessel'], df['Mobilisation Start'], df['Demobilisation End']):
+        ranges.setdefault(vessel, []).append((start, end))
+    state['legacy_merged_days'] = {vessel: merge_date_ranges(r) for vessel, r in ranges.items()}
+
+
+def stage_calculate_days_in_quarter(state):
+    df = state['df_range'].dropna(subset=['Mobilisation Start', 'Demobilisation End'])
+    quarters = [(ts.year, (ts.month - 1) // 3 + 1)
+                for ts in pd.DatetimeIndex(period_bounds_as_dates(state['quarters'])[0])]
+    total = 0
+    for start, end in zip(df['Mobilisation Start'], df['Demobilisation End']):
+        for year, quarter in quarters:
+            total += calculate_days_in_quarter(start, end, year, quarter)
+    state['legacy_quarter_days'] = total
+
+
+def stage_period_overlaps(state):
+    state['overlaps'] = compute_period_overlaps(state['df_range'], state['periods'])
+
+
+def stage_vessel_pivot(state):
+    state['pivot'] = build_vessel_pivot(state['df_range'], state['overlaps'], state['periods'])
+
+
+def stage_period_breakdown(state):
+    state['breakdown'] = build_period_breakdown(state['df_range'], state['overlaps'], state['periods'])
+
+
+def stage_breakdown_equal(state):
+    build_period_breakdown(state['df_range'], state['overlaps'], state['periods'], 'equal')
+
+
+def stage_breakdown_first(state):
+    build_period_breakdown(state['df_range'], state['overlaps'], state['periods'], 'first')
+
+
+def stage_vessel_display(state):
+    state['df_range']['Vessel_Display'] = vessel_display_names(state['df_range']['Vessel'])
+    state['vessel_order'] = sorted(state['df_range']['Vessel_Display'].dropna().unique())
+
+
+def stage_create_gantt_data(state):
+    range_start, range_end = period_bounds_as_dates(state['periods'])
+    state['gantt'] = create_gantt_data(state['df_range'], pd.Timestamp(range_start[0]),
+                                       pd.Timestamp(range_end[-1]), state['vessel_order'])
+
+
+def stage_period_utilization(state):
+    state['utilization'] = calculate_period_utilization(state['df_range'], state['quarters'],
+                                                        state['vessel_order'])
+
+
+def stage_vessel_index(state):
+    state['vessel_index'] = build_vessel_index(state['df'], state['vessel_order'])
+
+
+def stage_gantt_tasks(state):
+    range_start, range_end = period_bounds_as_dates(state['periods'])
+    state['gantt_tasks'] = gantt_tasks(state['vessel_index'], pd.Timestamp(range_start[0]),
+                                       pd.Timestamp(range_end[-1]))
+
+
+def stage_utilization_from_index(state):
+    state['index_utilization'] = utilization_from_index(state['vessel_index'], state['quarters'])
+
+
+def stage_interval_index(state):
+    state['interval_index'] = build_interval_index(state['vessel_index']['start'], state['vessel_index']['end'])
+
+
+def stage_active_queries(state):
+    """1,000 single-day and 1,000 30-day window queries spread over the reporting range"""
+    periods = state['periods']
+    days = np.linspace(periods['starts'][0], periods['ends'][-1], 1000).astype(np.int64)
+    for day in days:
+        stab(state['interval_index'], day)
+        overlapping(state['interval_index'], day, day + 29)
+
+
+# (name, function, legacy)
+PIPELINE_STAGES = [
+    ('load_csv', stage_load, False),
+    ('parse_dates', stage_parse_dates, False),
+    ('phase_durations', stage_phase_durations, False),
+    ('range_filter', stage_range_filter, False),
+    ('merge_date_ranges', stage_merge_date_ranges, True),
+    ('calculate_days_in_quarter', stage_calculate_days_in_quarter, True),
+    ('period_overlaps', stage_period_overlaps, False),
+    ('vessel_pivot', stage_vessel_pivot, False),
+    ('period_breakdown', stage_period_breakdown, False),
+    ('breakdown_equal', stage_breakdown_equal, False),
+    ('breakdown_first', stage_breakdown_first, False),
+    ('vessel_display', stage_vessel_display, False),
+    ('create_gantt_data', stage_create_gantt_data, True),
+    ('period_utilization', stage_period_utilization, False),
+    ('vessel_index', stage_vessel_index, False),
+    ('gantt_tasks', stage_gantt_tasks, False),
+    ('utilization_from_index', stage_utilization_from_index, False),
+    ('interval_index', stage_interval_index, False),
+    ('active_queries', stage_active_queries, False),
+]
+
+
+def run_stages(csv_path, periods, quarters, n_rows, max_legacy_rows, trace_memory=False):
+    """
+    Run every pipeline stage once on a synthetic CSV.
+
+    Returns {stage: {'seconds': ...}} (plus 'peak_bytes' when trace_memory is
+    set, measured with tracemalloc and reset before each stage), or
+    {'skipped': reason} for legacy stages above the row cap.
+    """
+    state = {'csv_path': csv_path, 'periods': periods, 'quarters': quarters}
+    results = {}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for name, func, legacy in PIPELINE_STAGES:
+            if legacy and n_rows > max_legacy_rows:
+                results[name] = {'skipped': f'more than {max_legacy_rows} rows'}
+                continue
+            if trace_memory:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            _, seconds = time_call(func, state)
+            results[name] = {'seconds': seconds}
+            if trace_memory:
+                results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    results['_rows_in_range'] = len(state['df_range'])
+    return results
+
+
+def benchmark_size(label, n_vessels, n_projects, args, work_dir):
+    """Generate one fleet, time its stages (best of --repeat) and measure memory."""
+    periods = build_periods(args.period, args.from_year, args.to_year)
+    quarters = build_periods('quarter', args.from_year, args.to_year)
+
+    fleet, generate_seconds = time_call(
+        make_synthetic_fleet, n_vessels, n_projects, args.from_year, periods['end_year'], args.seed)
+    csv_path = os.path.join(work_dir, f'synthetic_fleet_{label}.csv')
+    write_synthetic_csv(fleet, csv_path)
+    del fleet
+
+    runs = [run_stages(csv_path, periods, quarters, n_projects, args.max_legacy_rows)
+            for _ in range(args.repeat)]
+    stages = {}
+    for name, _, _ in PIPELINE_STAGES:
+        if 'skipped' in runs[0][name]:
+            stages[name] = runs[0][name]
+        else:
+            stages[name] = {'seconds': min(run[name]['seconds'] for run in runs)}
+
+    if not args.no_memory:
+        traced = run_stages(csv_path, periods, quarters, n_projects, args.max_legacy_rows, trace_memory=True)
+        for name, _, _ in PIPELINE_STAGES:
+            if 'peak_bytes' in traced[name]:
+                stages[name]['peak_bytes'] = traced[name]['peak_bytes']
+
+    return {
+        'size': label,
+        'vessels': n_vessels,
+        'projects': n_projects,
+        'rows_in_range': runs[0]['_rows_in_range'],
+        'csv_bytes': os.path.getsize(csv_path),
+        'generate_seconds': generate_seconds,
+        'stages': stages,
+        'max_rss_bytes': max_rss_bytes(),
+    }
+
+
+def max_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def format_bytes(n):
+    if n is None:
+        return '-'
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n) < 1024 or unit == 'GB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+
+
+def print_size_report(result):
+    print(f"\n{result['size']}: {result['vessels']} vessels, {result['projects']} projects "
+          f"({result['rows_in_range']} in range, CSV {format_bytes(result['csv_bytes'])})")
+    print(f"  {'Stage':<28} {'Time (s)':>10} {'Peak memory':>12}")
+    for name, stage in result['stages'].items():
+        if 'skipped' in stage:
+            print(f"  {name:<28} {'skipped':>10}   ({stage['skipped']})")
+        else:
+            print(f"  {name:<28} {stage['seconds']:>10.4f} {format_bytes(stage.get('peak_bytes')):>12}")
+    print(f"  Process peak RSS: {format_bytes(result['max_rss_bytes'])}")
+
+
+def print_comparison(previous, current):
+    """Print per-stage time ratios (current / previous) for fleet sizes present in both runs."""
+    previous_runs = {(r['vessels'], r['projects']): r for r in previous['results']}
+    print(f"\nComparison with run from {previous['created']} (ratio < 1 is faster):")
+    for result in current['results']:
+        old = previous_runs.get((result['vessels'], result['projects']))
+        if old is None:
+            print(f"  {result['size']}: no matching fleet size in the previous run")
+            continue
+        print(f"  {result['size']} ({result['vessels']} vessels, {result['projects']} projects)")
+        for name, stage in result['stages'].items():
+            old_stage = old['stages'].get(name, {})
+            if 'seconds' in stage and 'seconds' in old_stage and old_stage['seconds'] > 0:
+                ratio = stage['seconds'] / old_stage['seconds']
+                print(f"    {name:<28} {old_stage['seconds']:>10.4f} -> {stage['seconds']:>10.4f}  {ratio:>6.2f}x")
+
+
+def cmd_speedup(args):
+    print(f"{'Projects':>10} {'Legacy (s)':>12} {'Vectorized (s)':>16} {'Speedup':>9}")
+    for n_projects in args.projects:
+        df = make_synthetic_projects(n_projects, args.vessels)
+
+        (legacy_pivot, legacy_breakdown), legacy_time = time_call(
+            lambda d: (legacy_vessel_pivot(d), legacy_quarterly_breakdown(d)), df)
+        (pivot, breakdown), fast_time = time_call(vectorized_outputs, df)
+
+        # The legacy pivot priced days at the day rate and had no revenue, so
+        # only days and day rates are compared
+        compared = [col for col in pivot.columns if not col.endswith((' Total Cost', ' Revenue'))]
+        pd.testing.assert_frame_equal(pivot[compared], legacy_pivot[compared], check_dtype=False)
+        pd.testing.assert_frame_equal(breakdown, legacy_breakdown, check_dtype=False)
+
+        print(f"{n_projects:>10} {legacy_time:>12.3f} {fast_time:>16.4f} {legacy_time / fast_time:>8.0f}x")
+
+
+def cmd_generate(args):
+    to_year = args.from_year if args.to_year is None else args.to_year
+    fleet = make_synthetic_fleet(args.vessels, args.projects, args.from_year, to_year, args.seed)
+    write_synthetic_csv(fleet, args.output)
+    print(f"✓ Created {args.output} with {len(fleet)} projects across {args.vessels} vessels")
+
+
+def cmd_suite(args):
+    sizes = []
+    for label in args.sizes:
+        if label not in SIZE_PRESETS:
+            print(f"ERROR: Unknown size '{label}'. Expected one of {', '.join(SIZE_PRESETS)}")
+            sys.exit(1)
+        sizes.append((label,) + SIZE_PRESETS[label])
+    for n_vessels, n_projects in args.custom or []:
+        sizes.append((f'{n_vessels}x{n_projects}', n_vessels, n_projects))
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'config': {
+            'period': args.period, 'from_year': args.from_year, 'to_year': args.to_year,
+            'seed': args.seed, 'repeat': args.repeat, 'max_legacy_rows': args.max_legacy_rows,
+            'memory': not args.no_memory,
+        },
+        'results': [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.keep_csv or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for label, n_vessels, n_projects in sizes:
+            result = benchmark_size(label, n_vessels, n_projects, args, work_dir)
+            report['results'].append(result)
+            print_size_report(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Saved results to {args.output}")
+    if previous is not None:
+        print_comparison(previous, report)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+
+    speedup = subparsers.add_parser('speedup', help="Legacy loops vs vectorized engine")
+    speedup.add_argument('--projects', type=int, nargs='+', default=[500, 2000, 10000])
+    speedup.add_argument('--vessels', type=int, default=50)
+
+    generate = subparsers.add_parser('generate', help="Write a synthetic fleet CSV")
+    generate.add_argument('--vessels', type=int, default=50)
+    generate.add_argument('--projects', type=int, default=2000)
+    generate.add_argument('--output', default='synthetic_fleet.csv')
+
+    suite = subparsers.add_parser('suite', help="Time every pipeline stage on synthetic fleets")
+    suite.add_argument('--sizes', nargs='+', default=['xs', 's', 'm'],
+                       help=f"Fleet size presets: {', '.join(f'{k}={v[0]}x{v[1]}' for k, v in SIZE_PRESETS.items())}")
+    suite.add_argument('--custom', type=int, nargs=2, action='append', metavar=('VESSELS', 'PROJECTS'),
+                       help="Extra fleet size (repeatable)")
+    suite.add_argument('--period', choices=PERIOD_KINDS, default='quarter', help="Period size for the pivot and breakdown stages")
+    suite.add_argument('--repeat', type=int, default=1, help="Report the best of N timed runs")
+    suite.add_argument('--max-legacy-rows', type=int, default=50000,
+                       help="Skip the row-by-row stages above this many projects (default: 50000)")
+    suite.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    suite.add_argument('--keep-csv', metavar='DIR', help="Keep the generated CSVs in DIR")
+    suite.add_argument('--output', help="Save results as JSON")
+    suite.add_argument('--compare', metavar='JSON', help="Compare against a previous --output file")
+
+    for sub in (generate, suite):
+        sub.add_argument('--from-year', type=int, default=2024)
+        sub.add_argument('--to-year', type=int, default=2026)
+        sub.add_argument('--seed', type=int, default=0)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Keep the original `benchmark_pipeline.py --projects ...` form working
+    if not argv or argv[0] not in subparsers.choices and argv[0] not in ('-h', '--help'):
+        argv = ['speedup'] + argv
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    {'speedup': cmd_speedup, 'generate': cmd_generate, 'suite': cmd_suite}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
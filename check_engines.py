@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Regression checks for the vectorized code behind the generator and dashboard.
+
+Runs on a synthetic fleet with the source file's schema, so it needs no data
+files. Covers edge cases the real source rarely contains:
+    - projects that end before they start, in the interval index queries
+    - a filter selection with no projects, or a date range before every
+      project, in the schedule risk simulation
+
+update_data.sh runs this after regenerating the data files.
+
+Usage:
+    python check_engines.py [--vessels 50] [--projects 2000] [--seed 0]
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from benchmark_pipeline import make_synthetic_fleet
+from source_schema import apply_schema, normalize_header
+from interval_index import build_interval_index, stab, overlapping
+from period_calendar import build_periods
+from dashboard_data import vessel_display_names, build_vessel_index, utilization_from_index
+from schedule_risk import DISTRIBUTIONS, DEFAULT_PHASE_SLIPS, phase_lengths, simulate_utilization
+
+def synthetic_vessel_index(n_vessels, n_projects, seed=0):
+    """(parsed frame, vessel index) of a synthetic fleet, typed as the dashboard types the source"""
+    df = make_synthetic_fleet(n_vessels, n_projects, seed=seed)
+    apply_schema(df)
+    df.columns = normalize_header(df.columns, strip=True)
+    vessel_order = sorted(vessel_display_names(df['Vessel']).dropna().unique())
+    return df, build_vessel_index(df, vessel_order)
+
+def check_active_queries(df, index, seed=0, n_queries=500):
+    """
+    stab and overlapping against a brute-force scan of the projects, with a
+    tenth of the projects reversed (ending before they start)
+    """
+    rng = np.random.default_rng(seed)
+    starts, ends = index['start'].copy(), index['end'].copy()
+    reversed_ids = rng.choice(len(starts), len(starts) // 10, replace=False)
+    ends[reversed_ids] = starts[reversed_ids] - rng.integers(1, 60, len(reversed_ids))
+    interval_index = build_interval_index(starts, ends, leaf_size=8)
+    days = rng.integers(starts.min() - 30, ends.max() + 30, n_queries)
+    widths = rng.integers(0, 90, n_queries)
+    for day, width in zip(days, widths):
+        assert np.array_equal(stab(interval_index, day), np.flatnonzero((starts <= day) & (ends >= day))), \
+            f"stab({day}) differs from a full scan"
+        expected = np.flatnonzero((starts <= day + width) & (ends >= day) & (ends >= starts))
+        assert np.array_equal(overlapping(interval_index, day, day + width), expected), \
+            f"overlapping({day}, {day + width}) differs from a full scan"
+    return f"Active project queries match a full scan ({len(reversed_ids)} reversed projects)"
+
+def check_empty_schedule_risk(df, index, seed=0):
+    """Schedule risk of a selection with no projects, for every slip distribution"""
+    periods = build_periods('quarter', 2025)
+    lengths = phase_lengths(df, index['row'])
+    # Filters that match no project leave an index of empty arrays
+    empty = {key: values[:0] if isinstance(values, np.ndarray) else values for key, values in index.items()}
+    for distribution in DISTRIBUTIONS:
+        risk = simulate_utilization(empty, lengths[:0], periods, 100, distribution, seed=seed)
+        assert risk['baseline'].shape == (len(index['vessel_order']), len(periods['starts'])), \
+            f"{distribution}: one row per vessel and one column per quarter expected"
+        assert not risk['baseline'].any() and risk['mean_slip'] == 0, f"{distribution}: non-zero baseline"
+        assert all(not values.any() for values in risk['percentiles'].values()), f"{distribution}: non-zero percentiles"
+    return "Schedule risk of an empty selection is all zero"
+
+def check_schedule_risk_before_projects(df, index, seed=0):
+    """Schedule risk of a date range that ends before every project starts"""
+    lengths = phase_lengths(df, index['row'])
+    risk = simulate_utilization(index, lengths, build_periods('quarter', 2000), 100, seed=seed)
+    assert not risk['baseline'].any(), "non-zero baseline in 2000"
+    return "Schedule risk of a range before every project is all zero"
+
+def check_schedule_risk_without_slips(df, index, seed=0):
+    """With every phase slip at zero, each simulation is the utilization table"""
+    periods = build_periods('quarter', 2025)
+    lengths = phase_lengths(df, index['row'])
+    utilization = utilization_from_index(index, periods)
+    days = utilization[[col for col in utilization.columns if col.endswith('Days in Project')]].to_numpy()
+    no_slips = {phase: (0.0, 0.0, 0.0) for phase in DEFAULT_PHASE_SLIPS}
+    risk = simulate_utilization(index, lengths, periods, 100, phase_slips=no_slips, seed=seed)
+    assert np.allclose(risk['baseline'], days / periods['days'] * 100), "baseline differs from the utilization table"
+    assert all(np.allclose(values, risk['baseline']) for values in risk['percentiles'].values()), \
+        "percentiles differ from the baseline"
+    return "Schedule risk without slips matches the utilization table"
+
+# Every check takes (df, index, seed) and returns a success message
+CHECKS = [
+    check_active_queries,
+    check_empty_schedule_risk,
+    check_schedule_risk_before_projects,
+    check_schedule_risk_without_slips,
+]
+
+def run_checks(n_vessels=50, n_projects=2000, seed=0):
+    """Run every check, reporting each one. Returns True when all of them pass."""
+    print(f"Checking the vectorized engines on a synthetic fleet ({n_vessels} vessels, {n_projects} projects)...")
+    df, index = synthetic_vessel_index(n_vessels, n_projects, seed)
+    all_passed = True
+    for check in CHECKS:
+        try:
+            print(f"  ✓ {check(df, index, seed)}")
+        except AssertionError as e:
+            print(f"  ❌ {check.__name__}: {e}")
+            all_passed = False
+        except Exception as e:
+            # A crash is a failure too; keep going so the other checks still report
+            print(f"  ❌ {check.__name__} raised {type(e).__name__}: {e}")
+            all_passed = False
+    return all_passed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vessels', type=int, default=50)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    success = run_checks(args.vessels, args.projects, args.seed)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,318 @@
+"""
+Data preparation for the Streamlit dashboard.
+
+Kept separate from streamlit_dashboard.py so the timeline and utilization
+calculations can be imported (e.g. by benchmark_pipeline.py) without
+starting a Streamlit app.
+"""
+
+import numpy as np
+import pandas as pd
+
+from source_schema import load_source
+from interval_engine import (
+    to_day_numbers, day_numbers_to_timestamps, expand_period_overlaps,
+    merge_intervals,
+)
+
+# Filter dimensions offered by the dashboard, in sidebar order
+FILTER_DIMENSIONS = ['Vessel', 'Client', 'Country', 'Survey Type', 'Contract']
+
+# Client label for projects with no client
+NO_CLIENT = '(No client)'
+
+# Define vessel order (11 vessels total, Island Pride as charter)
+VESSEL_ORDER = [
+    'SW Bly',
+    'SW Tasman', 
+    'SW Gallien',
+    'Amazon Warrior',
+    'Oceanic Sirius',
+    'Amazon Conqueror',
+    'Oceanic Vega',
+    'SW Duchess',
+    'SW Thuridur',
+    'Island Pride (Charter)',
+    'SW Empress'
+]
+
+
+def parse_streamer_projects(path):
+    """Parse the source file into a typed frame with clean column names"""
+    # Shared loader: declared dtypes, M/D/YYYY dates and categorical labels,
+    # with whitespace stripped from the column names
+    streamer_df, _ = load_source(path, strip_headers=True)
+    return streamer_df
+
+
+def reporting_years(df):
+    """Years the projects of a parsed source span, and the year the dashboard shows by default (2025 if present)"""
+    data_years = pd.concat([df['Mobilisation Start'], df['Demobilisation End']]).dt.year.dropna()
+    available_years = list(range(int(data_years.min()), int(data_years.max()) + 1)) if len(data_years) else [2025]
+    default_year = 2025 if 2025 in available_years else available_years[-1]
+    return available_years, default_year
+
+
+def vessel_display_names(vessels):
+    """Map Island Pride to Island Pride (Charter)"""
+    return vessels.apply(lambda x: 'Island Pride (Charter)' if x == 'Island Pride' else x)
+
+
+def utilization_table(days_in_project, periods, vessel_order):
+    """Lay out a vessel x period array of busy days as the utilization table"""
+    # Idle/transit days are whatever is left of each period
+    idle_transit_days = periods['days'][None, :] - days_in_project
+    
+    utilization_data = {'Vessel Name': list(vessel_order)}
+    for p, period_name in enumerate(periods['column_labels']):
+        utilization_data[f'{period_name} Days in Project'] = days_in_project[:, p]
+        utilization_data[f'{period_name} Idle/Transit'] = idle_transit_days[:, p]
+    
+    return pd.DataFrame(utilization_data)
+
+
+def timeline_labels(df):
+    """
+    Legend, phase and survey-name labels for every project, as object arrays.
+    Same rules as the original row-by-row create_gantt_data (kept in
+    benchmark_pipeline.py), applied to whole columns at once.
+    """
+    country = df['Country'].astype(str).where(df['Country'].notna(), 'Unknown')
+    
+    # Survey type comes from Activity, or is inferred from the Survey Name
+    survey_name = df['Survey Name'].astype(str)
+    inferred = np.select(
+        [survey_name.str.contains(tag, regex=False) for tag in ('2D', '3D', '4D', 'OBN')],
+        ['2D', '3D', '4D', 'OBN'], default='Survey')
+    survey_type = df['Activity'].astype(str).where(df['Activity'].notna(), inferred)
+    legend = (country + ' ' + survey_type).to_numpy(dtype=object)
+    
+    # Multi-Client projects have "/" (several parties), "Searcher" or "Multi-Client" in the client
+    client = df['Client'].astype(str).where(df['Client'].notna(), '')
+    is_multi_client = (client.str.contains('/', regex=False) |
+                       client.str.contains('Searcher', regex=False) |
+                       client.str.contains('Multi-Client', regex=False)).to_numpy()
+    phase = np.where(is_multi_client,
+                     'MC Project Duration (All Activities)',
+                     'Proprietary Project Duration (All Activities)').astype(object)
+    
+    survey_label = survey_name.where(df['Survey Name'].notna(), '').to_numpy(dtype=object)
+    return legend, phase, survey_label, is_multi_client, survey_type.to_numpy(dtype=object)
+
+
+def build_vessel_index(df, vessel_order=VESSEL_ORDER):
+    """
+    Per-vessel index of projects and merged busy intervals.
+    
+    Projects with both dates and a vessel in vessel_order are stored as flat
+    NumPy arrays sorted by vessel then start date, together with their
+    timeline and filter labels; 'row' maps them back to rows of df. Overlapping projects are merged into disjoint busy runs
+    per vessel ('run_*' arrays), so the timeline's non-productive gaps and
+    the utilization days never double-count. Dates are int64 day numbers.
+    """
+    vessels = vessel_display_names(df['Vessel'])
+    codes = pd.Categorical(vessels, categories=vessel_order).codes.astype(np.int64)
+    starts, start_ok = to_day_numbers(df['Mobilisation Start'])
+    ends, end_ok = to_day_numbers(df['Demobilisation End'])
+    rows = np.flatnonzero(start_ok & end_ok & (codes >= 0))
+    rows = rows[np.lexsort((starts[rows], codes[rows]))]
+    
+    legend, phase, survey_label, is_multi_client, survey_type = timeline_labels(df)
+    country = df['Country'].astype(str).where(df['Country'].notna(), 'Unknown').to_numpy(dtype=object)
+    client = df['Client'].astype(str).where(df['Client'].notna(), NO_CLIENT).to_numpy(dtype=object)
+    run_vessel, run_start, run_end = merge_intervals(codes[rows], starts[rows], ends[rows])
+    return {
+        'vessel_order': list(vessel_order),
+        'row': rows,
+        'vessel': codes[rows],
+        'start': starts[rows],
+        'end': ends[rows],
+        'legend': legend[rows],
+        'phase': phase[rows],
+        'survey_name': survey_label[rows],
+        'is_multi_client': is_multi_client[rows],
+        'survey_type': survey_type[rows],
+        'country': country[rows],
+        'client': client[rows],
+        'run_vessel': run_vessel,
+        'run_start': run_start,
+        'run_end': run_end,
+    }
+
+
+def gantt_tasks(index, range_start, range_end):
+    """
+    Timeline bars for the projects that overlap range_start..range_end, plus
+    non-productive time between a vessel's busy runs (gaps of more than one
+    day) and before/after its first/last run in the range.
+    
+    Returns the columns of the original create_gantt_data plus IndexPosition, the
+    project's position in the index arrays (-1 for non-productive time).
+    """
+    (first_day, last_day), _ = to_day_numbers([range_start, range_end])
+    vessel_names = np.array(index['vessel_order'], dtype=object)
+    
+    in_range = (index['start'] <= last_day) & (index['end'] >= first_day)
+    projects = pd.DataFrame({
+        'IndexPosition': np.flatnonzero(in_range),
+        'Task': vessel_names[index['vessel'][in_range]],
+        'Start': day_numbers_to_timestamps(index['start'][in_range]),
+        'Finish': day_numbers_to_timestamps(index['end'][in_range]),
+        'Resource': index['legend'][in_range],
+        'Phase': index['phase'][in_range],
+        'SurveyName': index['survey_name'][in_range],
+        'IsMultiClient': index['is_multi_client'][in_range],
+    })
+    
+    runs_in_range = (index['run_start'] <= last_day) & (index['run_end'] >= first_day)
+    run_vessel = index['run_vessel'][runs_in_range]
+    run_start = index['run_start'][runs_in_range]
+    run_end = index['run_end'][runs_in_range]
+    
+    # Gaps between consecutive runs of the same vessel
+    same_vessel = run_vessel[1:] == run_vessel[:-1]
+    gap = same_vessel & (run_start[1:] - run_end[:-1] > 1)
+    
+    # Idle time before the first and after the last run of each vessel
+    first_run = np.r_[True, ~same_vessel] if len(run_vessel) else np.array([], dtype=bool)
+    last_run = np.r_[~same_vessel, True] if len(run_vessel) else np.array([], dtype=bool)
+    leading = first_run & (run_start > first_day)
+    trailing = last_run & (run_end < last_day)
+    
+    idle_vessel = np.concatenate([run_vessel[1:][gap], run_vessel[leading], run_vessel[trailing]])
+    idle_start = np.concatenate([run_end[:-1][gap], np.full(leading.sum(), first_day), run_end[trailing]])
+    idle_end = np.concatenate([run_start[1:][gap], run_start[leading], np.full(trailing.sum(), last_day)])
+    idle = pd.DataFrame({
+        'IndexPosition': -1,
+        'Task': vessel_names[idle_vessel],
+        'Start': day_numbers_to_timestamps(idle_start),
+        'Finish': day_numbers_to_timestamps(idle_end),
+        'Resource': 'Non-Productive Time',
+        'Phase': 'Non-Productive Time',
+        'SurveyName': '',
+        'IsMultiClient': False,
+    })
+    return pd.concat([projects, idle], ignore_index=True)
+
+
+def utilization_from_index(index, periods):
+    """Utilization table (days in project and idle/transit per vessel per period) from a vessel index"""
+    # Busy runs are disjoint within a vessel, so clipped run days add up to merged days
+    run_idx, period_idx, _, _, days = expand_period_overlaps(
+        index['run_start'], index['run_end'], periods['starts'], periods['ends'])
+    
+    n_vessels = len(index['vessel_order'])
+    n_periods = len(periods['starts'])
+    days_in_project = np.bincount(
+        index['run_vessel'][run_idx] * n_periods + period_idx, weights=days, minlength=n_vessels * n_periods
+    ).astype(np.int64).reshape(n_vessels, n_periods)
+    return utilization_table(days_in_project, periods, index['vessel_order'])
+
+
+def active_project_table(index, positions):
+    """Table of the index projects at `positions` (e.g. from an interval-index query), in timeline order"""
+    positions = np.asarray(positions, dtype=np.int64)
+    vessel_names = np.array(index['vessel_order'], dtype=object)
+    return pd.DataFrame({
+        'Vessel': vessel_names[index['vessel'][positions]],
+        'Survey Name': index['survey_name'][positions],
+        'Country / Type': index['legend'][positions],
+        'Contract': np.where(index['is_multi_client'][positions], 'Multi-Client', 'Proprietary'),
+        'Start': day_numbers_to_timestamps(index['start'][positions]),
+        'End': day_numbers_to_timestamps(index['end'][positions]),
+    })
+
+
+def build_filter_masks(index):
+    """
+    Bitmask index for the dashboard filters.
+    
+    For every dimension in FILTER_DIMENSIONS and every value it takes, one
+    packed bit array (np.packbits) with a bit per index project. Built once
+    per index, so applying a filter is a few OR/AND operations over n/8
+    bytes instead of string comparisons over every project.
+    """
+    n_projects = len(index['start'])
+    vessel_names = np.array(index['vessel_order'], dtype=object)
+    labels = {
+        'Vessel': vessel_names[index['vessel']],
+        'Client': index['client'],
+        'Country': index['country'],
+        'Survey Type': index['survey_type'],
+        'Contract': np.where(index['is_multi_client'], 'Multi-Client', 'Proprietary').astype(object),
+    }
+    # Byte and bit (in np.packbits order) of every project
+    positions = np.arange(n_projects)
+    byte = positions >> 3
+    bit = (128 >> (positions & 7)).astype(np.uint8)
+    n_bytes = -(-n_projects // 8)
+    masks = {}
+    for dimension in FILTER_DIMENSIONS:
+        codes, values = pd.factorize(labels[dimension], sort=True)
+        # One row of packed bits per value; each project sets its bit in its
+        # value's row (bits within a byte are distinct, so adding them sets them)
+        packed = np.zeros((len(values), n_bytes), dtype=np.uint8)
+        np.add.at(packed, (codes, byte), bit)
+        masks[dimension] = dict(zip(values.tolist(), packed))
+    return {'n_projects': n_projects, 'masks': masks}
+
+
+def select_projects(filter_masks, selections):
+    """
+    Boolean mask over the index projects matching selections, a mapping of
+    dimension to the chosen values. Values within a dimension are OR-ed and
+    dimensions are AND-ed; a dimension with no values does not filter.
+    Returns None when nothing is filtered.
+    """
+    n_bytes = -(-filter_masks['n_projects'] // 8)
+    selected = None
+    for dimension, values in selections.items():
+        if not values:
+            continue
+        masks = filter_masks['masks'][dimension]
+        dimension_bits = np.zeros(n_bytes, dtype=np.uint8)
+        for value in values:
+            if value in masks:
+                dimension_bits |= masks[value]
+        selected = dimension_bits if selected is None else selected & dimension_bits
+    if selected is None:
+        return None
+    return np.unpackbits(selected, count=filter_masks['n_projects']).view(bool)
+
+
+def filter_index(index, selected, vessel_order=None):
+    """
+    Vessel index restricted to the projects where selected is True, with the
+    busy runs re-merged from those projects. With vessel_order (a subset of
+    the index's vessels, in the same relative order) the result only has
+    rows for those vessels.
+    """
+    positions = np.flatnonzero(selected)
+    filtered = {key: values[positions] for key, values in index.items()
+                if key not in ('vessel_order', 'run_vessel', 'run_start', 'run_end')}
+    if vessel_order is None:
+        vessel_order = index['vessel_order']
+    else:
+        # Renumber the vessel codes to positions in the narrower vessel order
+        new_codes = np.full(len(index['vessel_order']), -1, dtype=np.int64)
+        new_codes[[index['vessel_order'].index(vessel) for vessel in vessel_order]] = np.arange(len(vessel_order))
+        filtered['vessel'] = new_codes[filtered['vessel']]
+    filtered['vessel_order'] = list(vessel_order)
+    filtered['run_vessel'], filtered['run_start'], filtered['run_end'] = merge_intervals(
+        filtered['vessel'], filtered['start'], filtered['end'])
+    return filtered
+
+
+def apply_filters(index, filter_masks, filters):
+    """
+    Vessel index for the dashboard filters, a tuple of (dimension, values)
+    pairs; index itself when nothing is filtered. Picking vessels also
+    narrows the vessel order (timeline rows, utilization table) to those vessels.
+    """
+    if not filters:
+        return index
+    selections = dict(filters)
+    vessel_order = None
+    if 'Vessel' in selections:
+        vessel_order = [vessel for vessel in index['vessel_order'] if vessel in selections['Vessel']]
+    return filter_index(index, select_projects(filter_masks, selections), vessel_order)
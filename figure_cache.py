@@ -0,0 +1,187 @@
+"""
+On-disk cache of the dashboard's timeline figure.
+
+Building the Gantt figure (bars, quarter lines and labels, layout) takes
+longer than anything else on the Timeline tab, and st.cache_resource only
+keeps it for the life of the server process. This module stores each
+finished figure as Plotly JSON under .snapshot_cache/figures, keyed by:
+
+- the SHA-256 of the source file, so a restart or a touched but unchanged
+  file still hits, and an edited one never does;
+- the filters, years and active window the figure was drawn for;
+- the SHA-256 of the code the figure depends on (FIGURE_CODE: drawing,
+  bars and merging, quarter bounds, parsing and the active-project
+  lookups), so a code change never serves an old figure.
+
+The dashboard reads a spec from here before building one, and keeps the
+result in its process-wide cache. Run after regenerating the data (update_data.sh
+does this) to have the default view ready before the first visitor:
+
+    python figure_cache.py                     # default years, no filters
+    python figure_cache.py --from-year 2024 --to-year 2025 --per-vessel
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from snapshot_cache import SNAPSHOT_DIR, load_cached_frame, source_fingerprint
+from source_manifest import file_sha256
+from source_schema import SOURCE_FILE
+
+FIGURE_CACHE_DIR = os.path.join(SNAPSHOT_DIR, 'figures')
+
+# Oldest specs are removed beyond this many (each is roughly 20-200 KB)
+MAX_FIGURE_SPECS = 64
+
+# Modules whose code shapes the figure: drawing and bars, quarter bounds and
+# labels, interval merging, source parsing, and the projects a window dims
+FIGURE_CODE = ['timeline_figure.py', 'dashboard_data.py', 'period_calendar.py', 'interval_engine.py',
+               'source_schema.py', 'interval_index.py']
+
+
+def _code_sha256():
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in FIGURE_CODE:
+        digest.update(file_sha256(os.path.join(here, name)).encode())
+    return digest.hexdigest()
+
+
+CODE_SHA256 = _code_sha256()
+
+
+def figure_key(source_sha256, filters, start_year, end_year, window=None):
+    """
+    Cache key of a timeline figure. filters is the dashboard's tuple of
+    (dimension, values) pairs; the order values were picked in does not matter.
+    """
+    params = {
+        'source': source_sha256,
+        'code': CODE_SHA256,
+        'filters': sorted([dimension, sorted(values)] for dimension, values in filters),
+        'years': [start_year, end_year],
+        'window': [str(day) for day in window] if window is not None else None,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _spec_path(key, cache_dir):
+    return os.path.join(cache_dir, f'{key}.json')
+
+
+def load_figure_spec(key, cache_dir=FIGURE_CACHE_DIR):
+    """Plotly JSON stored under key, or None"""
+    path = _spec_path(key, cache_dir)
+    try:
+        with open(path) as f:
+            spec = f.read()
+    except OSError:
+        return None
+    try:
+        # Mark as recently used so pruning drops the specs nobody asks for
+        os.utime(path)
+    except OSError:
+        pass
+    return spec
+
+
+def save_figure_spec(key, spec, cache_dir=FIGURE_CACHE_DIR):
+    """Store a Plotly JSON spec under key, then prune the cache to MAX_FIGURE_SPECS"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _spec_path(key, cache_dir)
+    # Write to a temporary file first so a reader never sees a half-written spec
+    with open(f'{path}.tmp', 'w') as f:
+        f.write(spec)
+    os.replace(f'{path}.tmp', path)
+
+    specs = [entry for entry in os.scandir(cache_dir) if entry.name.endswith('.json')]
+    if len(specs) > MAX_FIGURE_SPECS:
+        specs.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in specs[:len(specs) - MAX_FIGURE_SPECS]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def cached_figure(key, build, cache_dir=FIGURE_CACHE_DIR):
+    """
+    The figure stored under key, or build() stored under it. Returns the
+    figure and 'hit' or 'miss'.
+    """
+    import plotly.io as pio
+
+    spec = load_figure_spec(key, cache_dir)
+    if spec is not None:
+        return pio.from_json(spec), 'hit'
+    figure = build()
+    try:
+        save_figure_spec(key, pio.to_json(figure, validate=False), cache_dir)
+    except OSError:
+        # A read-only deployment still works, it just builds the figure once per process
+        pass
+    return figure, 'miss'
+
+
+def warm_figure_cache(source_path=SOURCE_FILE, years=None, per_vessel=False, cache_dir=FIGURE_CACHE_DIR):
+    """
+    Build and store the timeline figures a visitor sees first: the default
+    years (or years, a (first, last) pair) without filters, and with
+    per_vessel one figure per vessel as well. Also refreshes the parsed-source
+    snapshot. Returns the number of figures built (stored ones are skipped).
+    """
+    from dashboard_data import parse_streamer_projects, reporting_years, build_vessel_index, \
+        build_filter_masks, apply_filters
+    from timeline_figure import build_timeline_figure
+
+    df = load_cached_frame(source_path, parse_streamer_projects)
+    if years is None:
+        _, default_year = reporting_years(df)
+        years = (default_year, default_year)
+    start_year, end_year = years
+    fingerprint = source_fingerprint(source_path)
+    index = build_vessel_index(df)
+
+    filter_sets = [()]
+    if per_vessel:
+        filter_masks = build_filter_masks(index)
+        filter_sets += [(('Vessel', (vessel,)),) for vessel in index['vessel_order']
+                        if vessel in filter_masks['masks']['Vessel']]
+    else:
+        filter_masks = None
+
+    built = 0
+    for filters in filter_sets:
+        key = figure_key(fingerprint, filters, start_year, end_year)
+        if load_figure_spec(key, cache_dir) is not None:
+            continue
+        filtered = apply_filters(index, filter_masks, filters) if filters else index
+        cached_figure(key, lambda: build_timeline_figure(filtered, start_year, end_year), cache_dir)
+        built += 1
+    return built
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the dashboard's timeline figure cache for the current source.")
+    parser.add_argument('--from-year', type=int, help="First year of the range (default: the dashboard's default year)")
+    parser.add_argument('--to-year', type=int, help="Last year of the range (default: --from-year)")
+    parser.add_argument('--per-vessel', action='store_true', help="Also build the figure filtered to each vessel")
+    args = parser.parse_args(argv)
+    if args.to_year is not None and args.from_year is None:
+        parser.error("--to-year needs --from-year")
+    if args.from_year is not None and (args.to_year or args.from_year) < args.from_year:
+        parser.error("--to-year must not be before --from-year")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    years = (args.from_year, args.to_year or args.from_year) if args.from_year is not None else None
+    built = warm_figure_cache(years=years, per_vessel=args.per_vessel)
+    print(f"Timeline figure cache: {built} figure(s) built in {FIGURE_CACHE_DIR}")
+
+
+if __name__ == '__main__':
+    main()
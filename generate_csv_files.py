@@ -12,347 +12,975 @@ import numpy as np
 from datetime import datetime
 import os
 import sys
-import shutil
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def merge_date_ranges(date_ranges):
+from interval_engine import (
+    to_day_numbers, expand_period_overlaps, merge_intervals,
+    merged_days_by_group, allocate_proportional, attribute_days, ATTRIBUTION_POLICIES,
+)
+from period_calendar import PERIOD_KINDS, PERIOD_ADJECTIVES, build_periods, period_bounds_as_dates
+from source_schema import (
+    SOURCE_FILE, read_source, apply_schema, new_coercion_report, format_coercion_report,
+    parse_money, find_column, PHASE_COLUMNS,
+)
+from artifact_store import (
+    DEFAULT_KEEP_VERSIONS, temp_path, alias_path, publish_artifact, write_artifact,
+    record_artifacts, apply_retention, write_data_version, changed_artifacts,
+)
+from review_workbook import workbook_name, write_review_workbook
+from source_ingest import resolve_sources, sources_sha256, read_sources
+from query_index import QUERY_INDEX_NAME, QUERY_INDEX_FILE, new_run_accumulator, fold_projects, write_query_index
+from instrumentation import start_run, finish_run, stage, timed, format_stage_table
+from source_manifest import (
+    manifest_path, file_sha256, row_hashes, vessel_key,
+    build_manifest, build_source_manifest, load_manifest, save_manifest, changed_cells,
+)
+
+def parse_day_rates(series):
     """
-    Merge overlapping date ranges and return the total unique days.
-    Prevents double-counting when a vessel works on multiple overlapping projects.
+    Parse a Day Rate column into floats (see source_schema.parse_money).
+    Empty values, #DIV/0! errors and unparseable cells become 0.
     """
-    if not date_ranges:
-        return 0
-    
-    # Sort by start date
-    sorted_ranges = sorted(date_ranges, key=lambda x: x[0])
-    
-    # Merge overlapping ranges
-    merged = [sorted_ranges[0]]
-    for current_start, current_end in sorted_ranges[1:]:
-        last_start, last_end = merged[-1]
-        
-        # If current range overlaps with the last range, merge them
-        if current_start <= last_end:
-            merged[-1] = (last_start, max(last_end, current_end))
+    return parse_money(series).fillna(0).to_numpy()
+
+def daily_amounts(df, rows):
+    """
+    Cost and revenue per project day of the projects at positional rows of df
+    (which must have both dates).
+
+    A project's recorded total, its TGS Cost (else its SWG Cost) and its TGS
+    Revenue, is spread evenly over its days from mobilisation to
+    demobilisation, so a period gets the share of the days it holds. A
+    project with no recorded cost costs its day rate per day. Missing
+    revenue is 0.
+    """
+    def amounts(name):
+        column = find_column(df, name)
+        if column is None:
+            return np.full(len(rows), np.nan)
+        return parse_money(df[column]).to_numpy()[rows]
+
+    starts, _ = to_day_numbers(df['Mobilisation Start'])
+    ends, _ = to_day_numbers(df['Demobilisation End'])
+    project_days = ends[rows] - starts[rows] + 1
+
+    costs = amounts('TGS Cost')
+    costs = np.where(np.isnan(costs), amounts('SWG Cost'), costs)
+    cost_per_day = np.where(np.isnan(costs), parse_day_rates(df['Day Rate'])[rows], costs / project_days)
+    revenue_per_day = np.nan_to_num(amounts('TGS Revenue')) / project_days
+    return cost_per_day, revenue_per_day
+
+@timed('overlaps')
+def compute_period_overlaps(df, periods):
+    """
+    Clip every project in df against every period of the calendar in one pass.
+
+    Returns a dict of flat arrays with one entry per (project, period) pair that
+    overlaps, ordered by project row then period:
+      row    - positional row index into df
+      period - period index into the calendar
+      start  - overlap start as a day number
+      end    - overlap end as a day number
+      days   - overlap length in days
+    """
+    starts, start_ok = to_day_numbers(df['Mobilisation Start'])
+    ends, end_ok = to_day_numbers(df['Demobilisation End'])
+    rows = np.flatnonzero(start_ok & end_ok)
+
+    row_idx, period_idx, clip_starts, clip_ends, days = expand_period_overlaps(
+        starts[rows], ends[rows], periods['starts'], periods['ends'])
+    return {
+        'row': rows[row_idx],
+        'period': period_idx,
+        'start': clip_starts,
+        'end': clip_ends,
+        'days': days,
+    }
+
+def pivot_columns(periods, period_idx):
+    """Pivot column names for one period."""
+    label = periods['column_labels'][period_idx]
+    return [f'{label} Days', f'{label} Avg Day Rate', f'{label} Total Cost', f'{label} Revenue']
+
+@timed('pivot')
+def build_vessel_pivot(df, overlaps, periods):
+    """
+    Build the wide vessel x period pivot (Days, Avg Day Rate, Total Cost, Revenue).
+
+    Days are merged per vessel-period so overlapping projects are not double-counted.
+    The average day rate is weighted by each project's days in the period, and
+    cost and revenue are each project's daily amount times those days (see daily_amounts).
+    """
+    vessels = df['Vessel'].to_numpy(dtype=object)[overlaps['row']]
+    keep = pd.notna(vessels)
+    vessel_codes, vessel_names = pd.factorize(vessels[keep], sort=True)
+
+    n_periods = len(periods['starts'])
+    n_groups = len(vessel_names) * n_periods
+    groups = vessel_codes * n_periods + overlaps['period'][keep]
+    days = overlaps['days'][keep]
+
+    unique_days = merged_days_by_group(groups, overlaps['start'][keep], overlaps['end'][keep], n_groups)
+
+    # Day-weighted rate sums per vessel-period
+    day_rates = parse_day_rates(df['Day Rate'])[overlaps['row'][keep]]
+    weighted_rates = np.bincount(groups, weights=day_rates * days, minlength=n_groups)
+    total_days = np.bincount(groups, weights=days, minlength=n_groups)
+    cost_per_day, revenue_per_day = daily_amounts(df, overlaps['row'][keep])
+    costs = np.bincount(groups, weights=cost_per_day * days, minlength=n_groups)
+    revenue = np.bincount(groups, weights=revenue_per_day * days, minlength=n_groups)
+    return assemble_vessel_pivot(vessel_names, unique_days, weighted_rates, total_days, costs, revenue, periods)
+
+def assemble_vessel_pivot(vessel_names, unique_days, weighted_rates, total_days, costs, revenue, periods):
+    """
+    Lay out per vessel-period totals (flat arrays indexed vessel * n_periods + period)
+    as the wide pivot table. Cost and revenue are rounded to cents.
+    """
+    n_groups = len(unique_days)
+    avg_day_rates = np.divide(weighted_rates, total_days, out=np.zeros(n_groups), where=total_days > 0)
+    total_costs = np.round(costs, 2)
+    revenue = np.round(revenue, 2)
+
+    n_periods = len(periods['starts'])
+    pivot = {'Vessel': vessel_names}
+    shape = (len(vessel_names), n_periods)
+    for p in range(n_periods):
+        days_col, rate_col, cost_col, revenue_col = pivot_columns(periods, p)
+        pivot[days_col] = unique_days.reshape(shape)[:, p]
+        pivot[rate_col] = avg_day_rates.reshape(shape)[:, p]
+        pivot[cost_col] = total_costs.reshape(shape)[:, p]
+        pivot[revenue_col] = revenue.reshape(shape)[:, p]
+    return pd.DataFrame(pivot)
+
+# How the merged days of a vessel-period are split between overlapping projects:
+#   proportional - in proportion to each project's days, rounded (the historical default)
+#   equal        - each day split equally between the projects active on it
+#   first        - each day goes to the first-mobilised project active on it
+ATTRIBUTION_CHOICES = ['proportional'] + ATTRIBUTION_POLICIES
+
+@timed('breakdown')
+def build_period_breakdown(df, overlaps, periods, attribution='proportional'):
+    """
+    Build the per-project breakdown (Project, Vessel, Survey Type, <period>, Duration).
+
+    When several projects share a vessel-period, the merged (unique) days are
+    distributed according to attribution so the durations never double-count.
+    """
+    rows = overlaps['row']
+    vessels = df['Vessel'].to_numpy(dtype=object)[rows]
+    vessel_codes, vessel_names = pd.factorize(vessels, sort=True, use_na_sentinel=False)
+
+    n_periods = len(periods['starts'])
+    groups = vessel_codes * n_periods + overlaps['period']
+    unique_days = merged_days_by_group(groups, overlaps['start'], overlaps['end'], len(vessel_names) * n_periods)
+
+    projects, survey_types = project_labels(df, rows)
+    return assemble_period_breakdown(groups, vessels, overlaps['period'], overlaps['days'], unique_days,
+                                     projects, survey_types, periods, attribution,
+                                     overlaps['start'], overlaps['end'], mobilisation_days(df, rows))
+
+def mobilisation_days(df, rows):
+    """Mobilisation day numbers of the given rows, which rank projects under the 'first' attribution."""
+    return to_day_numbers(df['Mobilisation Start'])[0][rows]
+
+def allocate_durations(groups, days, unique_days, positions, attribution, starts, ends, priorities):
+    """
+    Split each vessel-period group's merged days across its overlaps.
+
+    'proportional' rounds each overlap's share of the group's days; 'equal' and
+    'first' attribute every calendar day exactly with a sweep line over the
+    clipped overlaps (starts, ends). See interval_engine.attribute_days.
+    """
+    if attribution == 'proportional':
+        return allocate_proportional(groups, days, unique_days, positions)
+    durations = attribute_days(groups, starts, ends, attribution, priorities, positions)
+    # Days shared equally are fractions; the breakdown keeps two decimals
+    return np.round(durations, 2) if attribution == 'equal' else durations
+
+def project_labels(df, rows):
+    """Project names and survey types of the given rows, with blanks for missing values."""
+    names = df['Survey Name']
+    projects = names.astype(str).str.strip().where(names.notna(), '').to_numpy(dtype=object)[rows]
+    activity = df['Activity']
+    survey_types = activity.astype(str).where(activity.notna(), '').to_numpy(dtype=object)[rows]
+    return projects, survey_types
+
+def assemble_period_breakdown(groups, vessels, period_idx, days, unique_days, projects, survey_types, periods,
+                              attribution='proportional', starts=None, ends=None, priorities=None):
+    """
+    Allocate merged days across the project-period overlaps of each vessel-period
+    group and lay them out as the breakdown table.
+
+    Overlaps must be in source row order, which decides tie-breaks. The
+    'equal' and 'first' attributions also need each overlap's clipped starts
+    and ends, and 'first' its project's mobilisation day (priorities).
+    """
+    durations = allocate_durations(groups, days, unique_days, np.arange(len(groups)),
+                                   attribution, starts, ends, priorities)
+    return layout_period_breakdown(groups, vessels, period_idx, durations, projects, survey_types, periods)
+
+def layout_period_breakdown(groups, vessels, period_idx, durations, projects, survey_types, periods):
+    """Lay out allocated durations (in source row order) as the breakdown table."""
+    positions = np.arange(len(groups))
+    period_labels = np.array(periods['breakdown_labels'], dtype=object)
+
+    # Sort by vessel and period for better readability, keeping source order within each
+    order = np.lexsort((positions, groups))
+    return pd.DataFrame({
+        'Project': projects[order],
+        'Vessel': vessels[order],
+        'Survey Type': survey_types[order],
+        periods['breakdown_column']: period_labels[period_idx[order]],
+        'Duration': durations[order],
+    })
+
+def partition_by_vessel(codes, n_vessels, n_parts):
+    """
+    Split overlap positions into at most n_parts partitions of whole vessels
+    with similar numbers of overlaps (largest vessels placed first).
+
+    Positions stay in ascending (source row) order within each partition.
+    """
+    counts = np.bincount(codes, minlength=n_vessels)
+    n_parts = max(1, min(n_parts, np.count_nonzero(counts)))
+    loads = np.zeros(n_parts, dtype=np.int64)
+    part_of_vessel = np.zeros(n_vessels, dtype=np.int64)
+    for vessel in np.argsort(-counts, kind='stable'):
+        part = int(np.argmin(loads))
+        part_of_vessel[vessel] = part
+        loads[part] += counts[vessel]
+
+    row_parts = part_of_vessel[codes]
+    order = np.argsort(row_parts, kind='stable')
+    bounds = np.cumsum(np.bincount(row_parts, minlength=n_parts))[:-1]
+    return [part for part in np.split(order, bounds) if len(part)]
+
+def aggregate_vessel_partition(groups, positions, starts, ends, days, day_rates, cost_per_day, revenue_per_day,
+                               priorities, attribution):
+    """
+    Per-vessel work for one partition, run in a worker process.
+
+    Takes the overlaps of whole vessels as plain arrays and returns
+    (group_ids, unique_days, weighted_rates, total_days, costs, revenue,
+    durations), where all but durations are per vessel-period group and
+    durations is per overlap.
+    """
+    group_ids, local_groups = np.unique(groups, return_inverse=True)
+    n_groups = len(group_ids)
+    unique_days = merged_days_by_group(local_groups, starts, ends, n_groups)
+    weighted_rates = np.bincount(local_groups, weights=day_rates * days, minlength=n_groups)
+    total_days = np.bincount(local_groups, weights=days, minlength=n_groups)
+    costs = np.bincount(local_groups, weights=cost_per_day * days, minlength=n_groups)
+    revenue = np.bincount(local_groups, weights=revenue_per_day * days, minlength=n_groups)
+    durations = allocate_durations(local_groups, days, unique_days, positions,
+                                   attribution, starts, ends, priorities)
+    return group_ids, unique_days, weighted_rates, total_days, costs, revenue, durations
+
+@timed('aggregate')
+def build_outputs(df, overlaps, periods, workers=1, attribution='proportional'):
+    """
+    Build the vessel pivot and period breakdown, optionally across worker processes.
+
+    With workers > 1 the overlaps are split by vessel and the merging, weighted
+    day rates and proportional allocation of each partition run in a process
+    pool. Each vessel is handled by exactly one worker in source row order, so
+    the results are identical to the serial build.
+    """
+    if workers <= 1:
+        return build_vessel_pivot(df, overlaps, periods), build_period_breakdown(df, overlaps, periods, attribution)
+
+    rows = overlaps['row']
+    vessels = df['Vessel'].to_numpy(dtype=object)[rows]
+    # Sorted codes with blank vessels last, as in the serial build
+    vessel_codes, vessel_names = pd.factorize(vessels, sort=True, use_na_sentinel=False)
+    n_periods = len(periods['starts'])
+    n_groups = len(vessel_names) * n_periods
+    groups = vessel_codes * n_periods + overlaps['period']
+    day_rates = parse_day_rates(df['Day Rate'])[rows]
+    cost_per_day, revenue_per_day = daily_amounts(df, rows)
+    priorities = mobilisation_days(df, rows)
+
+    # A few partitions per worker evens out vessels of very different sizes
+    parts = partition_by_vessel(vessel_codes, len(vessel_names), workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(aggregate_vessel_partition,
+                                [groups[p] for p in parts], parts,
+                                [overlaps['start'][p] for p in parts], [overlaps['end'][p] for p in parts],
+                                [overlaps['days'][p] for p in parts], [day_rates[p] for p in parts],
+                                [cost_per_day[p] for p in parts], [revenue_per_day[p] for p in parts],
+                                [priorities[p] for p in parts], [attribution] * len(parts)))
+
+    unique_days = np.zeros(n_groups, dtype=np.int64)
+    weighted_rates = np.zeros(n_groups)
+    total_days = np.zeros(n_groups)
+    costs = np.zeros(n_groups)
+    revenue = np.zeros(n_groups)
+    durations = np.zeros(len(rows), dtype=float if attribution == 'equal' else np.int64)
+    for part, (group_ids, part_days, part_rates, part_totals, part_costs, part_revenue,
+               part_durations) in zip(parts, results):
+        unique_days[group_ids] = part_days
+        weighted_rates[group_ids] = part_rates
+        total_days[group_ids] = part_totals
+        costs[group_ids] = part_costs
+        revenue[group_ids] = part_revenue
+        durations[part] = part_durations
+
+    # The pivot leaves out projects without a vessel, which sort last
+    n_named = int(pd.notna(vessel_names).sum())
+    pivot_groups = n_named * n_periods
+    vessel_pivot_df = assemble_vessel_pivot(vessel_names[:n_named], unique_days[:pivot_groups],
+                                            weighted_rates[:pivot_groups], total_days[:pivot_groups],
+                                            costs[:pivot_groups], revenue[:pivot_groups], periods)
+
+    projects, survey_types = project_labels(df, rows)
+    breakdown_df = layout_period_breakdown(groups, vessels, overlaps['period'], durations,
+                                           projects, survey_types, periods)
+    return vessel_pivot_df, breakdown_df
+
+def period_spans(n_rows, overlaps, positions):
+    """
+    Return the first and last period index each source row overlaps (-1 if none).
+    `positions` maps rows of the frame the overlaps were computed on back to source rows.
+    """
+    first = np.full(n_rows, np.iinfo(np.int64).max, dtype=np.int64)
+    last = np.full(n_rows, -1, dtype=np.int64)
+    source_rows = positions[overlaps['row']]
+    np.minimum.at(first, source_rows, overlaps['period'])
+    np.maximum.at(last, source_rows, overlaps['period'])
+    first[last < 0] = -1
+    return first, last
+
+def select_cells(df, overlaps, cells):
+    """
+    Restrict overlaps to the vessel-period cells in `cells` ({vessel: set_of_period_indices}).
+    """
+    vessels = df['Vessel'].to_numpy(dtype=object)[overlaps['row']]
+    keep = np.array([period in cells.get(vessel_key(vessel), ())
+                     for vessel, period in zip(vessels, overlaps['period'])], dtype=bool)
+    return {name: values[keep] for name, values in overlaps.items()}
+
+def splice_vessel_pivot(old_pivot, new_pivot, cells, periods):
+    """
+    Replace the recomputed vessel-period cells of a previous pivot with new values.
+    Vessels left with no days in any period are dropped, as in a full build.
+    """
+    old = old_pivot.set_index('Vessel')
+    new = new_pivot.set_index('Vessel')
+    vessels = sorted(set(old.index) | set(new.index))
+    merged = old.reindex(vessels).fillna(0)
+
+    for vessel, period_indices in cells.items():
+        if vessel not in merged.index:
+            continue
+        for p in period_indices:
+            cols = pivot_columns(periods, p)
+            merged.loc[vessel, cols] = new.loc[vessel, cols] if vessel in new.index else 0
+
+    days_cols = [pivot_columns(periods, p)[0] for p in range(len(periods['starts']))]
+    merged = merged[(merged[days_cols] > 0).any(axis=1)]
+    for col in merged.columns:
+        if col.endswith(' Days'):
+            merged[col] = merged[col].astype(np.int64)
         else:
-            # No overlap, add as new range
-            merged.append((current_start, current_end))
-    
-    # Calculate total days across all merged ranges
-    total_days = sum((end - start).days + 1 for start, end in merged)
-    return total_days
-
-def calculate_days_in_quarter(start_dt, end_dt, year, quarter):
-    """Calculate how many days a project overlaps with a specific quarter."""
-    qtr_start_month = (quarter - 1) * 3 + 1
-    qtr_start = pd.Timestamp(year=year, month=qtr_start_month, day=1)
-    
-    if quarter == 4:
-        qtr_end = pd.Timestamp(year=year, month=12, day=31)
+            merged[col] = merged[col].astype(float)
+    return merged.rename_axis('Vessel').reset_index()
+
+def splice_period_breakdown(old_breakdown, new_breakdown, cells, periods):
+    """
+    Replace the rows of recomputed vessel-period cells in a previous breakdown.
+    """
+    period_column = periods['breakdown_column']
+    labels = periods['breakdown_labels']
+    affected = {(vessel, labels[p]) for vessel, period_indices in cells.items() for p in period_indices}
+    old_keys = zip(old_breakdown['Vessel'].map(vessel_key), old_breakdown[period_column])
+    keep = np.array([key not in affected for key in old_keys], dtype=bool)
+    combined = pd.concat([old_breakdown[keep], new_breakdown], ignore_index=True)
+
+    # Periods sort chronologically, which is not always the label order (e.g. Q4-2024 < Q1-2025)
+    period_order = combined[period_column].map({label: i for i, label in enumerate(labels)})
+    combined = combined.assign(_period=period_order).sort_values(['Vessel', '_period'], kind='stable')
+    return combined.drop(columns='_period').reset_index(drop=True)
+
+@timed('read_previous')
+def read_previous_outputs(pivot_path, breakdown_path, periods):
+    """Read the previous pivot and breakdown, or return None if either is missing."""
+    if not (os.path.exists(pivot_path) and os.path.exists(breakdown_path)):
+        return None
+    text_cols = {'Vessel': str, 'Project': str, 'Survey Type': str, periods['breakdown_column']: str}
+    old_pivot = pd.read_csv(pivot_path, dtype={'Vessel': str})
+    old_breakdown = pd.read_csv(breakdown_path, dtype=text_cols, keep_default_na=False)
+    old_breakdown['Vessel'] = old_breakdown['Vessel'].replace('', np.nan)
+    return old_pivot, old_breakdown
+
+def new_stream_accumulator(n_periods):
+    """
+    Empty per vessel-period accumulator for streamed chunks.
+
+    Pivot totals are kept as flat arrays indexed vessel * n_periods + period,
+    and overlapping project days as merged runs, so their size depends on the
+    number of vessels and periods rather than the number of rows.
+    """
+    empty = np.array([], dtype=np.int64)
+    return {
+        'n_periods': n_periods,
+        'vessels': {},          # vessel (None for blank) -> code in order of first appearance
+        'run_groups': empty,
+        'run_starts': empty,
+        'run_ends': empty,
+        'weighted_rates': np.zeros(0),
+        'total_days': np.zeros(0),
+        'costs': np.zeros(0),
+        'revenue': np.zeros(0),
+        'breakdown': [],        # per-chunk (codes, periods, days, starts, ends, mobilisation days,
+                                #            projects, survey types)
+    }
+
+@timed('aggregate')
+def fold_chunk(acc, df, overlaps):
+    """Fold the period overlaps of one chunk of in-range projects into the accumulator."""
+    n_periods = acc['n_periods']
+    rows = overlaps['row']
+    vessels = df['Vessel'].to_numpy(dtype=object)[rows]
+    local_codes, uniques = pd.factorize(vessels, use_na_sentinel=False)
+    registry = acc['vessels']
+    global_codes = np.array([registry.setdefault(v if pd.notna(v) else None, len(registry)) for v in uniques],
+                            dtype=np.int64)
+    codes = global_codes[local_codes]
+    groups = codes * n_periods + overlaps['period']
+
+    n_groups = len(registry) * n_periods
+    for name in ('weighted_rates', 'total_days', 'costs', 'revenue'):
+        acc[name] = np.pad(acc[name], (0, n_groups - len(acc[name])))
+
+    # Re-merging the previous runs with the new overlaps keeps one run per
+    # disjoint stretch of activity in each vessel-period
+    acc['run_groups'], acc['run_starts'], acc['run_ends'] = merge_intervals(
+        np.concatenate([acc['run_groups'], groups]),
+        np.concatenate([acc['run_starts'], overlaps['start']]),
+        np.concatenate([acc['run_ends'], overlaps['end']]))
+
+    # np.add.at adds in row order, exactly like the single bincount of a full read
+    day_rates = parse_day_rates(df['Day Rate'])[rows]
+    np.add.at(acc['weighted_rates'], groups, day_rates * overlaps['days'])
+    np.add.at(acc['total_days'], groups, overlaps['days'])
+    cost_per_day, revenue_per_day = daily_amounts(df, rows)
+    np.add.at(acc['costs'], groups, cost_per_day * overlaps['days'])
+    np.add.at(acc['revenue'], groups, revenue_per_day * overlaps['days'])
+
+    projects, survey_types = project_labels(df, rows)
+    acc['breakdown'].append((codes, overlaps['period'], overlaps['days'], overlaps['start'], overlaps['end'],
+                             mobilisation_days(df, rows), projects, survey_types))
+
+@timed('finish_stream')
+def finish_stream(acc, periods, attribution='proportional'):
+    """Turn a stream accumulator into the vessel pivot and period breakdown."""
+    n_periods = acc['n_periods']
+    names = list(acc['vessels'])
+    # Same vessel order as a full build: sorted, with blank vessels last
+    order = sorted(range(len(names)), key=lambda c: (names[c] is None, names[c] or ''))
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+    sorted_names = np.array([names[c] if names[c] is not None else np.nan for c in order], dtype=object)
+
+    # Relabel every vessel-period group from first-appearance to sorted codes
+    n_groups = len(names) * n_periods
+    old_groups = np.arange(n_groups)
+    relabel = rank[old_groups // n_periods] * n_periods + old_groups % n_periods
+
+    def sorted_groups(values):
+        out = np.empty_like(values)
+        out[relabel] = values
+        return out
+
+    run_days = acc['run_ends'] - acc['run_starts'] + 1
+    unique_days = sorted_groups(
+        np.bincount(acc['run_groups'], weights=run_days, minlength=n_groups).astype(np.int64))
+    weighted_rates = sorted_groups(acc['weighted_rates'])
+    total_days = sorted_groups(acc['total_days'])
+    costs = sorted_groups(acc['costs'])
+    revenue = sorted_groups(acc['revenue'])
+
+    # The pivot leaves out projects without a vessel, which sort last
+    n_named = sum(name is not None for name in names)
+    pivot_groups = n_named * n_periods
+    vessel_pivot_df = assemble_vessel_pivot(
+        list(sorted_names[:n_named]), unique_days[:pivot_groups],
+        weighted_rates[:pivot_groups], total_days[:pivot_groups], costs[:pivot_groups], revenue[:pivot_groups],
+        periods)
+
+    if acc['breakdown']:
+        codes, period_idx, days, starts, ends, priorities, projects, survey_types = (
+            np.concatenate(parts) for parts in zip(*acc['breakdown']))
     else:
-        next_qtr_start = pd.Timestamp(year=year, month=qtr_start_month + 3, day=1)
-        qtr_end = next_qtr_start - pd.Timedelta(days=1)
-    
-    # Calculate overlap
-    overlap_start = max(start_dt, qtr_start)
-    overlap_end = min(end_dt, qtr_end)
-    
-    if overlap_start > overlap_end:
-        return 0
-    
-    return (overlap_end - overlap_start).days + 1
-
-def remove_old_dated_files(base_name, date_str):
-    """Remove old dated files for the same base name, keeping only today's file."""
-    pattern = f"{base_name}_"
-    for filename in os.listdir('.'):
-        if filename.startswith(pattern) and filename.endswith('.csv') and filename != f"{base_name}_{date_str}.csv":
-            try:
-                os.remove(filename)
-                print(f"  Removed old file: {filename}")
-            except Exception as e:
-                print(f"  Warning: Could not remove {filename}: {e}")
-
-def main():
-    # Check if source file exists
-    source_file = "Streamer Projects - SWG - AI.csv"
-    if not os.path.exists(source_file):
-        print(f"ERROR: Source file '{source_file}' not found!")
+        codes = period_idx = days = starts = ends = priorities = np.array([], dtype=np.int64)
+        projects = survey_types = np.array([], dtype=object)
+    vessel_codes = rank[codes]
+    breakdown_df = assemble_period_breakdown(
+        vessel_codes * n_periods + period_idx, sorted_names[vessel_codes], period_idx, days,
+        unique_days, projects, survey_types, periods, attribution, starts, ends, priorities)
+    return vessel_pivot_df, breakdown_df
+
+def output_names(periods):
+    """
+    Base names of the pivot and breakdown outputs for a period calendar.
+
+    The default 2025 quarterly run keeps the historical names
+    (Vessel_Quarterly_Pivot_2025, quarterly_breakdown_data) that the
+    dashboard and validation script read.
+    """
+    adjective = PERIOD_ADJECTIVES[periods['kind']]
+    pivot_name = f"Vessel_{adjective}_Pivot_{periods['range_label']}"
+    breakdown_name = f"{adjective.lower()}_breakdown_data"
+    if (periods['kind'], periods['range_label']) != ('quarter', '2025'):
+        breakdown_name += f"_{periods['range_label']}"
+    return pivot_name, breakdown_name
+
+def print_published(record, n_columns=None):
+    """Report a published output and its undated alias."""
+    shape = f" with {record['rows']} rows and {n_columns} columns" if 'rows' in record and n_columns else ""
+    print(f"✓ Created {record['path']}{shape}")
+    if record['link'] is not None:
+        print(f"✓ Created {record['alias']} (for backward compatibility, {record['link']} to the dated copy)")
+
+def prepare_projects(df, periods, report=None, row_offset=0):
+    """
+    Apply the source schema in place, close ongoing projects at the end of the
+    reporting range and add the phase duration columns.
+
+    Cells that could not be parsed are added to report (see
+    source_schema.apply_schema). Returns (number of ongoing projects that were
+    given a demobilization date, report).
+    """
+    # Convert the text columns (dates included) to their declared types
+    with stage('parse', rows=len(df)):
+        report = apply_schema(df, report, row_offset)
+    
+    with stage('phase_durations'):
+        # For ongoing projects with no demobilization date, use the last day of the
+        # reporting range to account for days in the final period
+        ongoing_projects = df['Demobilisation End'].isna() & df['Mobilisation Start'].notna()
+        if ongoing_projects.any():
+            df.loc[ongoing_projects, 'Demobilisation End'] = pd.Timestamp(year=periods['end_year'], month=12, day=31)
+        
+        # Calculate phase durations. They are always floats so every chunk of a
+        # streamed run is written the same way, whether or not it has blanks.
+        for phase, (first, last) in PHASE_COLUMNS.items():
+            df[phase] = (df[last] - df[first]).dt.days.astype(float)
+        df['Project Duration'] = (df['Demobilisation End'] - df['Mobilisation Start']).dt.days.astype(float)
+    return int(ongoing_projects.sum()), report
+
+def print_coercion_report(report):
+    """Warn about source cells that did not match the schema."""
+    lines = format_coercion_report(report)
+    if lines:
+        print("\nWarning: some source cells did not match the expected schema")
+        for line in lines:
+            print(f"  {line}")
+
+def reporting_range_mask(df, periods):
+    """Boolean mask of the projects that overlap the reporting range."""
+    range_start, range_end = period_bounds_as_dates(periods)
+    return ((df['Mobilisation Start'] < pd.Timestamp(range_end[-1]) + pd.Timedelta(days=1)) & 
+            (df['Demobilisation End'] >= pd.Timestamp(range_start[0]))).to_numpy()
+
+@timed('stream')
+def stream_source(source_file, periods, chunk_size, enhanced_path, attribution='proportional', query_runs=None):
+    """
+    Build the pivot and breakdown by reading the source in chunks of chunk_size rows.
+
+    Each chunk is parsed, appended to the enhanced CSV and folded into per
+    vessel-period accumulators (and the query index runs, if given) before
+    the next one is read. Memory for the
+    pivot is bounded by the number of vessels; the breakdown, which has a row
+    per project and period, keeps only its output columns per overlap.
+
+    Returns (vessel_pivot_df, breakdown_df), identical to a full read.
+    """
+    acc = new_stream_accumulator(len(periods['starts']))
+    report = new_coercion_report()
+    n_rows = n_range = n_ongoing = n_chunks = 0
+    # Every chunk is read as text and given the declared types, so all chunks
+    # are typed the same way however their values happen to look
+    for chunk in read_source(source_file, chunksize=chunk_size):
+        chunk_ongoing, report = prepare_projects(chunk, periods, report, n_rows)
+        n_ongoing += chunk_ongoing
+        with stage('write_enhanced'):
+            chunk.to_csv(enhanced_path, index=False, header=n_chunks == 0, mode='a' if n_chunks else 'w')
+        n_rows += len(chunk)
+        n_chunks += 1
+        
+        if query_runs is not None:
+            with stage('query_index'):
+                fold_projects(query_runs, chunk)
+        
+        chunk_range = chunk[reporting_range_mask(chunk, periods)]
+        n_range += len(chunk_range)
+        fold_chunk(acc, chunk_range, compute_period_overlaps(chunk_range, periods))
+    
+    if n_chunks == 0:
+        # Header-only source: still write an enhanced file with every column
+        empty = read_source(source_file)
+        prepare_projects(empty, periods)
+        empty.to_csv(enhanced_path, index=False)
+    
+    print(f"Streamed {n_rows} projects in {n_chunks} chunks, {n_range} in {periods['range_label']}")
+    print_coercion_report(report)
+    if n_ongoing:
+        print(f"Set demobilization date to {periods['end_year']}-12-31 for {n_ongoing} ongoing projects")
+    return finish_stream(acc, periods, attribution)
+
+# JSON lines log of per-stage timings written by --profile
+PROFILE_FILE = 'generator_profile.jsonl'
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the CSV files required by the Streamlit dashboard.")
+    parser.add_argument('--source', default=SOURCE_FILE, metavar='PATH',
+                        help="Source file, directory of CSV files or glob pattern (quoted); several files are "
+                             "read concurrently and merged, dropping repeated projects (default: %(default)s)")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore the manifest and rebuild every output from scratch")
+    parser.add_argument('--period', choices=PERIOD_KINDS, default='quarter',
+                        help="Period size for the pivot and breakdown (default: quarter)")
+    parser.add_argument('--from-year', type=int, default=2025,
+                        help="First year of the reporting range (default: 2025)")
+    parser.add_argument('--to-year', type=int, default=None,
+                        help="Last year of the reporting range (default: same as --from-year)")
+    parser.add_argument('--chunk-size', type=int, default=None, metavar='ROWS',
+                        help="Stream the source in chunks of ROWS rows to bound memory on large exports "
+                             "(always a full rebuild)")
+    parser.add_argument('--no-excel', action='store_true',
+                        help="Skip the review workbook (Quarterly_Review_Breakdown.xlsx for the default run)")
+    parser.add_argument('--keep-versions', type=int, default=DEFAULT_KEEP_VERSIONS, metavar='N',
+                        help="Dated copies to keep per output, newest first (default: %(default)s)")
+    parser.add_argument('--keep-days', type=int, default=None, metavar='DAYS',
+                        help="Also keep every dated copy from the last DAYS days")
+    parser.add_argument('--attribution', choices=ATTRIBUTION_CHOICES, default='proportional',
+                        help="How days shared by overlapping projects are split in the breakdown: "
+                             "proportional (default), equal (each day split between the projects active on it) "
+                             "or first (each day goes to the first-mobilised project)")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="Split the per-vessel aggregation across N processes (default: 1)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and regenerate incrementally whenever the source changes")
+    parser.add_argument('--poll-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="With --watch, how often the source is checked for changes (default: %(default)s)")
+    parser.add_argument('--debounce', type=float, default=2.0, metavar='SECONDS',
+                        help="With --watch, how long the source must stay unchanged before a run, so a burst "
+                             "of saves triggers one run (default: %(default)s)")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, default=None, metavar='PATH',
+                        help="Print the time spent in each stage and append it as JSON lines to PATH "
+                             f"(default: {PROFILE_FILE})")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="With --profile, also record each stage's peak memory with tracemalloc "
+                             "(slows the run down)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.keep_versions < 1:
+        parser.error("--keep-versions must be at least 1")
+    if args.workers > 1 and args.chunk_size:
+        parser.error("--workers cannot be combined with --chunk-size")
+    if args.poll_interval <= 0 or args.debounce < 0:
+        parser.error("--poll-interval must be positive and --debounce must not be negative")
+    if args.trace_memory and args.profile is None:
+        args.profile = PROFILE_FILE
+    return args
+
+def generate(args):
+    """Regenerate the outputs for parsed command-line arguments."""
+    periods = build_periods(args.period, args.from_year, args.to_year)
+    range_label = periods['range_label']
+    
+    # Check if the source file exists, or find the files of a directory or glob
+    source_files = resolve_sources(args.source)
+    if not source_files:
+        print(f"ERROR: Source file '{args.source}' not found!")
         print(f"Please ensure the file exists in the current directory: {os.getcwd()}")
         sys.exit(1)
-    
-    print(f"Loading data from {source_file}...")
-    
-    # Load the raw data
-    df = pd.read_csv(source_file)
-    print(f"Loaded {len(df)} projects")
-    
-    # Convert date columns to datetime
-    date_cols = ["Mobilisation Start", "Deployment Start", "Production Start", 
-                 "Production End", "Retrieval End", "Demobilisation End"]
-    
-    for col in date_cols:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
-    
-    # For ongoing projects with no demobilization date, use December 31, 2025
-    # to account for Q4 days
-    ongoing_projects = df['Demobilisation End'].isna() & df['Mobilisation Start'].notna()
-    if ongoing_projects.any():
-        default_demob_date = pd.to_datetime('2025-12-31')
-        df.loc[ongoing_projects, 'Demobilisation End'] = default_demob_date
-        print(f"\nSet demobilization date to 2025-12-31 for {ongoing_projects.sum()} ongoing projects")
-    
-    # Calculate phase durations
-    print("\nCalculating phase durations...")
-    df['Mobilization (days)'] = (df['Deployment Start'] - df['Mobilisation Start']).dt.days
-    df['Deployment (days)'] = (df['Production Start'] - df['Deployment Start']).dt.days
-    df['Production (days)'] = (df['Production End'] - df['Production Start']).dt.days
-    df['Recovery (days)'] = (df['Retrieval End'] - df['Production End']).dt.days
-    df['Demobilization (days)'] = (df['Demobilisation End'] - df['Retrieval End']).dt.days
-    df['Project Duration'] = (df['Demobilisation End'] - df['Mobilisation Start']).dt.days
+    if len(source_files) > 1 and args.chunk_size:
+        print(f"ERROR: --chunk-size reads a single source file, but '{args.source}' matches {len(source_files)}")
+        sys.exit(1)
+    # Several trackers are merged into one frame (see source_ingest.py)
+    source_file = source_files[0] if len(source_files) == 1 else f"{len(source_files)} source files"
+    
+    pivot_name, breakdown_name = output_names(periods)
+    pivot_output = f"{pivot_name}.csv"
+    breakdown_output = f"{breakdown_name}.csv"
+    workbook_output = f"{workbook_name(periods)}.xlsx"
+    outputs = ["Enhanced_Streamer_Projects.csv", pivot_output, breakdown_output, QUERY_INDEX_FILE]
+    if not args.no_excel:
+        outputs.append(workbook_output)
+    manifest_file = manifest_path(pivot_name)
+    config = {'period': periods['kind'], 'from_year': periods['start_year'], 'to_year': periods['end_year']}
+    if args.attribution != 'proportional':
+        # Only recorded when set, so manifests from before the option stay valid
+        config['attribution'] = args.attribution
+    
+    # Skip the run entirely when the source is byte-identical to the last run
+    with stage('source_hash'):
+        if len(source_files) == 1:
+            source_sha256 = file_sha256(source_file)
+        else:
+            source_sha256 = sources_sha256(source_files)
+    previous_manifest = None if args.full else load_manifest(manifest_file)
+    if previous_manifest is not None and previous_manifest.get('config') != config:
+        previous_manifest = None
+    # Outputs that are missing or were rewritten since they were published
+    # (e.g. by another program writing the undated name) cannot be reused
+    changed = changed_artifacts(outputs)
+    if previous_manifest is not None and changed:
+        print(f"{', '.join(changed)} changed or missing since the last run - rebuilding in full")
+        previous_manifest = None
+    if previous_manifest is not None and previous_manifest['source_sha256'] == source_sha256:
+        verb = 'is' if len(source_files) == 1 else 'are'
+        print(f"✓ {source_file} {verb} unchanged since the last run - nothing to regenerate.")
+        print("  (use --full to force a rebuild)")
+        return
     
     # Get current date string for file naming
     date_str = datetime.now().strftime('%Y%m%d')
-    
-    # Remove old dated files before creating new ones
-    remove_old_dated_files("Enhanced_Streamer_Projects", date_str)
-    
-    # Save Enhanced_Streamer_Projects.csv with date
-    enhanced_filename = f"Enhanced_Streamer_Projects_{date_str}.csv"
-    print(f"\nSaving {enhanced_filename}...")
-    df.to_csv(enhanced_filename, index=False)
-    # Also save without date for backward compatibility
-    df.to_csv("Enhanced_Streamer_Projects.csv", index=False)
-    print(f"✓ Created {enhanced_filename} with {len(df)} rows and {len(df.columns)} columns")
-    print(f"✓ Created Enhanced_Streamer_Projects.csv (for backward compatibility)")
-    
-    # Generate Vessel Quarterly Pivot 2025
-    print("\nGenerating Vessel Quarterly Pivot 2025...")
-    
-    # Filter to projects that overlap with 2025
-    df_2025 = df[
-        (df['Mobilisation Start'].dt.year <= 2025) & 
-        (df['Demobilisation End'].dt.year >= 2025)
-    ].copy()
-    
-    print(f"Found {len(df_2025)} projects in 2025")
-    
-    # Prepare data for quarterly aggregation
-    quarterly_data = []
-    
-    for _, row in df_2025.iterrows():
-        if pd.isna(row['Mobilisation Start']) or pd.isna(row['Demobilisation End']):
-            continue
+    enhanced_name = "Enhanced_Streamer_Projects"
+    
+    # Every output is written once to a temporary file and renamed into place,
+    # with the undated name linked to the dated copy (see artifact_store.py)
+    published = []
+    
+    # Merged busy runs per vessel for swg_query.py, over every project in the source
+    query_runs = new_run_accumulator()
+    
+    if args.chunk_size:
+        # Bounded-memory mode: only one chunk of raw rows is held at a time and
+        # the enhanced file is written as the chunks go by
+        print(f"Streaming data from {source_file} in chunks of {args.chunk_size} rows...")
+        enhanced_staging = temp_path(alias_path(enhanced_name))
+        try:
+            vessel_pivot_df, breakdown_df = stream_source(source_file, periods, args.chunk_size, enhanced_staging,
+                                                          args.attribution, query_runs)
+        except BaseException:
+            if os.path.exists(enhanced_staging):
+                os.remove(enhanced_staging)
+            raise
+        published.append(publish_artifact(enhanced_staging, enhanced_name, date_str))
+        print_published(published[-1])
         
-        vessel = row['Vessel']
-        start = row['Mobilisation Start']
-        end = row['Demobilisation End']
+        # Per-row fingerprints would grow with the source, so streamed runs only
+        # record the file hash and the next run rebuilds in full if it changed
+        manifest = build_source_manifest(source_sha256, config)
+    else:
+        print(f"Loading data from {source_file}...")
         
-        # Parse day rate (handle $, commas, spaces, #DIV/0! errors)
-        # Note: Source data uses 'Day Rate' column which may be empty or contain errors
-        day_rate_str = str(row.get('Day Rate', '')).replace('$', '').replace(',', '').replace(' ', '').replace('#DIV/0!', '').strip()
-        day_rate = float(day_rate_str) if day_rate_str and day_rate_str != 'nan' else 0
+        # Load the raw text; types are applied after fingerprinting
+        with stage('load') as record:
+            if len(source_files) == 1:
+                df = read_source(source_file)
+            else:
+                for path in source_files:
+                    print(f"  - {path}")
+                # Record the hash of the bytes actually parsed, in case a file changed since it was hashed
+                df, n_duplicates, source_sha256 = read_sources(source_files)
+            record['rows'] = len(df)
+        print(f"Loaded {len(df)} projects")
+        if len(source_files) > 1:
+            print(f"Dropped {n_duplicates} projects listed more than once "
+                  f"(same vessel, survey name and mobilisation start)")
         
-        # Note: Source data does not have a 'Total Revenue' column
-        # Revenue would need to be calculated separately or added to source data
-        revenue = 0
+        # Fingerprint each row before any parsing so edits are detected on raw content
+        with stage('row_hashes'):
+            source_row_hashes = row_hashes(df)
         
-        # Calculate days in each quarter of 2025
-        for quarter in [1, 2, 3, 4]:
-            days = calculate_days_in_quarter(start, end, 2025, quarter)
-            if days > 0:
-                quarterly_data.append({
-                    'Vessel': vessel,
-                    'Quarter': f'Q{quarter} 2025',
-                    'Days': days,
-                    'Day Rate': day_rate,
-                    'Revenue': revenue,
-                    'Start': start,
-                    'End': end
-                })
-    
-    quarterly_df = pd.DataFrame(quarterly_data)
-    
-    # Group by vessel and quarter to aggregate
-    vessel_quarters = []
-    
-    for vessel in sorted(quarterly_df['Vessel'].unique()):
-        vessel_data = {'Vessel': vessel}
+        # Convert dates, close ongoing projects and calculate phase durations
+        n_ongoing, report = prepare_projects(df, periods)
+        print_coercion_report(report)
+        if n_ongoing:
+            print(f"\nSet demobilization date to {periods['end_year']}-12-31 for {n_ongoing} ongoing projects")
         
-        for quarter in [1, 2, 3, 4]:
-            q_name = f'Q{quarter} 2025'
-            q_data = quarterly_df[(quarterly_df['Vessel'] == vessel) & (quarterly_df['Quarter'] == q_name)]
-            
-            if len(q_data) > 0:
-                # Get date ranges for this vessel in this quarter
-                # IMPORTANT: Use quarter-specific overlap ranges, not full project ranges
-                qtr_start_month = (quarter - 1) * 3 + 1
-                qtr_start = pd.Timestamp(year=2025, month=qtr_start_month, day=1)
-                if quarter == 4:
-                    qtr_end = pd.Timestamp(year=2025, month=12, day=31)
-                else:
-                    next_qtr_start = pd.Timestamp(year=2025, month=qtr_start_month + 3, day=1)
-                    qtr_end = next_qtr_start - pd.Timedelta(days=1)
-                
-                # Calculate quarter-specific date ranges for overlap merging
-                date_ranges = []
-                for _, row in q_data.iterrows():
-                    overlap_start = max(row['Start'], qtr_start)
-                    overlap_end = min(row['End'], qtr_end)
-                    if overlap_start <= overlap_end:
-                        date_ranges.append((overlap_start, overlap_end))
-                
-                unique_days = merge_date_ranges(date_ranges)
-                
-                # Calculate weighted average day rate
-                total_day_rate_weighted = (q_data['Day Rate'] * q_data['Days']).sum()
-                total_days = q_data['Days'].sum()
-                avg_day_rate = total_day_rate_weighted / total_days if total_days > 0 else 0
-                
-                # Calculate total cost and revenue
-                total_cost = avg_day_rate * unique_days
-                total_revenue = q_data['Revenue'].sum()
-                
-                vessel_data[f'Q{quarter} Days'] = unique_days
-                vessel_data[f'Q{quarter} Avg Day Rate'] = avg_day_rate
-                vessel_data[f'Q{quarter} Total Cost'] = total_cost
-                vessel_data[f'Q{quarter} Revenue'] = total_revenue
-            else:
-                vessel_data[f'Q{quarter} Days'] = 0
-                vessel_data[f'Q{quarter} Avg Day Rate'] = 0
-                vessel_data[f'Q{quarter} Total Cost'] = 0
-                vessel_data[f'Q{quarter} Revenue'] = 0
+        # Save Enhanced_Streamer_Projects.csv with date, linked from the undated name
+        print(f"\nSaving {enhanced_name}_{date_str}.csv...")
+        with stage('write_enhanced', rows=len(df)):
+            published.append(write_artifact(lambda path: df.to_csv(path, index=False),
+                                            enhanced_name, date_str, rows=len(df)))
+        print_published(published[-1], len(df.columns))
         
-        vessel_quarters.append(vessel_data)
-    
-    vessel_pivot_df = pd.DataFrame(vessel_quarters)
-    
-    # Remove old dated files before creating new ones
-    remove_old_dated_files("Vessel_Quarterly_Pivot_2025", date_str)
-    
-    # Save Vessel_Quarterly_Pivot_2025.csv with date
-    pivot_filename = f"Vessel_Quarterly_Pivot_2025_{date_str}.csv"
-    print(f"\nSaving {pivot_filename}...")
-    vessel_pivot_df.to_csv(pivot_filename, index=False)
-    # Also save without date for backward compatibility
-    vessel_pivot_df.to_csv("Vessel_Quarterly_Pivot_2025.csv", index=False)
-    print(f"✓ Created {pivot_filename} with {len(vessel_pivot_df)} rows and {len(vessel_pivot_df.columns)} columns")
-    print(f"✓ Created Vessel_Quarterly_Pivot_2025.csv (for backward compatibility)")
-    
-    # Generate quarterly breakdown data with duration column
-    print("\nGenerating Quarterly Breakdown Data...")
-    
-    # Build quarterly breakdown for each project, collecting date ranges per vessel-quarter
-    vessel_quarter_projects = {}  # Key: (vessel, quarter), Value: list of (project_name, survey_type, date_ranges)
-    
-    for idx, project_row in df_2025.iterrows():
-        if pd.isna(project_row['Mobilisation Start']) or pd.isna(project_row['Demobilisation End']):
-            continue
+        with stage('query_index'):
+            fold_projects(query_runs, df)
         
-        project_name = str(project_row['Survey Name']).strip() if pd.notna(project_row['Survey Name']) else ''
-        vessel = project_row.get('Vessel', None)
-        survey_type = project_row.get('Activity', None)
-        mobil_start = project_row['Mobilisation Start']
-        demobil_end = project_row['Demobilisation End']
+        # Generate the vessel pivot for the reporting range
+        print(f"\nGenerating {pivot_name.replace('_', ' ')}...")
         
-        # Calculate days in each quarter of 2025
-        for quarter in [1, 2, 3, 4]:
-            days_in_qtr = calculate_days_in_quarter(mobil_start, demobil_end, 2025, quarter)
-            if days_in_qtr > 0:
-                # Calculate the actual date range for this project in this quarter
-                qtr_start_month = (quarter - 1) * 3 + 1
-                qtr_start = pd.Timestamp(year=2025, month=qtr_start_month, day=1)
-                if quarter == 4:
-                    qtr_end = pd.Timestamp(year=2025, month=12, day=31)
-                else:
-                    next_qtr_start = pd.Timestamp(year=2025, month=qtr_start_month + 3, day=1)
-                    qtr_end = next_qtr_start - pd.Timedelta(days=1)
-                
-                overlap_start = max(mobil_start, qtr_start)
-                overlap_end = min(demobil_end, qtr_end)
-                
-                key = (vessel, quarter)
-                if key not in vessel_quarter_projects:
-                    vessel_quarter_projects[key] = []
-                vessel_quarter_projects[key].append({
-                    'project': project_name,
-                    'survey_type': survey_type,
-                    'date_range': (overlap_start, overlap_end)
-                })
-    
-    # Create records showing unique days per vessel-quarter (avoiding double-counting)
-    # Each vessel-quarter gets one row with merged days, or multiple rows for non-overlapping projects
-    quarterly_records = []
-    
-    for (vessel, quarter), projects in vessel_quarter_projects.items():
-        # Calculate the merged (unique) days for this vessel-quarter
-        date_ranges = [p['date_range'] for p in projects]
-        unique_days = merge_date_ranges(date_ranges)
+        # Filter to projects that overlap with the reporting range
+        in_range = reporting_range_mask(df, periods)
+        df_range = df[in_range].copy()
+        
+        print(f"Found {len(df_range)} projects in {range_label}")
         
-        # If there's only one project, show it directly
-        if len(projects) == 1:
-            project_info = projects[0]
-            quarterly_records.append({
-                'Project': project_info['project'],
-                'Vessel': vessel,
-                'Survey Type': str(project_info['survey_type']) if pd.notna(project_info['survey_type']) else '',
-                'Quarter': f'Q{quarter}-2025',
-                'Duration': unique_days
-            })
+        # Clip every project against every period in one pass
+        overlaps = compute_period_overlaps(df_range, periods)
+        
+        with stage('manifest'):
+            first_periods, last_periods = period_spans(len(df), overlaps, np.flatnonzero(in_range))
+            manifest = build_manifest(source_sha256, config, df['Vessel'], source_row_hashes,
+                                      first_periods, last_periods)
+        
+        # Recompute only the vessel-period cells whose input rows changed
+        previous_outputs = None
+        if previous_manifest is not None and previous_manifest['vessels'] is not None:
+            previous_outputs = read_previous_outputs(pivot_output, breakdown_output, periods)
+        
+        # One row per project per period, with merged days split across overlapping projects
+        if previous_outputs is not None:
+            cells = changed_cells(previous_manifest, manifest, len(periods['starts']))
+            print(f"Incremental update: recomputing {sum(len(p) for p in cells.values())} "
+                  f"vessel-period cells across {len(cells)} vessels")
+            changed_overlaps = select_cells(df_range, overlaps, cells)
+            old_pivot, old_breakdown = previous_outputs
+            new_pivot, new_breakdown = build_outputs(df_range, changed_overlaps, periods, args.workers,
+                                                     args.attribution)
+            vessel_pivot_df = splice_vessel_pivot(old_pivot, new_pivot, cells, periods)
+            breakdown_df = splice_period_breakdown(old_breakdown, new_breakdown, cells, periods)
         else:
-            # Multiple projects - distribute the merged days proportionally to avoid double-counting
-            total_individual_days = sum((p['date_range'][1] - p['date_range'][0]).days + 1 for p in projects)
-            
-            allocated_days_list = []
-            for project_info in projects:
-                project_days = (project_info['date_range'][1] - project_info['date_range'][0]).days + 1
-                # Allocate merged days proportionally
-                allocated_days = round(unique_days * project_days / total_individual_days)
-                allocated_days_list.append(allocated_days)
-            
-            # Adjust for rounding errors - add/subtract from the largest allocation
-            total_allocated = sum(allocated_days_list)
-            if total_allocated != unique_days:
-                # Find index of largest allocation and adjust it
-                # Note: If multiple projects have the same max, we use the first one
-                max_idx = allocated_days_list.index(max(allocated_days_list))
-                allocated_days_list[max_idx] += (unique_days - total_allocated)
-            
-            # Create records with adjusted allocations
-            for i, project_info in enumerate(projects):
-                quarterly_records.append({
-                    'Project': project_info['project'],
-                    'Vessel': vessel,
-                    'Survey Type': str(project_info['survey_type']) if pd.notna(project_info['survey_type']) else '',
-                    'Quarter': f'Q{quarter}-2025',
-                    'Duration': allocated_days_list[i]
-                })
-    
-    quarterly_breakdown_df = pd.DataFrame(quarterly_records)
-    
-    # Sort by vessel and quarter for better readability
-    quarterly_breakdown_df = quarterly_breakdown_df.sort_values(['Vessel', 'Quarter'])
-    
-    # Remove old dated files before creating new ones
-    remove_old_dated_files("quarterly_breakdown_data", date_str)
-    
-    # Save quarterly_breakdown_data.csv with date
-    quarterly_filename = f"quarterly_breakdown_data_{date_str}.csv"
-    print(f"\nSaving {quarterly_filename}...")
-    quarterly_breakdown_df.to_csv(quarterly_filename, index=False)
-    # Also save without date for backward compatibility
-    quarterly_breakdown_df.to_csv("quarterly_breakdown_data.csv", index=False)
-    print(f"✓ Created {quarterly_filename} with {len(quarterly_breakdown_df)} rows and {len(quarterly_breakdown_df.columns)} columns")
-    print(f"✓ Created quarterly_breakdown_data.csv (for backward compatibility)")
+            if args.workers > 1:
+                print(f"Aggregating vessels across {args.workers} worker processes")
+            vessel_pivot_df, breakdown_df = build_outputs(df_range, overlaps, periods, args.workers,
+                                                          args.attribution)
+    
+    # Save the pivot with date, linked from the undated name
+    print(f"\nSaving {pivot_name}_{date_str}.csv...")
+    with stage('write_pivot', rows=len(vessel_pivot_df)):
+        published.append(write_artifact(lambda path: vessel_pivot_df.to_csv(path, index=False),
+                                        pivot_name, date_str, rows=len(vessel_pivot_df)))
+    print_published(published[-1], len(vessel_pivot_df.columns))
+    
+    # Save the breakdown data with duration column
+    print(f"\nSaving {PERIOD_ADJECTIVES[periods['kind']]} Breakdown Data...")
+    print(f"\nSaving {breakdown_name}_{date_str}.csv...")
+    with stage('write_breakdown', rows=len(breakdown_df)):
+        published.append(write_artifact(lambda path: breakdown_df.to_csv(path, index=False),
+                                        breakdown_name, date_str, rows=len(breakdown_df)))
+    print_published(published[-1], len(breakdown_df.columns))
+    
+    # Review workbook, streamed sheet by sheet from the pivot and breakdown
+    if not args.no_excel:
+        print(f"\nSaving {workbook_output}...")
+        with stage('write_workbook'):
+            published.append(write_artifact(
+                lambda path: write_review_workbook(path, vessel_pivot_df, breakdown_df, periods),
+                workbook_name(periods), ext='.xlsx'))
+        print_published(published[-1])
+    
+    # Compact index for swg_query.py. Ongoing projects are counted up to the
+    # end of this run's reporting range, as in the pivot.
+    range_start, range_end = period_bounds_as_dates(periods)
+    query_meta = {
+        'source_sha256': source_sha256,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'range_start': str(range_start[0]),
+        'range_end': str(range_end[-1]),
+    }
+    print(f"\nSaving {QUERY_INDEX_FILE}...")
+    with stage('write_query_index'):
+        published.append(write_artifact(lambda path: write_query_index(path, query_runs, query_meta),
+                                        QUERY_INDEX_NAME, ext='.bin'))
+    print_published(published[-1])
+    
+    # Drop dated copies outside the retention policy, now that the new ones are in place
+    with stage('retention'):
+        removed = apply_retention([enhanced_name, pivot_name, breakdown_name], args.keep_versions, args.keep_days)
+    for filename in removed:
+        print(f"  Removed old file: {filename}")
+    record_artifacts(published)
+    
+    # Record the fingerprints only once every output has been written, then
+    # tell the dashboard there is new data
+    save_manifest(manifest, manifest_file)
+    write_data_version(source_sha256)
     
     print("\n✅ All CSV files generated successfully!")
     print("\nGenerated files with dates (overwrites if run same day):")
-    print(f"  - {enhanced_filename}")
-    print(f"  - {pivot_filename}")
-    print(f"  - {quarterly_filename}")
+    for record in published:
+        if record['link'] is not None:
+            print(f"  - {record['path']}")
     print("\nBackward compatibility files (without dates):")
-    print("  - Enhanced_Streamer_Projects.csv")
-    print("  - Vessel_Quarterly_Pivot_2025.csv")
-    print("  - quarterly_breakdown_data.csv")
+    for record in published:
+        if record['link'] is not None:
+            print(f"  - {record['alias']}")
+    if not args.no_excel:
+        print(f"\nReview workbook:\n  - {workbook_output}")
+
+def source_signature(spec):
+    """(path, size, mtime_ns) of every file spec names; changes whenever one is saved."""
+    signature = []
+    for path in resolve_sources(spec):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+def watch(args):
+    """
+    Generate once, then again each time the source changes, until interrupted.
+
+    The files named by --source are polled with a stat call each, which works
+    on any filesystem (network shares included) without an inotify
+    dependency. After a change the run waits until the files have been
+    unchanged for --debounce seconds, so a spreadsheet writing its export in
+    several steps, or a burst of saves, triggers one run. Runs after the
+    first are incremental. A failed run is reported and watching goes on.
+    """
+    def run_watched():
+        try:
+            run_generator(args)
+        except (Exception, SystemExit) as exc:
+            print(f"\nERROR: regeneration failed: {exc!r}")
+    
+    signature = source_signature(args.source)
+    run_watched()
+    args.full = False
+    print(f"\nWatching {args.source} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(args.poll_interval)
+            current = source_signature(args.source)
+            if current == signature:
+                continue
+            # Debounce: wait until the files stop changing
+            settled_since = time.monotonic()
+            while time.monotonic() - settled_since < args.debounce:
+                time.sleep(min(args.poll_interval, args.debounce))
+                latest = source_signature(args.source)
+                if latest != current:
+                    current, settled_since = latest, time.monotonic()
+            # Taken before the run, so a save made during the run triggers another
+            signature = current
+            print(f"\n[{datetime.now():%H:%M:%S}] {args.source} changed, regenerating...")
+            run_watched()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+def run_generator(args):
+    """One generator run, profiled with --profile."""
+    if args.profile is None:
+        return generate(args)
+    
+    # Record every stage of the run; nested stages (e.g. parse inside stream)
+    # are also included in their parent's time
+    run = start_run('generate_csv_files', trace_memory=args.trace_memory)
+    try:
+        return generate(args)
+    finally:
+        records = finish_run(run, args.profile)
+        print(f"\nStage timings (appended to {args.profile}):")
+        for line in format_stage_table(records):
+            print(line)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        return watch(args)
+    return run_generator(args)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,199 @@
+"""
+Stage timing and memory instrumentation for the generator and dashboard.
+
+Code is split into named stages with the stage() context manager or the
+timed() decorator. Each stage produces a record with its wall time and,
+while tracemalloc is tracing, the peak memory allocated during the stage:
+
+    run = start_run('generate_csv_files', trace_memory=True)
+    with stage('load') as record:
+        df = read_source(path)
+        record['rows'] = len(df)
+    finish_run(run, 'generator_profile.jsonl')
+
+Records of a run are aggregated by stage name (a stage entered once per
+chunk reports its total time and call count) and written as JSON lines in
+the order the stages started, one per stage plus a 'total' line. A nested
+stage's time is also part of its parent's. Outside a run, stage() still
+times its block and returns the record, which is how the dashboard reports
+its sections.
+
+traced_cache() wraps a caching decorator such as st.cache_data so every call
+notes, on the innermost open stage, whether the cache was hit; note_cache()
+does the same for other caches.
+"""
+
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+# The run being recorded and the stages currently open, per thread of execution
+_active_run = ContextVar('active_run', default=None)
+_open_stages = ContextVar('open_stages', default=())
+
+# Set while a traced cache computes its value, so the caller sees a miss
+_cache_frames = ContextVar('cache_frames', default=())
+
+
+def start_run(name, trace_memory=False):
+    """Start recording stages under name; with trace_memory, stage peaks come from tracemalloc."""
+    run = {
+        'name': name,
+        'run_id': datetime.now().isoformat(timespec='seconds'),
+        'stages': {},
+        'started': time.perf_counter(),
+        'started_tracing': False,
+    }
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        run['started_tracing'] = True
+    run['token'] = _active_run.set(run)
+    return run
+
+
+def finish_run(run, path=None):
+    """
+    Stop recording and return the run's records in stage order, followed by
+    a 'total' record. With path, the records are appended to it as JSON lines.
+    """
+    total = {'stage': 'total', 'seconds': time.perf_counter() - run['started'], 'calls': 1}
+    if tracemalloc.is_tracing():
+        total['peak_bytes'] = max([r.get('peak_bytes', 0) for r in run['stages'].values()], default=0)
+    if run['started_tracing']:
+        tracemalloc.stop()
+    _active_run.reset(run['token'])
+
+    records = list(run['stages'].values()) + [total]
+    if path is not None:
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps({'run': run['name'], 'run_id': run['run_id'], **record}) + '\n')
+    return records
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Time the enclosed block as a stage and yield its record (a dict the block
+    may add fields to). Peak memory is recorded while tracemalloc is tracing.
+    """
+    record = {'stage': name, 'seconds': 0.0, 'calls': 1, **fields}
+    parents = _open_stages.get()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Fold the peak so far into the enclosing stage before resetting it
+        current, peak = tracemalloc.get_traced_memory()
+        if parents:
+            parents[-1]['_peak'] = max(parents[-1].get('_peak', 0), peak)
+        tracemalloc.reset_peak()
+        record['_baseline'] = current
+    token = _open_stages.set(parents + (record,))
+    run = _active_run.get()
+    if run is not None:
+        # Reserve the stage's place so records come out in the order stages start
+        run['stages'].setdefault(name, None)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        _open_stages.reset(token)
+        if tracing and tracemalloc.is_tracing():
+            peak = max(record.pop('_peak', 0), tracemalloc.get_traced_memory()[1])
+            record['peak_bytes'] = peak - record.pop('_baseline')
+            if parents:
+                parents[-1]['_peak'] = max(parents[-1].get('_peak', 0), peak)
+        _add_to_run(record)
+
+
+def _add_to_run(record):
+    run = _active_run.get()
+    if run is None:
+        return
+    previous = run['stages'].get(record['stage'])
+    if previous is None:
+        run['stages'][record['stage']] = dict(record)
+        return
+    # Repeated stage: accumulate time and calls, keep the highest peak
+    previous['seconds'] += record['seconds']
+    previous['calls'] += 1
+    if 'peak_bytes' in record:
+        previous['peak_bytes'] = max(previous.get('peak_bytes', 0), record['peak_bytes'])
+    for key, value in record.items():
+        if key == 'rows':
+            previous['rows'] = previous.get('rows', 0) + value
+        elif key not in ('stage', 'seconds', 'calls', 'peak_bytes'):
+            previous[key] = value
+
+
+def timed(name=None):
+    """Decorator form of stage(); the stage is named after the function by default."""
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_cache(cache, name=None):
+    """
+    Apply the caching decorator cache (e.g. st.cache_data) to a function and
+    note every call's outcome, 'hit' or 'miss', under record['caches'][name]
+    of the innermost open stage. A function called more than once in a stage
+    is reported as a miss if any call missed.
+    """
+    def decorate(func):
+        cache_name = name or func.__name__
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            # Only reached when the cache has no value for these arguments
+            frames = _cache_frames.get()
+            if frames:
+                frames[-1]['miss'] = True
+            return func(*args, **kwargs)
+        cached = cache(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            frame = {'miss': False}
+            token = _cache_frames.set(_cache_frames.get() + (frame,))
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                _cache_frames.reset(token)
+                note_cache(cache_name, 'miss' if frame['miss'] else 'hit')
+        call.clear = getattr(cached, 'clear', None)
+        return call
+    return decorate
+
+
+def note_cache(name, outcome):
+    """
+    Note a cache lookup's outcome, 'hit' or 'miss', under record['caches'][name]
+    of the innermost open stage, for caches traced_cache() cannot wrap. A miss
+    is kept over later hits in the same stage.
+    """
+    stages = _open_stages.get()
+    if stages:
+        caches = stages[-1].setdefault('caches', {})
+        if caches.get(name) != 'miss':
+            caches[name] = outcome
+
+
+def format_stage_table(records):
+    """Aligned text lines (stage, seconds, calls, peak MB, rows) for printing a run's records."""
+    lines = [f"  {'Stage':<24}{'Seconds':>10}{'Calls':>7}{'Peak MB':>10}{'Rows':>11}"]
+    for record in records:
+        peak = f"{record['peak_bytes'] / 1e6:.1f}" if 'peak_bytes' in record else '-'
+        rows = str(record['rows']) if 'rows' in record else '-'
+        lines.append(f"  {record['stage']:<24}{record['seconds']:>10.3f}{record['calls']:>7}{peak:>10}{rows:>11}")
+    return lines
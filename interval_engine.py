@@ -0,0 +1,222 @@
+"""
+Vectorized interval-overlap engine used by the CSV generator.
+
+All dates are handled as int64 day numbers (days since 1970-01-01) so that
+clipping, merging and allocation can run as NumPy array operations over every
+project and every period at once instead of row-by-row pandas loops.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def to_day_numbers(values):
+    """
+    Convert datetime-like values to int64 day numbers.
+
+    Returns a tuple (days, valid) where `valid` is False for NaT entries.
+    Invalid entries are set to 0 in `days` and must be masked by the caller.
+    """
+    dt = pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(dt)
+    days = np.zeros(len(dt), dtype=np.int64)
+    days[valid] = dt[valid].astype('datetime64[D]').astype(np.int64)
+    return days, valid
+
+
+def day_numbers_to_timestamps(days):
+    """Convert int64 day numbers back to a datetime64 array."""
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]')
+
+
+def clip_to_periods(starts, ends, period_starts, period_ends):
+    """
+    Clip every interval against every period in a single broadcast.
+
+    Returns (clip_starts, clip_ends, days), each of shape (n_intervals, n_periods).
+    `days` is the inclusive overlap length and is 0 where there is no overlap.
+    """
+    starts = np.asarray(starts, dtype=np.int64)[:, None]
+    ends = np.asarray(ends, dtype=np.int64)[:, None]
+    clip_starts = np.maximum(starts, np.asarray(period_starts, dtype=np.int64)[None, :])
+    clip_ends = np.minimum(ends, np.asarray(period_ends, dtype=np.int64)[None, :])
+    days = np.clip(clip_ends - clip_starts + 1, 0, None)
+    return clip_starts, clip_ends, days
+
+
+def expand_period_overlaps(starts, ends, period_starts, period_ends):
+    """
+    Expand every interval into the periods it overlaps.
+
+    Periods must be sorted and contiguous. Each interval touches a contiguous
+    span of periods, found with a binary search, so memory grows with the
+    number of actual overlaps rather than intervals x periods.
+
+    Returns (interval_idx, period_idx, clip_starts, clip_ends, days) as flat
+    arrays ordered by interval then period, containing only overlaps with days > 0.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    period_starts = np.asarray(period_starts, dtype=np.int64)
+    period_ends = np.asarray(period_ends, dtype=np.int64)
+
+    first = np.searchsorted(period_ends, starts, side='left')
+    last = np.searchsorted(period_starts, ends, side='right') - 1
+    counts = np.clip(last - first + 1, 0, None)
+
+    interval_idx = np.repeat(np.arange(len(starts)), counts)
+    span_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    period_idx = first[interval_idx] + span_offsets
+
+    clip_starts = np.maximum(starts[interval_idx], period_starts[period_idx])
+    clip_ends = np.minimum(ends[interval_idx], period_ends[period_idx])
+    days = clip_ends - clip_starts + 1
+
+    keep = days > 0
+    return interval_idx[keep], period_idx[keep], clip_starts[keep], clip_ends[keep], days[keep]
+
+
+def merge_intervals(groups, starts, ends):
+    """
+    Merge overlapping intervals independently within each group.
+
+    Intervals overlap when the next start is on or before the running end,
+    matching the original `merge_date_ranges` (kept in benchmark_pipeline.py).
+
+    Returns (run_groups, run_starts, run_ends) for the merged runs, sorted by
+    group and start.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(groups) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.lexsort((starts, groups))
+    g = groups[order]
+    s = starts[order]
+    e = ends[order]
+
+    # Running max of the end date within each group. Offsetting each group by a
+    # span larger than any date range keeps the cumulative max from leaking
+    # across group boundaries.
+    base = min(s.min(), e.min())
+    span = max(s.max(), e.max()) - base + 1
+    offset = g * span
+    running_end = np.maximum.accumulate(offset + (e - base)) - offset + base
+
+    new_run = np.ones(len(g), dtype=bool)
+    new_run[1:] = (g[1:] != g[:-1]) | (s[1:] > running_end[:-1])
+
+    run_first = np.flatnonzero(new_run)
+    run_last = np.r_[run_first[1:] - 1, len(g) - 1]
+    return g[run_first], s[run_first], running_end[run_last]
+
+
+def merged_days_by_group(groups, starts, ends, n_groups):
+    """Return the number of unique (merged) days per group as an int64 array."""
+    run_groups, run_starts, run_ends = merge_intervals(groups, starts, ends)
+    run_days = run_ends - run_starts + 1
+    return np.bincount(run_groups, weights=run_days, minlength=n_groups).astype(np.int64)
+
+
+def allocate_proportional(groups, days, unique_days, positions=None):
+    """
+    Distribute each group's merged days across its members in proportion to
+    their individual days.
+
+    Allocations are rounded half-to-even and any rounding error is added to the
+    first member (lowest `positions`) with the largest allocation, so each
+    group's allocations sum exactly to its merged days.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    unique_days = np.asarray(unique_days, dtype=np.int64)
+    if positions is None:
+        positions = np.arange(len(groups))
+    if len(groups) == 0:
+        return np.array([], dtype=np.int64)
+
+    n_groups = len(unique_days)
+    individual_totals = np.bincount(groups, weights=days, minlength=n_groups)
+    allocated = np.rint(unique_days[groups] * days / individual_totals[groups]).astype(np.int64)
+
+    shortfall = unique_days - np.bincount(groups, weights=allocated, minlength=n_groups).astype(np.int64)
+
+    # First member with the largest allocation in each group
+    order = np.lexsort((positions, -allocated, groups))
+    sorted_groups = groups[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    first_idx = order[is_first]
+    allocated[first_idx] += shortfall[groups[first_idx]]
+    return allocated
+
+
+ATTRIBUTION_POLICIES = ['equal', 'first']
+
+
+def attribute_days(groups, starts, ends, policy='equal', priorities=None, positions=None):
+    """
+    Attribute every day covered by each group's intervals to the intervals
+    active on it, with a sweep line over all groups at once.
+
+    policy 'equal': a day covered by k intervals counts 1/k for each of them.
+                    Returns float64 days.
+    policy 'first': a day goes to the active interval with the lowest
+                    priority (e.g. the project's mobilisation day), ties to
+                    the lowest position. Returns int64 days. Priorities must
+                    not decrease with start within a group, which holds for
+                    intervals clipped to a period from their mobilisation day.
+
+    Either way each group's attributed days add up to its merged days
+    (merged_days_by_group); a day is never counted twice or dropped.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if policy not in ATTRIBUTION_POLICIES:
+        raise ValueError(f"Unknown attribution policy '{policy}' (expected one of {ATTRIBUTION_POLICIES})")
+    if len(groups) == 0:
+        return np.array([], dtype=float if policy == 'equal' else np.int64)
+    if positions is None:
+        positions = np.arange(len(groups))
+
+    # Boundaries as one sorted key per (group, day): groups are laid out one
+    # after another on a single axis, spaced wider than any date range
+    base = starts.min()
+    span = ends.max() + 2 - base
+    start_keys = groups * span + (starts - base)
+    end_keys = groups * span + (ends + 1 - base)
+
+    if policy == 'equal':
+        # Number of active intervals on each elementary segment between
+        # consecutive boundaries, from the running sum of +1/-1 events
+        keys, inverse = np.unique(np.concatenate([start_keys, end_keys]), return_inverse=True)
+        deltas = np.bincount(inverse, weights=np.r_[np.ones(len(groups)), -np.ones(len(groups))],
+                             minlength=len(keys))
+        active = np.rint(np.cumsum(deltas))[:-1]
+        lengths = np.diff(keys)
+        # Each active interval gets an equal share of the segment's days; gaps
+        # between runs and the jump to the next group have no active intervals
+        shares = np.divide(lengths, active, out=np.zeros(len(lengths)), where=active > 0)
+        cumulative = np.r_[0.0, np.cumsum(shares)]
+        n = len(groups)
+        return cumulative[inverse[n:]] - cumulative[inverse[:n]]
+
+    # First wins: in priority order every interval owns the days after the
+    # furthest end reached by the intervals ranked before it in its group.
+    # Sorting by start first is the same ranking, since priorities follow
+    # starts, and it means every earlier interval covers up to its end from
+    # this start on. The group offsets keep the reach from leaking across groups.
+    if priorities is None:
+        priorities = starts
+    order = np.lexsort((positions, np.asarray(priorities, dtype=np.int64), starts, groups))
+    s = start_keys[order]
+    e = end_keys[order] - 1
+    previous_reach = np.r_[s[0] - 1, np.maximum.accumulate(e)[:-1]]
+    owned = np.clip(e - np.maximum(s - 1, previous_reach), 0, None)
+    days = np.empty(len(groups), dtype=np.int64)
+    days[order] = owned
+    return days
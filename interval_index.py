@@ -0,0 +1,122 @@
+"""
+Static interval index for "who was active" queries.
+
+A centered interval tree over inclusive [start, end] day numbers, flattened
+into NumPy arrays. Each node keeps the intervals that contain its center,
+once sorted by start and once by end, so a stabbing query takes a prefix of
+one list per level: O(log n) levels plus the k intervals reported. Small
+subtrees are stored as leaves and scanned directly.
+
+Range queries combine a stab at the window start with the intervals that
+start inside the window, found with a binary search over all starts.
+Intervals that end before they start (e.g. a demobilisation date typed
+before the mobilisation date) are never active and are left out of the
+index, as they are in the utilization table.
+"""
+
+import numpy as np
+
+# Subtrees with at most this many intervals become leaves
+LEAF_SIZE = 64
+
+
+def build_interval_index(starts, ends, leaf_size=LEAF_SIZE):
+    """
+    Build the index over intervals [starts[i], ends[i]] (inclusive day numbers).
+
+    Queries return positions i into the original arrays; intervals with
+    ends[i] < starts[i] are never returned.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    valid = np.flatnonzero(ends >= starts)
+
+    # One row per node: [center, left child, right child, offset, count, is_leaf]
+    nodes = [[0, -1, -1, 0, 0, 1]]
+    by_start, by_end = [], []
+    n_stored = 0
+
+    # Build iteratively: each entry is (node id, interval positions)
+    pending = [(0, valid)]
+    while pending:
+        node, ids = pending.pop()
+        if len(ids) <= leaf_size:
+            mid = ids
+        else:
+            # The median endpoint splits the intervals roughly in half
+            center = int(np.median(np.concatenate([starts[ids], ends[ids]])))
+            mid = ids[(starts[ids] <= center) & (ends[ids] >= center)]
+            nodes[node][0] = center
+            nodes[node][5] = 0
+            for side, child_ids in ((1, ids[ends[ids] < center]), (2, ids[starts[ids] > center])):
+                if len(child_ids):
+                    nodes[node][side] = len(nodes)
+                    pending.append((len(nodes), child_ids))
+                    nodes.append([0, -1, -1, 0, 0, 1])
+
+        nodes[node][3] = n_stored
+        nodes[node][4] = len(mid)
+        n_stored += len(mid)
+        by_start.append(mid[np.argsort(starts[mid], kind='stable')])
+        by_end.append(mid[np.argsort(-ends[mid], kind='stable')])
+
+    nodes = np.array(nodes, dtype=np.int64)
+    empty = np.array([], dtype=np.int64)
+    by_start = np.concatenate(by_start) if by_start else empty
+    by_end = np.concatenate(by_end) if by_end else empty
+    start_order = valid[np.argsort(starts[valid], kind='stable')]
+    return {
+        'starts': starts,
+        'ends': ends,
+        'center': nodes[:, 0],
+        'left': nodes[:, 1],
+        'right': nodes[:, 2],
+        'offset': nodes[:, 3],
+        'count': nodes[:, 4],
+        'leaf': nodes[:, 5].astype(bool),
+        'by_start': by_start,
+        'by_start_starts': starts[by_start],
+        'by_end': by_end,
+        'by_end_neg_ends': -ends[by_end],
+        'start_order': start_order,
+        'sorted_starts': starts[start_order],
+    }
+
+
+def stab(index, day):
+    """Positions of the intervals that contain `day`, in ascending order."""
+    found = []
+    node = 0 if len(index['start_order']) else -1
+    while node >= 0:
+        lo = index['offset'][node]
+        hi = lo + index['count'][node]
+        if index['leaf'][node]:
+            ids = index['by_start'][lo:hi]
+            found.append(ids[(index['starts'][ids] <= day) & (index['ends'][ids] >= day)])
+            break
+        center = index['center'][node]
+        if day < center:
+            # Everything here ends at or after the center, so only the start matters
+            n = np.searchsorted(index['by_start_starts'][lo:hi], day, side='right')
+            found.append(index['by_start'][lo:lo + n])
+            node = index['left'][node]
+        elif day > center:
+            n = np.searchsorted(index['by_end_neg_ends'][lo:hi], -day, side='right')
+            found.append(index['by_end'][lo:lo + n])
+            node = index['right'][node]
+        else:
+            found.append(index['by_start'][lo:hi])
+            break
+    if not found:
+        return np.array([], dtype=np.int64)
+    return np.sort(np.concatenate(found))
+
+
+def overlapping(index, first_day, last_day):
+    """Positions of the intervals that overlap [first_day, last_day], in ascending order."""
+    if last_day < first_day:
+        return np.array([], dtype=np.int64)
+    active_at_start = stab(index, first_day)
+    lo = np.searchsorted(index['sorted_starts'], first_day, side='right')
+    hi = np.searchsorted(index['sorted_starts'], last_day, side='right')
+    return np.sort(np.concatenate([active_at_start, index['start_order'][lo:hi]]))
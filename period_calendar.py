@@ -0,0 +1,110 @@
+"""
+Period calendar for utilization reporting.
+
+Builds contiguous year, quarter, month or ISO-week buckets across any range of
+years. Period bounds are inclusive int64 day numbers (days since 1970-01-01),
+the representation used by interval_engine.py.
+"""
+
+from datetime import date
+
+import numpy as np
+
+PERIOD_KINDS = ('year', 'quarter', 'month', 'week')
+
+PERIOD_ADJECTIVES = {
+    'year': 'Yearly',
+    'quarter': 'Quarterly',
+    'month': 'Monthly',
+    'week': 'Weekly',
+}
+
+# Column holding the period label in the per-project breakdown
+BREAKDOWN_COLUMNS = {
+    'year': 'Year',
+    'quarter': 'Quarter',
+    'month': 'Month',
+    'week': 'Week',
+}
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _iso_week_one_monday(year):
+    """Day number of the Monday that starts ISO week 1 of a year."""
+    jan4 = np.datetime64(f'{year}-01-04', 'D').astype(np.int64)
+    # 1970-01-01 was a Thursday, so Monday-based weekday is (day + 3) % 7
+    return jan4 - (jan4 + 3) % 7
+
+
+def build_periods(kind, start_year, end_year=None):
+    """
+    Build the periods of one kind covering start_year..end_year (inclusive).
+
+    Returns a dict with:
+      kind, start_year, end_year
+      range_label      - '2025' or '2024-2026', used in file names and headings
+      starts, ends     - inclusive int64 day numbers, contiguous and sorted
+      days             - length of each period in days
+      labels           - display labels ('Q1 2025', 'Jan 2025', '2025', '2025-W01')
+      column_labels    - pivot column prefixes; the year is dropped for
+                         quarters, months and weeks when the range is one year
+      breakdown_labels - labels for the breakdown ('Q1-2025', '2025-01', '2025', '2025-W01')
+      breakdown_column - name of the period column in the breakdown
+    """
+    if kind not in PERIOD_KINDS:
+        raise ValueError(f"Unknown period kind '{kind}'. Expected one of {PERIOD_KINDS}")
+    end_year = start_year if end_year is None else end_year
+    if end_year < start_year:
+        raise ValueError(f"End year {end_year} is before start year {start_year}")
+
+    single_year = start_year == end_year
+    if kind == 'week':
+        starts = np.arange(_iso_week_one_monday(start_year), _iso_week_one_monday(end_year + 1), 7)
+        ends = starts + 6
+        iso = [date.fromordinal(int(d) + 719163).isocalendar() for d in starts]
+        labels = [f'{y}-W{w:02d}' for y, w, _ in iso]
+        column_labels = [f'W{w:02d}' if single_year else f'{y}-W{w:02d}' for y, w, _ in iso]
+        breakdown_labels = labels
+    else:
+        step = {'year': 12, 'quarter': 3, 'month': 1}[kind]
+        months = np.arange(f'{start_year}-01', f'{end_year + 1}-01', step, dtype='datetime64[M]')
+        bounds = np.append(months, months[-1] + step).astype('datetime64[D]').astype(np.int64)
+        starts, ends = bounds[:-1], bounds[1:] - 1
+        years = months.astype('datetime64[Y]').astype(int) + 1970
+        month_idx = months.astype(int) % 12
+
+        if kind == 'year':
+            labels = [str(y) for y in years]
+            column_labels = labels
+            breakdown_labels = labels
+        elif kind == 'quarter':
+            quarters = month_idx // 3 + 1
+            labels = [f'Q{q} {y}' for q, y in zip(quarters, years)]
+            column_labels = [f'Q{q}' if single_year else f'Q{q} {y}' for q, y in zip(quarters, years)]
+            breakdown_labels = [f'Q{q}-{y}' for q, y in zip(quarters, years)]
+        else:
+            labels = [f'{MONTH_NAMES[m]} {y}' for m, y in zip(month_idx, years)]
+            column_labels = [MONTH_NAMES[m] if single_year else f'{MONTH_NAMES[m]} {y}'
+                             for m, y in zip(month_idx, years)]
+            breakdown_labels = [f'{y}-{m + 1:02d}' for m, y in zip(month_idx, years)]
+
+    return {
+        'kind': kind,
+        'start_year': start_year,
+        'end_year': end_year,
+        'range_label': str(start_year) if single_year else f'{start_year}-{end_year}',
+        'starts': np.asarray(starts, dtype=np.int64),
+        'ends': np.asarray(ends, dtype=np.int64),
+        'days': np.asarray(ends, dtype=np.int64) - np.asarray(starts, dtype=np.int64) + 1,
+        'labels': labels,
+        'column_labels': column_labels,
+        'breakdown_labels': breakdown_labels,
+        'breakdown_column': BREAKDOWN_COLUMNS[kind],
+    }
+
+
+def period_bounds_as_dates(periods):
+    """Return (starts, ends) of the periods as datetime64[D] arrays."""
+    return periods['starts'].astype('datetime64[D]'), periods['ends'].astype('datetime64[D]')
@@ -0,0 +1,147 @@
+"""
+Compact on-disk index of vessel busy days for swg_query.py.
+
+The generator folds every project into per-vessel merged busy runs (the same
+merging as the pivot, so overlapping projects count once) and writes them to
+swg_query_index.bin:
+
+    b'SWGQ' | uint32 version | uint32 header length | JSON header | padding to 8 bytes
+    int64 vessel_offsets[n_vessels + 1]   runs of vessel v are [offsets[v], offsets[v + 1])
+    int64 run_starts[n_runs]              first day of each run (days since 1970-01-01)
+    int64 run_ends[n_runs]                last day of each run, inclusive
+    int64 run_days[n_runs + 1]            running total of run lengths, starting at 0
+
+All arrays are little-endian. Within a vessel the runs are sorted and
+disjoint, so the busy days in any window come from two binary searches and
+the running total. Reading needs only the standard library (mmap, bisect),
+which keeps the query CLI free of NumPy and pandas imports.
+"""
+
+import json
+import mmap
+import struct
+import sys
+from bisect import bisect_left, bisect_right
+
+QUERY_INDEX_NAME = 'swg_query_index'
+QUERY_INDEX_FILE = f'{QUERY_INDEX_NAME}.bin'
+QUERY_INDEX_VERSION = 1
+MAGIC = b'SWGQ'
+
+# Day number of 1970-01-01 as a proleptic Gregorian ordinal
+EPOCH_ORDINAL = 719163
+
+
+def new_run_accumulator():
+    """Empty accumulator of merged busy runs, folded chunk by chunk."""
+    return {'vessels': {}, 'groups': [], 'starts': [], 'ends': []}
+
+
+def fold_runs(acc, vessels, starts, ends):
+    """
+    Fold projects (vessel names, start and end day numbers, all with valid
+    values) into the accumulator, re-merging with the runs folded so far so
+    its size stays bounded by the number of runs.
+    """
+    import numpy as np
+    import pandas as pd
+    from interval_engine import merge_intervals
+
+    local_codes, uniques = pd.factorize(np.asarray(vessels, dtype=object))
+    registry = acc['vessels']
+    codes = np.array([registry.setdefault(v, len(registry)) for v in uniques], dtype=np.int64)[local_codes]
+    groups, run_starts, run_ends = merge_intervals(
+        np.concatenate([np.asarray(acc['groups'], dtype=np.int64), codes]),
+        np.concatenate([np.asarray(acc['starts'], dtype=np.int64), starts]),
+        np.concatenate([np.asarray(acc['ends'], dtype=np.int64), ends]))
+    acc['groups'], acc['starts'], acc['ends'] = groups, run_starts, run_ends
+
+
+def fold_projects(acc, df):
+    """
+    Fold the projects of a prepared source frame (dates parsed) that have a
+    vessel and both dates. Projects that end before they start have no days,
+    as in the pivot, and are left out: the merged runs must stay sorted and
+    disjoint for the running day totals.
+    """
+    from interval_engine import to_day_numbers
+
+    starts, start_ok = to_day_numbers(df['Mobilisation Start'])
+    ends, end_ok = to_day_numbers(df['Demobilisation End'])
+    vessels = df['Vessel'].astype(object)
+    keep = (start_ok & end_ok & (ends >= starts) & vessels.notna().to_numpy()).nonzero()[0]
+    fold_runs(acc, vessels.to_numpy()[keep], starts[keep], ends[keep])
+
+
+def write_query_index(path, acc, meta):
+    """Write the accumulated runs, with vessels in sorted order, and meta (a JSON-able dict) to path."""
+    import numpy as np
+
+    names = sorted(acc['vessels'], key=str)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[[acc['vessels'][name] for name in names]] = np.arange(len(names))
+    groups = rank[np.asarray(acc['groups'], dtype=np.int64)]
+    order = np.lexsort((np.asarray(acc['starts'], dtype=np.int64), groups))
+    starts = np.asarray(acc['starts'], dtype='<i8')[order]
+    ends = np.asarray(acc['ends'], dtype='<i8')[order]
+    offsets = np.r_[0, np.cumsum(np.bincount(groups, minlength=len(names)))].astype('<i8')
+    run_days = np.r_[0, np.cumsum(ends - starts + 1)].astype('<i8')
+
+    header = json.dumps({**meta, 'vessels': [str(name) for name in names], 'n_runs': len(starts)}).encode()
+    prefix = MAGIC + struct.pack('<II', QUERY_INDEX_VERSION, len(header)) + header
+    with open(path, 'wb') as f:
+        f.write(prefix + b'\0' * (-len(prefix) % 8))
+        for array in (offsets, starts, ends, run_days):
+            f.write(array.tobytes())
+
+
+def read_query_index(path=QUERY_INDEX_FILE):
+    """
+    Map an index file and return its header with the arrays as int64
+    sequences ('offsets', 'starts', 'ends', 'run_days'). Raises ValueError
+    for a file that is not a query index of this version.
+    """
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a query index")
+    version, header_length = struct.unpack_from('<II', data, 4)
+    if version != QUERY_INDEX_VERSION:
+        raise ValueError(f"{path} has index version {version}, expected {QUERY_INDEX_VERSION}; "
+                         "rerun generate_csv_files.py")
+    index = json.loads(data[12:12 + header_length])
+    position = 12 + header_length
+    position += -position % 8
+    view = memoryview(data)
+    for name, length in (('offsets', len(index['vessels']) + 1), ('starts', index['n_runs']),
+                         ('ends', index['n_runs']), ('run_days', index['n_runs'] + 1)):
+        block = view[position:position + 8 * length]
+        if sys.byteorder == 'little':
+            index[name] = block.cast('q')
+        else:
+            from array import array
+            values = array('q', block)
+            values.byteswap()
+            index[name] = values
+        position += 8 * length
+    return index
+
+
+def busy_days(index, vessel_position, first_day, last_day):
+    """Busy (project) days of a vessel between first_day and last_day inclusive, as day numbers."""
+    lo, hi = index['offsets'][vessel_position], index['offsets'][vessel_position + 1]
+    starts, ends = index['starts'], index['ends']
+    # Runs ending on or after the first day and starting on or before the last
+    first = bisect_left(ends, first_day, lo, hi)
+    last = bisect_right(starts, last_day, lo, hi)
+    if first >= last:
+        return 0
+    days = index['run_days'][last] - index['run_days'][first]
+    # Trim the parts of the outer runs that fall outside the window
+    days -= max(0, first_day - starts[first])
+    days -= max(0, ends[last - 1] - last_day)
+    return days
+
+
+def day_number(date):
+    return date.toordinal() - EPOCH_ORDINAL
@@ -0,0 +1,123 @@
+"""
+Streaming export of the review workbook (Quarterly_Review_Breakdown.xlsx).
+
+The workbook is written with openpyxl's write-only mode: rows go straight
+from the pivot and breakdown columns to the sheet XML as they are appended,
+without building an in-memory cell model. Memory stays flat however many
+rows the breakdown has.
+
+Sheets, for a quarterly run over 2025:
+    Quarterly Breakdown          one row per project and quarter (the breakdown CSV)
+    Quarterly Summary            totals per quarter across the fleet
+    Vessel Quarterly 2025        one row per vessel and quarter with days worked
+    Vessel Quarterly Pivot 2025  the vessel pivot (the pivot CSV)
+"""
+
+import numpy as np
+import pandas as pd
+
+from period_calendar import PERIOD_ADJECTIVES
+
+# Excel's limit, header row included; longer breakdowns continue on extra sheets
+MAX_SHEET_ROWS = 1048576
+
+# Excel's limit on sheet titles
+MAX_TITLE_LENGTH = 31
+
+
+def workbook_name(periods):
+    """
+    Base name of the review workbook. The default 2025 quarterly run keeps the
+    historical Quarterly_Review_Breakdown name.
+    """
+    adjective = PERIOD_ADJECTIVES[periods['kind']]
+    name = f"{adjective}_Review_Breakdown"
+    if (periods['kind'], periods['range_label']) != ('quarter', '2025'):
+        name += f"_{periods['range_label']}"
+    return name
+
+
+def _sheet_title(title):
+    # Multi-year ranges can push the vessel sheet titles past Excel's limit
+    if len(title) > MAX_TITLE_LENGTH and title.startswith('Vessel '):
+        title = title[len('Vessel '):]
+    return title[:MAX_TITLE_LENGTH]
+
+
+def _cells(values):
+    """Column values as Python objects, with missing values as empty cells."""
+    values = np.asarray(values, dtype=object)
+    values[pd.isna(values)] = None
+    return values.tolist()
+
+
+def _append_rows(workbook, title, header, columns):
+    """Write columns (equal-length arrays) as rows, continuing on new sheets past the row limit."""
+    rows = zip(*[_cells(col) for col in columns])
+    n_rows = len(columns[0]) if columns else 0
+    per_sheet = MAX_SHEET_ROWS - 1
+    n_sheets = max(1, -(-n_rows // per_sheet))
+    for part in range(n_sheets):
+        sheet_title = title if part == 0 else f"{title[:MAX_TITLE_LENGTH - 4]} ({part + 1})"
+        sheet = workbook.create_sheet(_sheet_title(sheet_title))
+        sheet.append(header)
+        for _ in range(min(per_sheet, n_rows - part * per_sheet)):
+            sheet.append(next(rows))
+
+
+def write_review_workbook(path, vessel_pivot_df, breakdown_df, periods):
+    """
+    Write the review workbook for one reporting range.
+
+    vessel_pivot_df and breakdown_df are the generator's outputs; the summary
+    and long-format vessel sheets are derived from their columns as arrays.
+    """
+    # Imported here so the generator and dashboard don't pay for openpyxl
+    # unless a workbook is written
+    from openpyxl import Workbook
+
+    adjective = PERIOD_ADJECTIVES[periods['kind']]
+    period_column = periods['breakdown_column']
+    labels = np.array(periods['breakdown_labels'], dtype=object)
+    n_periods = len(labels)
+
+    # Pivot columns as (vessels, periods) matrices
+    def pivot_matrix(suffix):
+        cols = [f"{label} {suffix}" for label in periods['column_labels']]
+        return vessel_pivot_df[cols].to_numpy(dtype=float).reshape(len(vessel_pivot_df), n_periods)
+    days = pivot_matrix('Days')
+    rates = pivot_matrix('Avg Day Rate')
+    costs = pivot_matrix('Total Cost')
+    revenue = pivot_matrix('Revenue')
+    vessels = vessel_pivot_df['Vessel'].to_numpy(dtype=object)
+
+    # Breakdown rows per period, for the summary's project counts
+    breakdown_periods = pd.Index(labels).get_indexer(breakdown_df[period_column])
+    projects_per_period = np.bincount(breakdown_periods[breakdown_periods >= 0], minlength=n_periods)
+
+    workbook = Workbook(write_only=True)
+
+    _append_rows(workbook, f"{adjective} Breakdown", list(breakdown_df.columns),
+                 [breakdown_df[col].to_numpy() for col in breakdown_df.columns])
+
+    # Fleet totals per period; the average day rate is weighted by days worked
+    total_days = days.sum(axis=0)
+    total_costs = costs.sum(axis=0)
+    avg_rates = np.divide((rates * days).sum(axis=0), total_days, out=np.zeros(n_periods), where=total_days > 0)
+    _append_rows(workbook, f"{adjective} Summary",
+                 [period_column, f"Total Days in {period_column}", 'Active Projects', 'Active Vessels',
+                  'Avg. Day Rate', 'Total Cost', 'Total Revenue'],
+                 [labels, total_days.astype(np.int64), projects_per_period, (days > 0).sum(axis=0),
+                  avg_rates, total_costs, revenue.sum(axis=0)])
+
+    # Long format: one row per vessel and period the vessel worked in, vessel by vessel
+    vessel_idx, period_idx = np.nonzero(days > 0)
+    _append_rows(workbook, f"Vessel {adjective} {periods['range_label']}",
+                 ['Vessel', period_column, 'Days', 'Avg Day Rate', 'Total Cost', 'Total Revenue'],
+                 [vessels[vessel_idx], labels[period_idx], days[vessel_idx, period_idx].astype(np.int64),
+                  rates[vessel_idx, period_idx], costs[vessel_idx, period_idx], revenue[vessel_idx, period_idx]])
+
+    _append_rows(workbook, f"Vessel {adjective} Pivot {periods['range_label']}", list(vessel_pivot_df.columns),
+                 [vessel_pivot_df[col].to_numpy() for col in vessel_pivot_df.columns])
+
+    workbook.save(path)
@@ -0,0 +1,333 @@
+"""
+Monte Carlo schedule risk for fleet utilization.
+
+Each scenario lets every project's phases (the generator's "Mobilization
+(days)" ... "Demobilization (days)" columns) run late by a sampled slip.
+A project's slips add up and push its demobilisation back. The vessel
+cannot start its next project before it is free, so a slip also pushes
+later projects on the same vessel, less any idle days between them. Busy
+days are then merged per vessel and quarter, as in the utilization table,
+and read off as utilization percentiles across scenarios.
+
+Slips are drawn as fractions of each phase's own length, either:
+
+- configured: a triangular (low, most likely, high) distribution per phase
+  (DEFAULT_PHASE_SLIPS), or
+- empirical: resampled from how far each phase ran past its median length
+  across the simulated projects.
+
+Every step works on (scenario, vessel, project) NumPy arrays. The
+push-back along a vessel's projects is a Lindley recurrence, solved with a
+cumulative sum and a running minimum, so no step loops over scenarios or
+projects. Scenarios are processed in batches to bound memory.
+
+    index = build_vessel_index(df)
+    risk = simulate_utilization(index, phase_lengths(df, index['row']), build_periods('quarter', 2025))
+    table = risk_table(risk, periods)
+"""
+
+import numpy as np
+import pandas as pd
+
+from source_schema import PHASE_COLUMNS
+from interval_engine import to_day_numbers
+
+DEFAULT_SCENARIOS = 10_000
+
+# Utilization percentiles reported per vessel and period
+PERCENTILES = [10, 50, 90]
+
+# Slip of each phase as a fraction of its length, as a triangular
+# (low, most likely, high) distribution. Production carries weather and
+# equipment downtime; the transit and deployment phases usually run to plan
+# but can overrun badly.
+DEFAULT_PHASE_SLIPS = {
+    'Mobilization (days)': (0.0, 0.0, 0.5),
+    'Deployment (days)': (0.0, 0.0, 0.5),
+    'Production (days)': (0.0, 0.05, 0.3),
+    'Recovery (days)': (0.0, 0.0, 0.5),
+    'Demobilization (days)': (0.0, 0.0, 0.5),
+}
+
+DISTRIBUTIONS = ['configured', 'empirical']
+
+# Array cells (scenarios x vessels x projects) per batch, about 16 MB per
+# int32 array
+MAX_BATCH_CELLS = 4_000_000
+
+
+def phase_lengths(df, rows):
+    """
+    Days of each phase (columns in PHASE_COLUMNS order) of the projects at
+    positional rows of df. Uses the phase columns when df has them (e.g. the
+    enhanced file) and the phase dates otherwise. Missing or negative
+    lengths are 0, so the phase never slips.
+    """
+    lengths = np.zeros((len(rows), len(PHASE_COLUMNS)))
+    for i, (phase, (first, last)) in enumerate(PHASE_COLUMNS.items()):
+        if phase in df.columns:
+            days = df[phase].to_numpy(dtype=float)[rows]
+        else:
+            first_days, first_ok = to_day_numbers(df[first])
+            last_days, last_ok = to_day_numbers(df[last])
+            days = np.where(first_ok & last_ok, last_days - first_days, np.nan)[rows]
+        lengths[:, i] = np.nan_to_num(np.maximum(days, 0))
+    return lengths
+
+
+def empirical_slip_fractions(lengths):
+    """
+    Observed overruns per phase, as fractions: how far each project's phase
+    ran past the median length of that phase (0 when shorter). Phases no
+    project has give [0.0].
+    """
+    fractions = []
+    for column in lengths.T:
+        observed = column[column > 0]
+        if len(observed) == 0:
+            fractions.append(np.zeros(1))
+            continue
+        fractions.append(np.maximum(observed / np.median(observed) - 1, 0))
+    return fractions
+
+
+def triangular_fractions(rng, low, mode, high, size):
+    """
+    Triangular (low, mode, high) samples by inverse transform of float32
+    uniforms, which is several times faster than Generator.triangular.
+    """
+    if high <= low:
+        return np.full(size, low, dtype=np.float32)
+    u = rng.random(size, dtype=np.float32)
+    split = (mode - low) / (high - low)
+    rising = low + np.sqrt(u * np.float32((high - low) * (mode - low)))
+    falling = high - np.sqrt((1 - u) * np.float32((high - low) * (high - mode)))
+    return np.where(u < split, rising, falling)
+
+
+def sample_slips(lengths, n_scenarios, rng, distribution='configured', phase_slips=DEFAULT_PHASE_SLIPS,
+                 empirical=None):
+    """
+    Total slip in whole days of every project, shape (n_scenarios, n_projects).
+
+    Each phase slips by a sampled fraction of its length; see the module
+    docstring for the distributions. empirical is the output of
+    empirical_slip_fractions (computed from lengths when not given).
+    """
+    if distribution == 'empirical' and empirical is None:
+        empirical = empirical_slip_fractions(lengths)
+    size = (n_scenarios, len(lengths))
+    slips = np.zeros(size, dtype=np.float32)
+    for i, phase in enumerate(PHASE_COLUMNS):
+        phase_lengths = lengths[:, i].astype(np.float32)
+        if distribution == 'empirical':
+            fractions = empirical[i].astype(np.float32)
+            if not fractions.any():
+                continue
+            slips += fractions[rng.integers(len(fractions), size=size, dtype=np.int32)] * phase_lengths
+        else:
+            low, mode, high = phase_slips[phase]
+            if high == 0:
+                continue
+            slips += triangular_fractions(rng, low, mode, high, size) * phase_lengths
+    return np.rint(slips).astype(np.int32)
+
+
+def max_slips(lengths, distribution='configured', phase_slips=DEFAULT_PHASE_SLIPS, empirical=None):
+    """Upper bound, in days, of the slip sample_slips can draw for each project."""
+    if distribution == 'empirical':
+        highs = np.array([fractions.max() for fractions in empirical])
+    else:
+        highs = np.array([phase_slips[phase][2] for phase in PHASE_COLUMNS])
+    return np.ceil(lengths @ highs).astype(np.int64)
+
+
+def _plan_grid(index, positions):
+    """
+    Lay the index projects at positions (in index order) out as (vessel,
+    rank) arrays, rank being the position among the vessel's projects by
+    start date. Returns (vessel, rank, starts, ends, slack), where starts,
+    ends and slack (idle days after the previous project) are int64 grids;
+    empty slots end the day before they start.
+    """
+    vessel = index['vessel'][positions]
+    # The index is sorted by vessel then start, so ranks count up within each vessel
+    rank = np.arange(len(positions)) - np.searchsorted(vessel, vessel, side='left')
+    shape = (len(index['vessel_order']), int(rank.max()) + 1 if len(positions) else 0)
+    starts = np.zeros(shape, dtype=np.int64)
+    ends = np.full(shape, -1, dtype=np.int64)
+    starts[vessel, rank] = index['start'][positions]
+    ends[vessel, rank] = index['end'][positions]
+    slack = np.zeros(shape, dtype=np.int64)
+    slack[:, 1:] = np.maximum(starts[:, 1:] - ends[:, :-1] - 1, 0)
+    slack[ends < starts] = 0
+    return vessel, rank, starts, ends, slack
+
+
+def relevant_projects(index, max_slip, first_day, last_day):
+    """
+    Positions of the index projects whose slips can change utilization
+    between first_day and last_day.
+
+    Slips only push work later, so projects starting after last_day are
+    left out. Before the range, a vessel's history is cut at its last project
+    that even the largest slips (max_slip, per index project) cannot push
+    back, provided nothing before that project can reach first_day: the
+    push-back chain restarts there in every scenario.
+    """
+    positions = np.flatnonzero(index['start'] <= last_day)
+    if len(positions) == 0:
+        return positions
+    vessel, rank, starts, ends, slack = _plan_grid(index, positions)
+    worst_slips = np.zeros_like(starts)
+    worst_slips[vessel, rank] = max_slip[positions]
+    worst_pushes = knock_on_delays(slack, worst_slips)
+    reaches = (ends + worst_pushes + worst_slips >= first_day) & (ends >= starts)
+    # First project of each vessel that may run into the range (or past the last rank)
+    first_reach = np.where(reaches.any(axis=1), reaches.argmax(axis=1), reaches.shape[1])
+    ranks = np.arange(starts.shape[1])
+    restarts = (worst_pushes == 0) & (ranks <= first_reach[:, None])
+    cut = restarts.shape[1] - 1 - restarts[:, ::-1].argmax(axis=1) if restarts.size else np.zeros(0, dtype=int)
+    return positions[rank >= cut[vessel]]
+
+
+def knock_on_delays(slack, slips):
+    """
+    Days each project is pushed back by the slips of the projects before it
+    on its vessel.
+
+    slack (vessels, ranks) is the idle days between a project and the one
+    before it (0 for the first project, or when they overlap); slips
+    (scenarios, vessels, ranks) is each project's own slip. The push of
+    project k is max(0, push[k-1] + slip[k-1] - slack[k]), a Lindley
+    recurrence, whose solution is S[k] - min(S[0..k]) for the running sum S
+    of slip[k-1] - slack[k] (S[0] = 0).
+    """
+    steps = np.zeros_like(slips)
+    steps[..., 1:] = slips[..., :-1] - slack[:, 1:]
+    totals = np.cumsum(steps, axis=-1)
+    return totals - np.minimum.accumulate(totals, axis=-1)
+
+
+def busy_days(starts, ends, period_starts, period_ends):
+    """
+    Merged busy days per vessel and period of intervals laid out as
+    (..., vessels, ranks) arrays sorted by start along the last axis (empty
+    slots end before they start). Returns (..., vessels, periods).
+    """
+    n_periods = len(period_starts)
+    if starts.shape[-1] == 0:
+        return np.zeros(starts.shape[:-1] + (n_periods,), dtype=np.int64)
+
+    # With starts sorted, an interval only adds the days after the latest end
+    # before it. Those new parts are disjoint and in day order along each row.
+    reached = np.maximum.accumulate(ends, axis=-1)
+    first_new = np.empty_like(starts)
+    first_new[..., 0] = starts[..., 0]
+    first_new[..., 1:] = np.maximum(starts[..., 1:], reached[..., :-1] + 1)
+    # Empty parts keep the order too, so the rows stay sorted for the search
+    first_new = np.maximum.accumulate(first_new, axis=-1)
+    new_days = np.maximum(ends - first_new + 1, 0)
+
+    # Busy days up to a day: the parts that start by then, found by binary
+    # search over every row at once (each row offset into its own day span)
+    n_rows, n_ranks = int(np.prod(starts.shape[:-1])), starts.shape[-1]
+    first_new = first_new.reshape(n_rows, n_ranks).astype(np.int64)
+    ends = ends.reshape(n_rows, n_ranks)
+    covered = np.cumsum(new_days.reshape(n_rows, n_ranks), axis=-1, dtype=np.int64)
+    bounds = np.concatenate([period_starts - 1, period_ends]).astype(np.int64)
+    low = min(first_new.min(initial=0), bounds.min())
+    span = max(first_new.max(initial=0), bounds.max()) - low + 1
+    offsets = np.arange(n_rows, dtype=np.int64)[:, None] * span
+    found = np.searchsorted((first_new - low + offsets).ravel(), (bounds - low + offsets).ravel(), side='right') - 1
+    found = found.reshape(n_rows, len(bounds))
+    row_first = np.arange(n_rows)[:, None] * n_ranks
+    valid = found >= row_first
+    found = np.where(valid, found, 0)
+    partial = np.maximum(np.minimum(ends.ravel()[found], bounds) - first_new.ravel()[found] + 1, 0)
+    before = covered.ravel()[found] - new_days.ravel()[found]
+    upto = np.where(valid, before + partial, 0)
+
+    days = upto[:, n_periods:] - upto[:, :n_periods]
+    return days.reshape(starts.shape[:-1] + (n_periods,))
+
+
+def simulate_utilization(index, lengths, periods, n_scenarios=DEFAULT_SCENARIOS, distribution='configured',
+                         seed=0, percentiles=PERCENTILES, phase_slips=DEFAULT_PHASE_SLIPS):
+    """
+    Run n_scenarios slip scenarios over the projects of a vessel index
+    (dashboard_data.build_vessel_index; lengths from phase_lengths for its
+    'row's) and measure utilization in each period.
+
+    Returns a dict with:
+      vessel_order - the index's vessels
+      baseline     - utilization (%) of the plan, shape (vessels, periods)
+      percentiles  - {p: utilization (%) of shape (vessels, periods)}
+      mean_slip    - mean total slip per project and scenario, in days
+    """
+    rng = np.random.default_rng(seed)
+    period_starts = periods['starts'].astype(np.int64)
+    period_ends = periods['ends'].astype(np.int64)
+    period_days = periods['days'].astype(float)
+
+    # Every slip distribution is fixed by all the index projects, then only
+    # the projects that can affect the range are simulated
+    empirical = empirical_slip_fractions(lengths) if distribution == 'empirical' else None
+    positions = relevant_projects(index, max_slips(lengths, distribution, phase_slips, empirical),
+                                  period_starts[0], period_ends[-1])
+    if len(positions) == 0:
+        # No project starts by the end of the range: every vessel is idle in
+        # every scenario
+        zeros = np.zeros((len(index['vessel_order']), len(period_starts)))
+        return {'vessel_order': list(index['vessel_order']), 'baseline': zeros,
+                'percentiles': {p: zeros.copy() for p in percentiles}, 'mean_slip': 0.0}
+    lengths = lengths[positions]
+    vessel, rank, starts, ends, slack = _plan_grid(index, positions)
+
+    # Day numbers from the start of the range fit in int32, halving memory
+    origin = period_starts[0]
+    starts, ends, slack = (starts - origin).astype(np.int32), (ends - origin).astype(np.int32), slack.astype(np.int32)
+    period_starts = (period_starts - origin).astype(np.int32)
+    period_ends = (period_ends - origin).astype(np.int32)
+    empty = ends < starts
+    # Mean slip is reported over the projects planned in the range
+    planned = ((ends >= 0) & (starts <= period_ends[-1]) & ~empty)[vessel, rank]
+
+    baseline = busy_days(starts, ends, period_starts, period_ends) / period_days * 100
+
+    shape = starts.shape
+    batch_size = max(1, MAX_BATCH_CELLS // max(1, starts.size))
+    utilization = np.empty((n_scenarios, shape[0], len(period_starts)))
+    slip_total = 0.0
+    for batch in range(0, n_scenarios, batch_size):
+        n_batch = min(batch_size, n_scenarios - batch)
+        project_slips = sample_slips(lengths, n_batch, rng, distribution, phase_slips, empirical)
+        slips = np.zeros((n_batch,) + shape, dtype=np.int32)
+        slips[:, vessel, rank] = project_slips
+        pushes = knock_on_delays(slack, slips)
+        new_starts = starts + pushes
+        new_ends = ends + pushes + slips
+        new_ends[:, empty] = -1
+        utilization[batch:batch + n_batch] = (busy_days(new_starts, new_ends, period_starts, period_ends)
+                                              / period_days * 100)
+        slip_total += project_slips[:, planned].sum()
+
+    return {
+        'vessel_order': list(index['vessel_order']),
+        'baseline': baseline,
+        'percentiles': dict(zip(percentiles, np.percentile(utilization, percentiles, axis=0))),
+        'mean_slip': slip_total / max(1, n_scenarios * int(planned.sum())),
+    }
+
+
+def risk_table(risk, periods):
+    """
+    Wide table of a simulation: per vessel, the planned utilization and each
+    percentile per period (e.g. 'Q1 Plan %', 'Q1 P10 %', 'Q1 P50 %', 'Q1 P90 %').
+    """
+    table = {'Vessel Name': risk['vessel_order']}
+    for p, period_name in enumerate(periods['column_labels']):
+        table[f'{period_name} Plan %'] = np.round(risk['baseline'][:, p], 1)
+        for percentile, values in risk['percentiles'].items():
+            table[f'{period_name} P{percentile} %'] = np.round(values[:, p], 1)
+    return pd.DataFrame(table)
@@ -0,0 +1,195 @@
+"""
+Typed on-disk snapshots of parsed source frames.
+
+Parsing the source CSV (string cleanup plus date inference) is the slowest
+part of a dashboard cold start, and st.cache_data only lives as long as the
+server process. This module stores the parsed, typed frame next to the data
+as Parquet (or, without pyarrow, as a pickle-free NumPy .npz archive) and
+serves it again as long as the source file has not changed.
+
+A snapshot is keyed by the source file's size, mtime and SHA-256: an
+unchanged mtime and size is trusted without hashing, and a touched but
+byte-identical file is re-validated by hash instead of re-parsed.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from source_manifest import file_sha256
+
+SNAPSHOT_DIR = '.snapshot_cache'
+
+# Bumped whenever the parsed frame changes shape, so older snapshots are re-parsed
+SNAPSHOT_VERSION = 2
+
+try:
+    import pyarrow  # noqa: F401 - only needed for Parquet snapshots
+    SNAPSHOT_FORMAT = 'parquet'
+except ImportError:
+    SNAPSHOT_FORMAT = 'npz'
+
+
+def _snapshot_paths(source_path, cache_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0].replace(' ', '_')
+    return (os.path.join(cache_dir, f'{stem}.{SNAPSHOT_FORMAT}'),
+            os.path.join(cache_dir, f'{stem}.json'))
+
+
+def _source_key(source_path):
+    stat = os.stat(source_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def source_version(source_path):
+    """
+    Cheap version token for a source file, (size, mtime_ns). Changes whenever
+    the file is rewritten, so it can key in-process caches of derived data.
+    """
+    key = _source_key(source_path)
+    return key['size'], key['mtime_ns']
+
+
+def source_fingerprint(source_path, cache_dir=SNAPSHOT_DIR):
+    """
+    SHA-256 of a source file's content, for keys that must survive a server
+    restart. Taken from the snapshot's metadata while the file's size and
+    mtime still match it, so an unchanged file is not hashed again.
+    """
+    _, meta_path = _snapshot_paths(source_path, cache_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        key = _source_key(source_path)
+        if key['size'] == meta['size'] and key['mtime_ns'] == meta['mtime_ns']:
+            return meta['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+    return file_sha256(source_path)
+
+
+def _write_npz(df, path):
+    """Save a frame as an .npz archive without pickled objects."""
+    arrays = {'__columns__': np.array(df.columns, dtype=str)}
+    kinds = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            kinds.append(f'datetime:{series.dtype}')
+            arrays[f'col_{i}'] = series.to_numpy().view(np.int64)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # Categories as strings plus int codes (-1 for missing)
+            kinds.append('category')
+            arrays[f'col_{i}'] = series.cat.categories.astype(str).to_numpy(dtype=str)
+            arrays[f'codes_{i}'] = series.cat.codes.to_numpy(dtype=np.int64)
+        elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            kinds.append('numeric')
+            arrays[f'col_{i}'] = series.to_numpy()
+        else:
+            kinds.append('string')
+            missing = series.isna().to_numpy()
+            arrays[f'col_{i}'] = np.where(missing, '', series.astype(str).to_numpy(dtype=object)).astype(str)
+            arrays[f'mask_{i}'] = missing
+    arrays['__kinds__'] = np.array(kinds, dtype=str)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _read_npz(path):
+    with np.load(path, allow_pickle=False) as data:
+        columns = data['__columns__'].tolist()
+        kinds = data['__kinds__'].tolist()
+        frame = {}
+        for i, (col, kind) in enumerate(zip(columns, kinds)):
+            values = data[f'col_{i}']
+            if kind.startswith('datetime:'):
+                frame[col] = values.view(kind.split(':', 1)[1])
+            elif kind == 'numeric':
+                frame[col] = values
+            elif kind == 'category':
+                frame[col] = pd.Categorical.from_codes(data[f'codes_{i}'], pd.Index(values, dtype='str'))
+            else:
+                frame[col] = pd.Series(values, dtype='str').mask(data[f'mask_{i}'])
+    return pd.DataFrame(frame, columns=columns)
+
+
+def save_snapshot(df, source_path, source_key=None, source_sha256=None, cache_dir=SNAPSHOT_DIR):
+    """
+    Store a parsed frame as the snapshot for source_path.
+
+    Pass the key and hash captured before parsing so an edit made while
+    parsing is never recorded as matching the snapshot.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = _snapshot_paths(source_path, cache_dir)
+
+    # Write to temporary files first so a reader never sees a half-written snapshot
+    tmp_data = f'{data_path}.tmp'
+    if SNAPSHOT_FORMAT == 'parquet':
+        df.to_parquet(tmp_data, index=False)
+    else:
+        _write_npz(df, tmp_data)
+    os.replace(tmp_data, data_path)
+
+    meta = dict(source_key or _source_key(source_path),
+                sha256=source_sha256 or file_sha256(source_path),
+                format=SNAPSHOT_FORMAT,
+                version=SNAPSHOT_VERSION)
+    with open(f'{meta_path}.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(f'{meta_path}.tmp', meta_path)
+
+
+def load_snapshot(source_path, cache_dir=SNAPSHOT_DIR):
+    """
+    Return the snapshot for source_path if it matches the current file, else None.
+    """
+    data_path, meta_path = _snapshot_paths(source_path, cache_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (meta.get('format') != SNAPSHOT_FORMAT or meta.get('version') != SNAPSHOT_VERSION
+            or not os.path.exists(data_path)):
+        return None
+
+    key = _source_key(source_path)
+    if key['size'] != meta['size']:
+        return None
+    if key['mtime_ns'] != meta['mtime_ns']:
+        # Touched but possibly unchanged: confirm by content hash
+        if file_sha256(source_path) != meta['sha256']:
+            return None
+        meta.update(key)
+        try:
+            with open(f'{meta_path}.tmp', 'w') as f:
+                json.dump(meta, f)
+            os.replace(f'{meta_path}.tmp', meta_path)
+        except OSError:
+            pass
+
+    if SNAPSHOT_FORMAT == 'parquet':
+        return pd.read_parquet(data_path)
+    return _read_npz(data_path)
+
+
+def load_cached_frame(source_path, parse_func, cache_dir=SNAPSHOT_DIR):
+    """
+    Return parse_func(source_path), served from the on-disk snapshot when the
+    source is unchanged and refreshed otherwise.
+    """
+    df = load_snapshot(source_path, cache_dir)
+    if df is not None:
+        return df
+    source_key = _source_key(source_path)
+    source_sha256 = file_sha256(source_path)
+    df = parse_func(source_path)
+    try:
+        save_snapshot(df, source_path, source_key, source_sha256, cache_dir)
+    except OSError:
+        # A read-only deployment still works, it just parses on every cold start
+        pass
+    return df
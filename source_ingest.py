@@ -0,0 +1,151 @@
+"""
+Several source trackers read as one.
+
+Competitor and regional trackers are kept as separate CSV exports with the
+same columns as "Streamer Projects - SWG - AI.csv". The generator's
+--source takes a file, a directory (every *.csv in it) or a glob, and this
+module turns the files it names into one raw text frame:
+
+- Files are read and hashed concurrently on a thread pool. Each file is
+  read from disk once: the bytes are hashed and then parsed from memory.
+  pandas' CSV tokenizer releases the GIL, so threads overlap without
+  copying frames between processes.
+- Columns are matched by their stripped names, so 'TGS Revenue ' in one
+  file and 'TGS Revenue' in another are the same column. A column missing
+  from a file is empty for its rows.
+- A Source Tracker column, added after the source columns, records the
+  file each row came from: the file's name without extension. Survey
+  Company is left as the trackers recorded it; every row of a competitor's
+  regional trackers names the same company, so it cannot tell them apart.
+- The same project listed in several trackers is kept once, see
+  duplicate_projects.
+
+    source_files = resolve_sources('trackers/')
+    df, n_duplicates, source_sha256 = read_sources(source_files)
+"""
+
+import glob
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from source_schema import read_source, normalize_header, parse_dates
+
+# Column added to the merged frame naming each row's tracker
+PROVENANCE_COLUMN = 'Source Tracker'
+
+# Columns that identify a project across trackers
+PROJECT_KEY = ['Vessel', 'Survey Name', 'Mobilisation Start']
+
+
+def resolve_sources(spec):
+    """
+    Source files named by spec: the file itself, every *.csv in a directory,
+    or the files matching a glob pattern, in sorted order.
+    """
+    if os.path.isdir(spec):
+        return sorted(glob.glob(os.path.join(spec, '*.csv')))
+    if os.path.isfile(spec):
+        return [spec]
+    return sorted(path for path in glob.glob(spec) if os.path.isfile(path))
+
+
+def source_label(path):
+    """Provenance label of a source file: its name without extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _read_one(path):
+    """(raw text frame, SHA-256) of one source file, read from disk once."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    return read_source(io.BytesIO(content)), hashlib.sha256(content).hexdigest()
+
+
+def _hash_one(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _pool_size(n_files, workers):
+    return max(1, min(n_files, workers or os.cpu_count() or 1))
+
+
+def combined_sha256(paths, hashes):
+    """One digest for a list of source files, changing when any file, name or the order changes."""
+    digest = hashlib.sha256()
+    for path, sha256 in zip(paths, hashes):
+        digest.update(f"{os.path.basename(path)}\0{sha256}\n".encode())
+    return digest.hexdigest()
+
+
+def sources_sha256(paths, workers=None):
+    """combined_sha256 of paths, hashing the files concurrently."""
+    with ThreadPoolExecutor(_pool_size(len(paths), workers)) as pool:
+        hashes = list(pool.map(_hash_one, paths))
+    return combined_sha256(paths, hashes)
+
+
+def merge_sources(frames, labels):
+    """
+    Stack raw frames read from different files, aligning columns by their
+    stripped names (first spelling seen wins), and record each file's label
+    in every one of its rows under PROVENANCE_COLUMN, the last column. A
+    column of that name in a file is overwritten.
+    """
+    columns = {}
+    aligned = []
+    for frame, label in zip(frames, labels):
+        names = normalize_header(frame.columns, strip=True)
+        for name, col in zip(names, frame.columns):
+            columns.setdefault(name, col)
+        frame = frame.set_axis([columns[name] for name in names], axis=1)
+        frame[columns.setdefault(PROVENANCE_COLUMN, PROVENANCE_COLUMN)] = label
+        aligned.append(frame)
+    merged = pd.concat(aligned, ignore_index=True)
+    provenance = columns.pop(PROVENANCE_COLUMN)
+    return merged[list(columns.values()) + [provenance]]
+
+
+def duplicate_projects(df):
+    """
+    Boolean mask of the rows that repeat an earlier row's project: the same
+    vessel, survey name (both compared without case or padding) and
+    mobilisation date.
+
+    This is a hash join of the frame against itself: each key column is
+    factorized through a hash table, and a row is a duplicate when its
+    combined codes are already in the table of keys seen so far. It runs in
+    linear time, with no pairwise comparison. Rows missing any part of the
+    key are never duplicates.
+    """
+    columns = {col.strip(): col for col in df.columns}
+    if any(name not in columns for name in PROJECT_KEY):
+        return np.zeros(len(df), dtype=bool)
+    vessel, name, mobilisation = (df[columns[name]] for name in PROJECT_KEY)
+    keys = [vessel.str.strip().str.casefold(), name.str.strip().str.casefold(), parse_dates(mobilisation)]
+    complete = np.logical_and.reduce([key.notna().to_numpy() for key in keys])
+    return complete & pd.MultiIndex.from_arrays(keys).duplicated(keep='first')
+
+
+def read_sources(paths, workers=None):
+    """
+    Read source files concurrently on up to workers threads (default: one
+    per CPU) and merge them. Projects repeated in a later file, or later in
+    the same file, are dropped (see duplicate_projects).
+
+    Returns (raw text frame, number of duplicates dropped, combined SHA-256
+    of the files).
+    """
+    with ThreadPoolExecutor(_pool_size(len(paths), workers)) as pool:
+        results = list(pool.map(_read_one, paths))
+    frames, hashes = zip(*results)
+    df = merge_sources(frames, [source_label(path) for path in paths])
+    duplicates = duplicate_projects(df)
+    if duplicates.any():
+        df = df[~duplicates].reset_index(drop=True)
+    return df, int(duplicates.sum()), combined_sha256(paths, hashes)
@@ -0,0 +1,139 @@
+"""
+Source-fingerprint manifest for incremental regeneration.
+
+The manifest records a hash of the whole source file plus, for every vessel,
+the ordered content hashes of its rows and the span of periods each row
+touches. Comparing two manifests tells the generator exactly which
+vessel-period cells need recomputing, or that nothing changed at all.
+
+One manifest is kept per output configuration (period kind and year range).
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+
+import pandas as pd
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path(output_name):
+    """Manifest file for the outputs named after output_name (e.g. 'Vessel_Quarterly_Pivot_2025')."""
+    return f'.generator_manifest_{output_name}.json'
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_hashes(df):
+    """Return a 64-bit content hash (hex string) for each row of the raw source frame."""
+    hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    return [f'{h:016x}' for h in hashes]
+
+
+def vessel_key(vessel):
+    """Manifest key for a vessel; rows without a vessel are grouped under ''."""
+    return str(vessel) if pd.notna(vessel) else ''
+
+
+def build_manifest(source_sha256, config, vessels, hashes, first_periods, last_periods):
+    """
+    Build a manifest from per-row vessels, content hashes and period spans.
+
+    A row overlaps periods first_periods[i]..last_periods[i]; rows that overlap
+    no period have a span of (-1, -1).
+    """
+    per_vessel = {}
+    for vessel, row_hash, first, last in zip(vessels, hashes, first_periods, last_periods):
+        per_vessel.setdefault(vessel_key(vessel), []).append([row_hash, int(first), int(last)])
+
+    vessel_entries = {}
+    for vessel, rows in per_vessel.items():
+        digest = hashlib.sha1(''.join(row[0] for row in rows).encode()).hexdigest()
+        vessel_entries[vessel] = {'hash': digest, 'rows': rows}
+
+    return {
+        'version': MANIFEST_VERSION,
+        'config': config,
+        'source_sha256': source_sha256,
+        'vessels': vessel_entries,
+    }
+
+
+def build_source_manifest(source_sha256, config):
+    """
+    Build a manifest that records only the source hash, for runs that do not
+    keep per-row fingerprints (streamed runs). An unchanged source is still
+    skipped, but any change triggers a full rebuild.
+    """
+    return {
+        'version': MANIFEST_VERSION,
+        'config': config,
+        'source_sha256': source_sha256,
+        'vessels': None,
+    }
+
+
+def load_manifest(path):
+    """Load a manifest, returning None if it is missing, unreadable or from another version."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically so an interrupted run never leaves a partial file."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def changed_cells(old, new, n_periods):
+    """
+    Compare two manifests and return {vessel: set_of_period_indices} for every
+    vessel with at least one vessel-period cell that must be recomputed.
+
+    Cells change when rows touching them were added, removed or edited. If a
+    vessel's rows were only reordered, all of its periods are recomputed since
+    row order decides rounding tie-breaks.
+    """
+    cells = {}
+    for vessel in set(old['vessels']) | set(new['vessels']):
+        old_entry = old['vessels'].get(vessel, {'hash': None, 'rows': []})
+        new_entry = new['vessels'].get(vessel, {'hash': None, 'rows': []})
+        if old_entry['hash'] == new_entry['hash']:
+            continue
+
+        old_rows = [tuple(row) for row in old_entry['rows']]
+        new_rows = [tuple(row) for row in new_entry['rows']]
+        removed = Counter(old_rows) - Counter(new_rows)
+        added = Counter(new_rows) - Counter(old_rows)
+
+        periods = set()
+        for _, first, last in removed + added:
+            if first >= 0:
+                periods.update(range(first, last + 1))
+
+        # Rows present in both versions must keep their relative order
+        kept_old = [row for row in old_rows if row not in removed]
+        kept_new = [row for row in new_rows if row not in added]
+        if kept_old != kept_new:
+            periods = set(range(n_periods))
+
+        if periods:
+            cells[vessel] = periods
+    return cells
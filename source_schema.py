@@ -0,0 +1,234 @@
+"""
+Schema of "Streamer Projects - SWG - AI.csv" and the loader every script uses.
+
+The source is read as text and the declared schema is then applied column
+by column:
+
+- Dates use the spreadsheet's M/D/YYYY format. Only the cells that format
+  rejects are retried with a flexible parser, and any cell that still fails
+  is recorded in a coercion report instead of silently becoming NaT.
+- Numeric columns are converted with the same reporting.
+- Money columns stay text, so the derived files keep the source's
+  formatting, but every cell is checked with parse_money and the ones it
+  rejects are reported. parse_money converts them where amounts are needed.
+- Low-cardinality text columns become categoricals.
+
+Keeping the raw text step separate lets the generator fingerprint rows
+before anything is parsed.
+"""
+
+import numpy as np
+import pandas as pd
+
+SOURCE_FILE = "Streamer Projects - SWG - AI.csv"
+
+# The spreadsheet export starts with a UTF-8 byte order mark
+SOURCE_ENCODING = 'utf-8-sig'
+
+DATE_COLUMNS = ["Mobilisation Start", "Deployment Start", "Production Start",
+                "Production End", "Retrieval End", "Demobilisation End"]
+
+# Format of every date cell in the export, e.g. 1/22/2025
+DATE_FORMAT = '%m/%d/%Y'
+
+# Phase duration columns the generator adds, each the days between two dates
+PHASE_COLUMNS = {
+    'Mobilization (days)': ('Mobilisation Start', 'Deployment Start'),
+    'Deployment (days)': ('Deployment Start', 'Production Start'),
+    'Production (days)': ('Production Start', 'Production End'),
+    'Recovery (days)': ('Production End', 'Retrieval End'),
+    'Demobilization (days)': ('Retrieval End', 'Demobilisation End'),
+}
+
+NUMERIC_COLUMNS = ['TGS Duration']
+
+# Currency amounts such as '$36,289,713', checked but kept as text
+MONEY_COLUMNS = ['TGS Revenue', 'TGS Cost', 'SWG Cost', 'Day Rate']
+
+# Spreadsheet error values exported in place of a formula result, read as
+# missing rather than rejected (most Day Rate cells are '#DIV/0!')
+SPREADSHEET_ERRORS = ['#DIV/0!', '#N/A', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#NULL!']
+
+# Repeated labels, stored once per distinct value
+CATEGORICAL_COLUMNS = ['', 'Activity', 'Company', 'Survey Company', 'Vessel', 'Client', 'Country', 'Complete',
+                       'Source Tracker']
+
+# Column names are matched after stripping whitespace, so 'TGS Revenue ' and
+# the unnamed survey type column ' ' are found whatever their padding. Every
+# other column (names, locations) stays text.
+
+
+def normalize_header(columns, strip=False):
+    """Drop a byte order mark left on the first header and optionally strip whitespace."""
+    names = [str(col).lstrip('\ufeff') for col in columns]
+    if strip:
+        names = [name.strip() for name in names]
+    return names
+
+
+def read_source(path=SOURCE_FILE, chunksize=None, strip_headers=False, usecols=None):
+    """
+    Read the source as text: every cell is a string or NaN.
+
+    usecols limits the read to the named columns. Returns a frame, or an
+    iterator of frames when chunksize is given.
+    """
+    reader = pd.read_csv(path, dtype=str, encoding=SOURCE_ENCODING, chunksize=chunksize, usecols=usecols)
+    if chunksize is None:
+        reader.columns = normalize_header(reader.columns, strip_headers)
+        return reader
+    return _normalized_chunks(reader, strip_headers)
+
+
+def _normalized_chunks(reader, strip_headers):
+    for chunk in reader:
+        chunk.columns = normalize_header(chunk.columns, strip_headers)
+        yield chunk
+
+
+def new_coercion_report():
+    """Empty report: cells coerced to missing, and cells parsed by the fallback, per column."""
+    return {'coerced': [], 'fallback': {}}
+
+
+def find_column(df, name):
+    """The column of df named name once whitespace is stripped, or None."""
+    for col in df.columns:
+        if col.strip() == name:
+            return col
+    return None
+
+
+def _parse_column(raw, parse, fallback, column, report, row_offset, missing=()):
+    """
+    Parse one text column with `parse`, retry the rejected cells with
+    `fallback` and record those that still fail. Blank cells and the values
+    in missing are missing values, not failures.
+    """
+    # Values repeat across rows (a few thousand distinct dates per million
+    # rows), so each distinct string is parsed once and the result is spread
+    # back over the rows
+    codes, uniques = pd.factorize(raw)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = parse(uniques)
+    # Blank cells are missing values, not parse failures
+    rejected = (parsed.isna() & ~uniques.str.strip().isin(['', *missing])).to_numpy()
+    if rejected.any():
+        retried = fallback(uniques[rejected].str.strip())
+        parsed[rejected] = retried.to_numpy()
+        recovered = np.flatnonzero(rejected)[retried.notna().to_numpy()]
+        failed = np.flatnonzero(rejected)[retried.isna().to_numpy()]
+        if len(recovered):
+            n_cells = int(np.isin(codes, recovered).sum())
+            report['fallback'][column] = report['fallback'].get(column, 0) + n_cells
+        for i in np.flatnonzero(np.isin(codes, failed)):
+            report['coerced'].append((row_offset + int(i), column, raw.iat[i]))
+    values = pd.api.extensions.take(parsed.to_numpy(), codes, allow_fill=True)
+    return pd.Series(values, index=raw.index, name=raw.name)
+
+
+def _parse_dates(raw):
+    return pd.to_datetime(raw, format=DATE_FORMAT, errors='coerce')
+
+
+def _parse_dates_flexibly(raw):
+    return pd.to_datetime(raw, format='mixed', errors='coerce')
+
+
+def _parse_numbers(raw):
+    return pd.to_numeric(raw, errors='coerce').astype(float)
+
+
+def _parse_numbers_flexibly(raw):
+    return pd.to_numeric(raw.str.replace(',', '', regex=False), errors='coerce').astype(float)
+
+
+def _parse_money(raw):
+    return pd.to_numeric(raw.str.replace(r'[\s$,]', '', regex=True), errors='coerce').astype(float)
+
+
+def _parse_money_flexibly(raw):
+    # Accounting negatives, e.g. ($1,200)
+    cleaned = raw.str.replace(r'[\s$,]', '', regex=True)
+    negative = cleaned.str.fullmatch(r'\(.*\)')
+    amounts = pd.to_numeric(cleaned.str.strip('()'), errors='coerce').astype(float)
+    return amounts.where(~negative, -amounts)
+
+
+def parse_money(raw, report=None, row_offset=0):
+    """
+    Parse a text column of currency amounts ('$36,289,713', '27,422,244.0',
+    '$ 437,225') into a float Series, whole column at once.
+
+    Dollar signs, commas and whitespace are removed; blanks and spreadsheet
+    errors such as '#DIV/0!' are missing (NaN). Cells that are still not a
+    number become NaN and, with a report, are recorded in it like any other
+    coerced cell.
+    """
+    if report is None:
+        report = new_coercion_report()
+    return _parse_column(raw.astype(object), _parse_money, _parse_money_flexibly, raw.name, report, row_offset,
+                         missing=SPREADSHEET_ERRORS).astype(float)
+
+
+def parse_dates(raw, report=None, row_offset=0):
+    """
+    Parse a text column of dates as apply_schema does, without changing the
+    frame it came from. Returns a datetime Series; unparseable cells are NaT
+    and, with a report, recorded in it.
+    """
+    if report is None:
+        report = new_coercion_report()
+    return _parse_column(raw.astype(object), _parse_dates, _parse_dates_flexibly, raw.name, report, row_offset)
+
+
+def apply_schema(df, report=None, row_offset=0, categorical=True):
+    """
+    Convert a text frame from read_source to the declared types, in place.
+
+    row_offset is added to the row numbers in the report, so chunks of one
+    file can share a report. Returns the report.
+    """
+    if report is None:
+        report = new_coercion_report()
+    columns = {col.strip(): col for col in df.columns}
+    for name in DATE_COLUMNS:
+        if name in columns:
+            col = columns[name]
+            df[col] = _parse_column(df[col], _parse_dates, _parse_dates_flexibly, col, report, row_offset)
+    for name in NUMERIC_COLUMNS:
+        if name in columns:
+            col = columns[name]
+            df[col] = _parse_column(df[col], _parse_numbers, _parse_numbers_flexibly, col, report, row_offset)
+    for name in MONEY_COLUMNS:
+        if name in columns:
+            # Checked for the report only; the column itself stays text
+            parse_money(df[columns[name]], report, row_offset)
+    if categorical:
+        for name in CATEGORICAL_COLUMNS:
+            if name in columns:
+                df[columns[name]] = df[columns[name]].astype('category')
+    return report
+
+
+def load_source(path=SOURCE_FILE, strip_headers=False, categorical=True, usecols=None):
+    """Read and type the source in one call. Returns (frame, coercion report)."""
+    df = read_source(path, strip_headers=strip_headers, usecols=usecols)
+    report = apply_schema(df, categorical=categorical)
+    return df, report
+
+
+def format_coercion_report(report, limit=10):
+    """Human-readable lines describing a coercion report; empty when nothing was coerced."""
+    lines = []
+    for column, count in report['fallback'].items():
+        lines.append(f"{count} cell(s) in '{column.strip()}' did not match the expected format "
+                     f"and were parsed with the fallback parser")
+    coerced = report['coerced']
+    if coerced:
+        lines.append(f"{len(coerced)} cell(s) could not be parsed and were treated as missing:")
+        for row, column, value in coerced[:limit]:
+            lines.append(f"  row {row + 1}, '{column.strip()}': {value!r}")
+        if len(coerced) > limit:
+            lines.append(f"  ... and {len(coerced) - limit} more")
+    return lines
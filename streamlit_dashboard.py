@@ -1,9 +1,25 @@
 import streamlit as st
 import pandas as pd
 import plotly.figure_factory as ff
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
+import functools
+
+from source_schema import SOURCE_FILE
+from snapshot_cache import load_cached_frame, source_version, source_fingerprint
+from period_calendar import PERIOD_KINDS, PERIOD_ADJECTIVES, build_periods
+from generate_csv_files import output_names
+from artifact_store import artifact_version, read_data_version
+from dashboard_data import (
+    VESSEL_ORDER, FILTER_DIMENSIONS, parse_streamer_projects, reporting_years, build_vessel_index,
+    utilization_from_index, active_project_table, build_filter_masks, apply_filters,
+)
+from timeline_figure import build_timeline_figure
+from figure_cache import figure_key, cached_figure
+from interval_engine import to_day_numbers
+from interval_index import build_interval_index, stab, overlapping
+from instrumentation import stage, traced_cache, note_cache
+from schedule_risk import DEFAULT_SCENARIOS, DISTRIBUTIONS, phase_lengths, simulate_utilization, risk_table
 
 # Set page configuration
 st.set_page_config(page_title="SWG Competitor Analysis Dashboard", layout="wide")
@@ -12,467 +28,346 @@ st.set_page_config(page_title="SWG Competitor Analysis Dashboard", layout="wide"
 st.title("Shearwater Competitor Analysis Dashboard")
 
 # Load the data
-@st.cache_data
-def load_data():
-    """Load all required data files"""
-    # Load from source file directly (not Enhanced_Streamer_Projects.csv)
-    streamer_df = pd.read_csv("Streamer Projects - SWG - AI.csv")
-    vessel_pivot_df = pd.read_csv("Vessel_Quarterly_Pivot_2025.csv")
+@traced_cache(st.cache_data)
+def load_data(version):
+    """Load all required data files (version is the data version token and the source file's version)"""
+    # Load from source file directly (not Enhanced_Streamer_Projects.csv).
+    # The parsed frame is snapshotted on disk so cold starts skip CSV and date parsing.
+    return load_cached_frame(SOURCE_FILE, parse_streamer_projects)
+
+@traced_cache(st.cache_resource)
+def load_vessel_index(version):
+    """Per-vessel project and merged-interval index, built once per source version"""
+    return build_vessel_index(load_data(version))
+
+@traced_cache(st.cache_resource)
+def load_filter_masks(version):
+    """Bitmasks of the index projects per filter value, built once per source version"""
+    return build_filter_masks(load_vessel_index(version))
+
+@traced_cache(st.cache_resource(max_entries=32))
+def load_filtered_index(version, filters):
+    """
+    Vessel index for the sidebar filters, a tuple of (dimension, values) pairs;
+    the full index when nothing is filtered. Picking vessels also narrows the
+    timeline rows and utilization table to those vessels.
+    """
+    if not filters:
+        return load_vessel_index(version)
+    return apply_filters(load_vessel_index(version), load_filter_masks(version), filters)
+
+@traced_cache(st.cache_resource(max_entries=32))
+def load_active_index(version, filters):
+    """Interval index over the filtered projects for "who was active" queries"""
+    vessel_index = load_filtered_index(version, filters)
+    return build_interval_index(vessel_index['start'], vessel_index['end'])
+
+@traced_cache(st.cache_data)
+def load_utilization(version, filters, period_kind, start_year, end_year):
+    """Utilization table for the selected years and period size"""
+    return utilization_from_index(load_filtered_index(version, filters),
+                                  build_periods(period_kind, start_year, end_year))
+
+@traced_cache(st.cache_data)
+def load_schedule_risk(version, filters, start_year, end_year, n_scenarios, distribution):
+    """Quarterly utilization percentiles of the filtered vessels over n_scenarios slip scenarios"""
+    vessel_index = load_filtered_index(version, filters)
+    periods = build_periods('quarter', start_year, end_year)
+    risk = simulate_utilization(vessel_index, phase_lengths(load_data(version), vessel_index['row']), periods,
+                                n_scenarios, distribution)
+    return risk_table(risk, periods), risk['mean_slip']
+
+@traced_cache(st.cache_data)
+def load_pivot(path, version):
+    """
+    Load a vessel pivot written by generate_csv_files.py, or None if it has not
+    been generated. version is the file's artifact version, so a regenerated
+    pivot is picked up; the generator swaps files in atomically, so a read
+    never sees a half-written pivot.
+    """
+    try:
+        vessel_pivot_df = pd.read_csv(path)
+    except FileNotFoundError:
+        return None
     
     # Strip whitespace from column names
-    streamer_df.columns = streamer_df.columns.str.strip()
     vessel_pivot_df.columns = vessel_pivot_df.columns.str.strip()
-    
-    # Convert date columns to datetime
-    date_cols = ["Mobilisation Start", "Deployment Start", "Production Start", 
-                 "Production End", "Retrieval End", "Demobilisation End"]
-    for col in date_cols:
-        streamer_df[col] = pd.to_datetime(streamer_df[col], errors='coerce')
-    
-    return streamer_df, vessel_pivot_df
-
-# Load data
-streamer_df, vessel_pivot_df = load_data()
-
-# Filter to only 2025 projects
-streamer_df_2025 = streamer_df[
-    (streamer_df['Mobilisation Start'].dt.year == 2025) | 
-    (streamer_df['Demobilisation End'].dt.year == 2025)
-].copy()
-
-# Define vessel order (11 vessels total, Island Pride as charter)
-vessel_order = [
-    'SW Bly',
-    'SW Tasman', 
-    'SW Gallien',
-    'Amazon Warrior',
-    'Oceanic Sirius',
-    'Amazon Conqueror',
-    'Oceanic Vega',
-    'SW Duchess',
-    'SW Thuridur',
-    'Island Pride (Charter)',
-    'SW Empress'
-]
-
-# Map Island Pride to Island Pride (Charter)
-streamer_df_2025['Vessel_Display'] = streamer_df_2025['Vessel'].apply(
-    lambda x: 'Island Pride (Charter)' if x == 'Island Pride' else x
-)
-
-# Create Gantt chart data
-def create_gantt_data(df):
-    """Create data for Gantt chart with project duration and non-productive time"""
-    tasks = []
-    
-    # Sort by vessel and start date
-    df_sorted = df.sort_values(['Vessel_Display', 'Mobilisation Start'])
-    
-    # Track first start and last end date for each vessel
-    vessel_first_start = {}
-    vessel_last_end = {}
-    
-    for idx, row in df_sorted.iterrows():
-        if pd.isna(row['Mobilisation Start']) or pd.isna(row['Demobilisation End']):
-            continue
-        
-        vessel = row['Vessel_Display']
-        if vessel not in vessel_order:
-            continue
-            
-        # Create legend label (Country + Type of Survey)
-        country = str(row['Country']) if pd.notna(row['Country']) else 'Unknown'
-        survey_type_raw = row['Activity']
-        survey_type = 'Unknown'
-        
-        # Handle survey type - check for NaN/None first, then convert to string
-        if pd.notna(survey_type_raw):
-            survey_type = str(survey_type_raw)
-        
-        # If survey type is still unknown, try to infer from Survey Name
-        if survey_type == 'Unknown':
-            # Try to infer from Survey Name column
-            survey_name = str(row['Survey Name'])
-            if '2D' in survey_name:
-                survey_type = '2D'
-            elif '3D' in survey_name:
-                survey_type = '3D'
-            elif '4D' in survey_name:
-                survey_type = '4D'
-            elif 'OBN' in survey_name:
-                survey_type = 'OBN'
-            else:
-                survey_type = 'Survey'
-        legend = f"{country} {survey_type}"
-        
-        # Get Survey Name for labeling
-        survey_name_label = str(row['Survey Name']) if pd.notna(row['Survey Name']) else ''
-        
-        # Determine project type based on Client column
-        client = str(row['Client']) if pd.notna(row['Client']) else ''
-        # Multi-Client projects include those with "/" in client name (indicating multiple parties)
-        # or "Searcher" or explicitly labeled "Multi-Client"
-        is_multi_client = ('/' in client or 
-                          'Searcher' in client or 
-                          'Multi-Client' in client)
-        
-        if is_multi_client:
-            phase_label = 'MC Project Duration (All Activities)'
+    return vessel_pivot_df
+
+@traced_cache(st.cache_data)
+def load_active_positions(version, filters, window):
+    """Index positions of the projects active in window (first and last date), or None without a window"""
+    if window is None:
+        return None
+    (first_day, last_day), _ = to_day_numbers([pd.Timestamp(window[0]), pd.Timestamp(window[1])])
+    active_index = load_active_index(version, filters)
+    if first_day == last_day:
+        return stab(active_index, first_day)
+    return overlapping(active_index, first_day, last_day)
+
+@traced_cache(st.cache_data)
+def load_source_fingerprint(version):
+    """SHA-256 of the source file, hashed once per source version"""
+    return source_fingerprint(SOURCE_FILE)
+
+@traced_cache(st.cache_resource(max_entries=32))
+def load_timeline_figure(version, filters, start_year, end_year, window):
+    """
+    Timeline figure for the selected years. With a window, projects outside it
+    are dimmed and the window is shaded. Kept once per process for all
+    sessions, and on disk by figure_cache.py, so a restarted server (or one
+    warmed by update_data.sh) serves the stored figure instead of building it.
+    """
+    def build():
+        return build_timeline_figure(load_filtered_index(version, filters), start_year, end_year,
+                                     window, load_active_positions(version, filters, window))
+    key = figure_key(load_source_fingerprint(version), filters, start_year, end_year, window)
+    figure, outcome = cached_figure(key, build)
+    note_cache('figure_spec_disk', outcome)
+    return figure
+
+@traced_cache(st.cache_data)
+def load_pivot_display(path, version):
+    """The pivot formatted for display (Revenue columns dropped), or None if it has not been generated"""
+    vessel_pivot_df = load_pivot(path, version)
+    if vessel_pivot_df is None:
+        return None
+
+    # Prepare the pivot table (remove Revenue columns)
+    display_df = vessel_pivot_df.copy()
+
+    # Remove all Revenue columns
+    revenue_cols = [col for col in display_df.columns if 'Revenue' in col]
+    display_df = display_df.drop(columns=revenue_cols)
+
+    # Format numeric columns; zero and missing cells are left blank
+    numeric_cols = display_df.select_dtypes(include=[np.number]).columns
+    for col in numeric_cols:
+        shown = display_df[col].notna() & (display_df[col] != 0)
+        if 'Day Rate' in col or 'Cost' in col:
+            # Format as currency
+            formatted = display_df.loc[shown, col].map('${:,.0f}'.format)
+        elif 'Days' in col:
+            # Format as integer
+            formatted = display_df.loc[shown, col].astype('int64').astype(str)
         else:
-            phase_label = 'Proprietary Project Duration (All Activities)'
-        
-        # Track first start date for each vessel
-        if vessel not in vessel_first_start:
-            vessel_first_start[vessel] = row['Mobilisation Start']
-        
-        # Check for gap with previous project (non-productive time)
-        if vessel in vessel_last_end:
-            last_end = vessel_last_end[vessel]
-            current_start = row['Mobilisation Start']
-            # If there's a gap of more than 1 day, add non-productive time
-            if (current_start - last_end).days > 1:
-                tasks.append(dict(
-                    Task=vessel,
-                    Start=last_end,
-                    Finish=current_start,
-                    Resource='Non-Productive Time',
-                    Phase='Non-Productive Time',
-                    SurveyName='',
-                    IsMultiClient=False
-                ))
-        
-        # Single project duration (All Activities) - from Mobilization Start to Demobilization End
-        tasks.append(dict(
-            Task=vessel,
-            Start=row['Mobilisation Start'],
-            Finish=row['Demobilisation End'],
-            Resource=legend,
-            Phase=phase_label,
-            SurveyName=survey_name_label,
-            IsMultiClient=is_multi_client
-        ))
-        
-        # Update last end date for this vessel
-        vessel_last_end[vessel] = row['Demobilisation End']
-    
-    # Add pre-project idle period for vessels whose first project doesn't start on January 1
-    start_of_2025 = datetime(2025, 1, 1)
-    for vessel in vessel_order:
-        if vessel in vessel_first_start:
-            first_start = vessel_first_start[vessel]
-            # If first project doesn't start on January 1, add non-productive time
-            if first_start > start_of_2025:
-                tasks.append(dict(
-                    Task=vessel,
-                    Start=start_of_2025,
-                    Finish=first_start,
-                    Resource='Non-Productive Time',
-                    Phase='Non-Productive Time',
-                    SurveyName='',
-                    IsMultiClient=False
-                ))
-    
-    # Add non-productive time from last project end to end of 2025 for each vessel
-    end_of_2025 = datetime(2025, 12, 31)
-    for vessel in vessel_order:
-        if vessel in vessel_last_end:
-            last_end = vessel_last_end[vessel]
-            if last_end < end_of_2025:
-                tasks.append(dict(
-                    Task=vessel,
-                    Start=last_end,
-                    Finish=end_of_2025,
-                    Resource='Non-Productive Time',
-                    Phase='Non-Productive Time',
-                    SurveyName='',
-                    IsMultiClient=False
-                ))
-    
-    return pd.DataFrame(tasks)
-
-# Create the Gantt chart
-gantt_df = create_gantt_data(streamer_df_2025)
-
-# Filter out any rows with NaT values
-gantt_df = gantt_df.dropna(subset=['Start', 'Finish'])
+            continue
+        display_df[col] = formatted.reindex(display_df.index, fill_value='')
+
+    # Replace Island Pride with Island Pride (Charter)
+    display_df['Vessel'] = display_df['Vessel'].replace({'Island Pride': 'Island Pride (Charter)'})
+    return display_df
+
+def timed_section(name):
+    """Time a section of the page and keep its record, with its cache hits, for the Performance panel"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+            record['at'] = datetime.now().strftime('%H:%M:%S')
+            st.session_state.setdefault('performance', {})[name] = record
+            return result
+        return wrapper
+    return decorate
+
+def performance_table(records):
+    """One row per timed section: its last run time, duration and cache hits"""
+    return pd.DataFrame({
+        'Section': list(records),
+        'Last run': [record['at'] for record in records.values()],
+        'Time (ms)': [round(record['seconds'] * 1000, 1) for record in records.values()],
+        'Caches': [', '.join(f"{name}: {outcome}" for name, outcome in record.get('caches', {}).items())
+                   for record in records.values()],
+    })
+
+# Each section is a fragment: interacting with its own widgets reruns only
+# that section, against the cached figure and tables above.
+
+@st.fragment
+@timed_section('Timeline')
+def timeline_section(version, filters, start_year, end_year):
+    range_label = build_periods('quarter', start_year, end_year)['range_label']
+    st.header(f"{range_label} Vessel Project Timeline")
+
+    # Highlight the projects active on a day or within a window. The widget key
+    # follows the year range so a stale selection never falls outside its bounds.
+    picker_col, _ = st.columns([1, 3])
+    with picker_col:
+        active_window = st.date_input(
+            "Active Projects on or between", value=(),
+            min_value=datetime(start_year, 1, 1).date(), max_value=datetime(end_year, 12, 31).date(),
+            format="YYYY-MM-DD", key=f"active_window_{start_year}_{end_year}",
+            help="Pick one day, or a first and last day, to highlight the projects active then"
+        )
+    window = (active_window[0], active_window[-1]) if len(active_window) > 0 else None
 
-# Define phase colors
-phase_colors = {
-    'MC Project Duration (All Activities)': '#006400',         # DARK GREEN for Multi-Client
-    'Proprietary Project Duration (All Activities)': '#00008B', # DARK BLUE for Proprietary
-    'Non-Productive Time': '#D3D3D3'                            # Light gray
-}
+    st.plotly_chart(load_timeline_figure(version, filters, start_year, end_year, window), use_container_width=True)
 
-# Create the Plotly figure
-st.header("2025 Vessel Project Timeline")
+    if window is not None:
+        active_positions = load_active_positions(version, filters, window)
+        if window[0] == window[1]:
+            window_text = f"on {window[0]:%d %b %Y}"
+        else:
+            window_text = f"between {window[0]:%d %b %Y} and {window[1]:%d %b %Y}"
+        st.subheader(f"{len(active_positions)} projects active {window_text}")
+        st.dataframe(
+            active_project_table(load_filtered_index(version, filters), active_positions),
+            width='stretch',
+            hide_index=True
+        )
 
-fig = go.Figure()
+    # Add color legend
+    st.markdown("### Phase Colors")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("🟢 **MC Project Duration (All Activities)**")
+    with col2:
+        st.markdown("🟦 **Proprietary Project Duration (All Activities)**")
+    with col3:
+        st.markdown("⬜ **Non-Productive Time**")
+
+@st.fragment
+@timed_section('Utilization')
+def utilization_section(version, filters, start_year, end_year):
+    # The header names the period size chosen just below it
+    header = st.empty()
+    period_col, _ = st.columns([1, 3])
+    with period_col:
+        period_kind = st.selectbox(
+            "Utilization period", PERIOD_KINDS, index=PERIOD_KINDS.index('quarter'),
+            format_func=lambda kind: PERIOD_ADJECTIVES[kind], key="utilization_period"
+        )
+    header.header(f"{PERIOD_ADJECTIVES[period_kind]} Vessel Utilization Table")
 
-# Group tasks by vessel and add them to the figure
-for vessel in vessel_order:
-    vessel_tasks = gantt_df[gantt_df['Task'] == vessel].sort_values('Start')
-    
-    if len(vessel_tasks) == 0:
-        continue
-    
-    # Add each phase as a bar
-    for idx, task in vessel_tasks.iterrows():
-        # Calculate duration in days
-        duration = (task['Finish'] - task['Start']).days
-        
-        # Determine if we should show text on the bar
-        show_text = task['Phase'] != 'Non-Productive Time'
-        text_label = task['Resource'] if show_text else ''
-        
-        fig.add_trace(go.Bar(
-            name=task['Resource'],
-            x=[task['Finish']],
-            y=[vessel],
-            orientation='h',
-            base=task['Start'],
-            text=text_label,
-            textposition='inside',
-            textfont=dict(color='white', size=10),
-            marker=dict(
-                color=phase_colors.get(task['Phase'], '#D3D3D3'),
-                line=dict(color='white', width=0.5)
-            ),
-            hovertemplate=(
-                f"<b>{task['Resource']}</b><br>" +
-                f"Vessel: {vessel}<br>" +
-                f"Phase: {task['Phase']}<br>" +
-                (f"Survey: {task.get('SurveyName', '')}<br>" if task.get('SurveyName', '') else "") +
-                f"Start: {task['Start'].strftime('%Y-%m-%d')}<br>" +
-                f"End: {task['Finish'].strftime('%Y-%m-%d')}<br>" +
-                f"Days: {duration}<br>" +
-                "<extra></extra>"
-            ),
-            showlegend=False
-        ))
-
-# Add quarter markers
-quarters = [
-    ('Q1 2025', datetime(2025, 1, 1), datetime(2025, 3, 31)),
-    ('Q2 2025', datetime(2025, 4, 1), datetime(2025, 6, 30)),
-    ('Q3 2025', datetime(2025, 7, 1), datetime(2025, 9, 30)),
-    ('Q4 2025', datetime(2025, 10, 1), datetime(2025, 12, 31))
-]
-
-# Update layout
-fig.update_layout(
-    barmode='stack',
-    height=600,
-    xaxis=dict(
-        title='',
-        type='date',
-        tickformat='%b',  # Show month names
-        tickmode='array',
-        tickvals=pd.date_range(start='2025-01-01', end='2025-12-31', freq='MS'),
-        ticktext=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
-        side='top',  # Put x-axis on top
-        showgrid=True,
-        gridcolor='lightgray',
-        range=['2025-01-01', '2026-01-15']
-    ),
-    yaxis=dict(
-        title='',
-        categoryorder='array',
-        categoryarray=vessel_order[::-1],  # Reverse order to show from top to bottom
-        showgrid=True,
-        gridcolor='lightgray'
-    ),
-    plot_bgcolor='white',
-    showlegend=False,
-    margin=dict(l=150, r=50, t=100, b=50),
-    hovermode='closest'
-)
+    # Calculate and display the utilization table
+    utilization_df = load_utilization(version, filters, period_kind, start_year, end_year)
 
-# Add quarter separators as vertical lines
-for q_name, q_start, q_end in quarters:
-    fig.add_vline(
-        x=q_start.timestamp() * 1000,  # Plotly expects milliseconds for date axes (timestamp() returns seconds)
-        line_width=2,
-        line_dash="dash",
-        line_color="gray",
-        opacity=0.5
-    )
-    
-    # Add quarter labels
-    fig.add_annotation(
-        x=q_start + (q_end - q_start) / 2,
-        y=1.05,
-        text=q_name,
-        showarrow=False,
-        xref='x',
-        yref='paper',
-        font=dict(size=12, color='black', family='Arial Black'),
-        bgcolor='lightyellow',
-        bordercolor='gray',
-        borderwidth=1,
-        borderpad=4
+    # Display the table with better formatting
+    st.dataframe(
+        utilization_df,
+        use_container_width=True,
+        height=450,
+        hide_index=True
     )
 
-# Add phase legend manually at the bottom
-st.plotly_chart(fig, use_container_width=True)
+@st.fragment
+@timed_section('Pivot')
+def pivot_section(start_year, end_year, filtered):
+    # Display Vessel Quarterly Pivot table
+    pivot_name, _ = output_names(build_periods('quarter', start_year, end_year))
+    st.header(pivot_name.replace('_', ' '))
+    display_df = load_pivot_display(f"{pivot_name}.csv", artifact_version(f"{pivot_name}.csv"))
+
+    if display_df is None:
+        year_args = f"--from-year {start_year}" + (f" --to-year {end_year}" if end_year != start_year else "")
+        st.info(f"{pivot_name}.csv has not been generated yet. Run: python generate_csv_files.py {year_args}")
+    else:
+        if filtered:
+            st.caption("The pivot is generated for the whole fleet; the sidebar filters do not apply to it.")
+        # Display the table
+        st.dataframe(display_df, use_container_width=True, height=450)
+
+# Scenario counts offered for the schedule risk simulation
+SCENARIO_CHOICES = [1_000, DEFAULT_SCENARIOS, 50_000]
+
+@st.fragment
+@timed_section('Schedule Risk')
+def schedule_risk_section(version, filters, start_year, end_year):
+    st.header("Schedule Risk")
+    st.caption("Quarterly utilization when project phases run late, a late project also pushing back the "
+               "vessel's next projects. P10/P50/P90 are percentiles across the simulated scenarios; "
+               "Plan % is the schedule as entered.")
+    scenarios_col, distribution_col, _ = st.columns([1, 1, 2])
+    with scenarios_col:
+        n_scenarios = st.selectbox("Scenarios", SCENARIO_CHOICES, index=SCENARIO_CHOICES.index(DEFAULT_SCENARIOS),
+                                   format_func=lambda n: f"{n:,}", key="risk_scenarios")
+    with distribution_col:
+        distribution = st.selectbox(
+            "Phase slips", DISTRIBUTIONS, key="risk_distribution",
+            format_func=lambda name: {'configured': 'Configured (triangular)',
+                                      'empirical': 'Empirical (from the data)'}[name]
+        )
 
-# Add color legend
-st.markdown("### Phase Colors")
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.markdown("🟢 **MC Project Duration (All Activities)**")
-with col2:
-    st.markdown("🟦 **Proprietary Project Duration (All Activities)**")
-with col3:
-    st.markdown("⬜ **Non-Productive Time**")
+    risk_df, mean_slip = load_schedule_risk(version, filters, start_year, end_year, n_scenarios, distribution)
+    st.dataframe(risk_df, width='stretch', height=450, hide_index=True)
+    st.caption(f"Mean slip per project in the range: {mean_slip:.1f} days")
 
-# Add separator
-st.markdown("---")
+@timed_section('Load data')
+def load_dashboard_data():
+    """Data version, parsed frame and filter bitmasks for this run"""
+    # Load data; every cache is refreshed when a generator run publishes a new
+    # data version token, or when the source file is edited without one
+    version = (read_data_version(), source_version(SOURCE_FILE))
+    return version, load_data(version), load_filter_masks(version)
 
-# Create Quarterly Vessel Utilization Table
-st.header("Quarterly Vessel Utilization Table")
+# Seconds between checks for data published by a generator run (e.g. --watch)
+DATA_POLL_SECONDS = 5
 
-# Function to merge overlapping date ranges
-def merge_date_ranges(date_ranges):
-    """
-    Merge overlapping date ranges and return the total unique days.
-    Prevents double-counting when a vessel works on multiple overlapping projects.
-    Adjacent ranges (e.g., ending Jan 31, starting Feb 1) are merged as continuous work.
-    """
-    if not date_ranges:
-        return 0
-    
-    # Sort by start date
-    sorted_ranges = sorted(date_ranges, key=lambda x: x[0])
-    
-    # Merge overlapping ranges
-    merged = [sorted_ranges[0]]
-    for current_start, current_end in sorted_ranges[1:]:
-        last_start, last_end = merged[-1]
-        
-        # If current range overlaps with the last range, merge them
-        if current_start <= last_end:
-            merged[-1] = (last_start, max(last_end, current_end))
-        else:
-            # No overlap, add as new range
-            merged.append((current_start, current_end))
-    
-    # Calculate total days across all merged ranges
-    total_days = sum((end - start).days + 1 for start, end in merged)
-    return total_days
+@st.fragment(run_every=DATA_POLL_SECONDS)
+def refresh_on_new_data(token):
+    """Rerun the page once the generator has published data newer than token"""
+    if read_data_version() != token:
+        st.rerun(scope="app")
 
-# Function to calculate quarterly utilization
-def calculate_quarterly_utilization(df):
-    """Calculate days in project and idle/transit days per vessel per quarter"""
-    
-    # Define quarters
-    quarters = {
-        'Q1': (datetime(2025, 1, 1), datetime(2025, 3, 31)),
-        'Q2': (datetime(2025, 4, 1), datetime(2025, 6, 30)),
-        'Q3': (datetime(2025, 7, 1), datetime(2025, 9, 30)),
-        'Q4': (datetime(2025, 10, 1), datetime(2025, 12, 31))
-    }
-    
-    # Days in each quarter (2025 is not a leap year)
-    quarter_days = {
-        'Q1': 90,  # Jan (31) + Feb (28) + Mar (31)
-        'Q2': 91,  # Apr (30) + May (31) + Jun (30)
-        'Q3': 92,  # Jul (31) + Aug (31) + Sep (30)
-        'Q4': 92   # Oct (31) + Nov (30) + Dec (31)
-    }
-    
-    # Initialize utilization data
-    utilization_data = []
-    
-    for vessel in vessel_order:
-        vessel_data = {'Vessel Name': vessel}
-        
-        # Get all projects for this vessel
-        vessel_projects = df[df['Vessel_Display'] == vessel].copy()
-        
-        for quarter_name, (q_start, q_end) in quarters.items():
-            # Collect date ranges for this vessel in this quarter
-            date_ranges = []
-            
-            for idx, row in vessel_projects.iterrows():
-                if pd.isna(row['Mobilisation Start']) or pd.isna(row['Demobilisation End']):
-                    continue
-                
-                # Get overlap between project and quarter
-                project_start = max(row['Mobilisation Start'], q_start)
-                project_end = min(row['Demobilisation End'], q_end)
-                
-                # If there's overlap, add the date range
-                if project_start <= project_end:
-                    date_ranges.append((project_start, project_end))
-            
-            # Merge overlapping date ranges to get unique days
-            days_in_project = merge_date_ranges(date_ranges)
-            
-            # Calculate idle/transit days
-            total_days_in_quarter = quarter_days[quarter_name]
-            idle_transit_days = total_days_in_quarter - days_in_project
-            
-            vessel_data[f'{quarter_name} Days in Project'] = days_in_project
-            vessel_data[f'{quarter_name} Idle/Transit'] = idle_transit_days
-        
-        utilization_data.append(vessel_data)
-    
-    return pd.DataFrame(utilization_data)
+data_version, streamer_df, filter_masks = load_dashboard_data()
+refresh_on_new_data(data_version[0])
 
-# Calculate and display the utilization table
-utilization_df = calculate_quarterly_utilization(streamer_df_2025)
+# Reporting range, shared by every section
+available_years, default_year = reporting_years(streamer_df)
 
-# Display the table with better formatting
-st.dataframe(
-    utilization_df,
-    use_container_width=True,
-    height=450,
-    hide_index=True
+st.sidebar.header("Reporting Range")
+start_year, end_year = st.sidebar.select_slider(
+    "Years", options=available_years, value=(default_year, default_year)
 )
 
-# Add separator
-st.markdown("---")
-
-# Display Vessel Quarterly Pivot table
-st.header("Vessel Quarterly Pivot 2025")
-
-# Prepare the pivot table (remove Revenue columns)
-display_df = vessel_pivot_df.copy()
-
-# Remove all Revenue columns
-revenue_cols = [col for col in display_df.columns if 'Revenue' in col]
-display_df = display_df.drop(columns=revenue_cols)
-
-# Format numeric columns
-numeric_cols = display_df.select_dtypes(include=[np.number]).columns
-for col in numeric_cols:
-    if 'Day Rate' in col or 'Cost' in col:
-        # Format as currency
-        display_df[col] = display_df[col].apply(
-            lambda x: f"${x:,.0f}" if pd.notna(x) and x != 0 else ""
-        )
-    elif 'Days' in col:
-        # Format as integer
-        display_df[col] = display_df[col].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) and x != 0 else ""
-        )
-
-# Replace Island Pride with Island Pride (Charter)
-display_df['Vessel'] = display_df['Vessel'].apply(
-    lambda x: 'Island Pride (Charter)' if x == 'Island Pride' else x
+# Filters narrow the timeline and utilization table to the matching projects.
+# Options and bitmasks come from the vessel index, built once per source version.
+st.sidebar.header("Filters")
+filters = []
+for dimension in FILTER_DIMENSIONS:
+    options = list(filter_masks['masks'][dimension])
+    if dimension == 'Vessel':
+        options = [vessel for vessel in VESSEL_ORDER if vessel in filter_masks['masks']['Vessel']]
+    chosen = st.sidebar.multiselect(dimension, options, key=f"filter_{dimension}", placeholder="All")
+    if chosen:
+        filters.append((dimension, tuple(chosen)))
+filters = tuple(filters)
+
+# Only the open tab is rendered; the others compute nothing until they are opened
+timeline_tab, utilization_tab, pivot_tab, risk_tab = st.tabs(
+    ["Timeline", "Utilization", "Pivot", "Schedule Risk"], key="dashboard_section", on_change="rerun"
 )
-
-# Display the table
-st.dataframe(display_df, use_container_width=True, height=450)
+with timeline_tab:
+    if timeline_tab.open:
+        timeline_section(data_version, filters, start_year, end_year)
+with utilization_tab:
+    if utilization_tab.open:
+        utilization_section(data_version, filters, start_year, end_year)
+with pivot_tab:
+    if pivot_tab.open:
+        pivot_section(start_year, end_year, bool(filters))
+with risk_tab:
+    if risk_tab.open:
+        schedule_risk_section(data_version, filters, start_year, end_year)
+
+# Timings of the last run of each section and whether its caches were hit;
+# like the tabs, the panel is only filled in while it is open
+performance_panel = st.expander("Performance", key="performance_panel", on_change="rerun")
+with performance_panel:
+    if performance_panel.open:
+        st.dataframe(performance_table(st.session_state.get('performance', {})),
+                     width='stretch', hide_index=True)
+        st.caption("Sections that were not opened in the last rerun show their previous timing.")
 
 # Footer with instructions
 st.markdown("---")
 st.markdown("""
 ### About This Dashboard
 
-This dashboard visualizes the 2025 vessel project timeline and quarterly metrics:
+This dashboard visualizes the vessel project timeline and period metrics for the years chosen in the sidebar:
 
-- **Timeline Chart**: Shows project phases across all vessels throughout 2025
+- **Timeline Chart**: Shows project phases across all vessels throughout the selected years
   - Each bar represents a project phase colored by activity type
   - Quarters are marked with vertical dashed lines
   - Hover over bars to see project details
@@ -481,6 +376,9 @@ This dashboard visualizes the 2025 vessel project timeline and quarterly metrics
   - Days: Total days worked in each quarter
   - Avg Day Rate: Average day rate for the quarter
   - Total Cost: Total cost for the quarter
+
+- **Schedule Risk**: Simulates late-running project phases and shows each vessel's quarterly utilization
+  percentiles (P10/P50/P90) next to the plan
   
 **Legend Format**: Country + Type of Survey (e.g., "India 2D")
 """)
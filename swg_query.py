@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Headless queries against the compact index written by generate_csv_files.py.
+
+    python swg_query.py utilization --vessel "SW Tasman" --quarter Q3-2025
+    python swg_query.py utilization --from 2025-07-01 --to 2025-09-30 --json
+    python swg_query.py vessels
+
+Only the standard library is imported (the index is memory-mapped, see
+query_index.py), so a query returns in a few tens of milliseconds and is
+cheap to call from scripts and cron jobs. Run generate_csv_files.py first
+to build swg_query_index.bin.
+"""
+
+import argparse
+import json
+import re
+from datetime import date
+
+from query_index import QUERY_INDEX_FILE, read_query_index, busy_days, day_number
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a YYYY-MM-DD date")
+
+
+def quarter_bounds(value):
+    """First and last date of a quarter written as Q3-2025, 2025Q3 or 2025-Q3."""
+    match = (re.fullmatch(r'[Qq]([1-4])[- ]?(\d{4})', value)
+             or re.fullmatch(r'(\d{4})[- ]?[Qq]([1-4])', value))
+    if match is None:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a quarter like Q3-2025")
+    quarter, year = match.groups() if value[0] in 'Qq' else match.groups()[::-1]
+    first_month = 3 * int(quarter) - 2
+    first = date(int(year), first_month, 1)
+    next_start = date(int(year) + 1, 1, 1) if quarter == '4' else date(int(year), first_month + 3, 1)
+    return first, date.fromordinal(next_start.toordinal() - 1)
+
+
+def query_window(args, index):
+    """First and last date of the query, defaulting to the generator's reporting range."""
+    if args.quarter:
+        return args.quarter
+    if args.year:
+        return date(args.year, 1, 1), date(args.year, 12, 31)
+    first = args.start or date.fromisoformat(index['range_start'])
+    last = args.end or date.fromisoformat(index['range_end'])
+    if last < first:
+        raise SystemExit(f"error: --to {last} is before --from {first}")
+    return first, last
+
+
+def match_vessels(names, patterns):
+    """
+    Positions of the vessels matching patterns: an exact, case-insensitive
+    name, otherwise every name containing the pattern. All vessels without patterns.
+    """
+    if not patterns:
+        return list(range(len(names)))
+    lowered = [name.lower() for name in names]
+    positions = []
+    for pattern in patterns:
+        key = pattern.lower()
+        matches = [i for i, name in enumerate(lowered) if name == key] or \
+                  [i for i, name in enumerate(lowered) if key in name]
+        if not matches:
+            raise SystemExit(f"error: no vessel matches '{pattern}'. Known vessels: {', '.join(names)}")
+        positions += [i for i in matches if i not in positions]
+    return positions
+
+
+def utilization(args, index):
+    first, last = query_window(args, index)
+    first_day, last_day = day_number(first), day_number(last)
+    window_days = last_day - first_day + 1
+    rows = []
+    for position in match_vessels(index['vessels'], args.vessel):
+        days = busy_days(index, position, first_day, last_day)
+        rows.append({
+            'vessel': index['vessels'][position],
+            'from': first.isoformat(),
+            'to': last.isoformat(),
+            'project_days': days,
+            'idle_days': window_days - days,
+            'utilization': round(days / window_days, 4),
+        })
+    if args.json:
+        print(json.dumps(rows, indent=1))
+        return
+    width = max([len('Vessel')] + [len(row['vessel']) for row in rows])
+    print(f"{'Vessel':<{width}}  {'From':<10}  {'To':<10}  {'Project days':>12}  {'Idle days':>9}  {'Utilization':>11}")
+    for row in rows:
+        print(f"{row['vessel']:<{width}}  {row['from']}  {row['to']}  {row['project_days']:>12}  "
+              f"{row['idle_days']:>9}  {row['utilization']:>11.1%}")
+
+
+def vessels(args, index):
+    if args.json:
+        print(json.dumps(index['vessels']))
+    else:
+        print('\n'.join(index['vessels']))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query vessel utilization from the generator's index "
+                                                 "without loading the source or starting the dashboard.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--index', default=QUERY_INDEX_FILE,
+                        help=f"Index file written by generate_csv_files.py (default: {QUERY_INDEX_FILE})")
+    common.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('utilization', parents=[common],
+                                help="Project and idle days per vessel in a date window")
+    query.add_argument('--vessel', action='append',
+                       help="Vessel name, or part of one; repeat for several (default: all vessels)")
+    window = query.add_mutually_exclusive_group()
+    window.add_argument('--quarter', type=quarter_bounds, help="A quarter, e.g. Q3-2025")
+    window.add_argument('--year', type=int, help="A calendar year")
+    window.add_argument('--from', dest='start', type=parse_date,
+                        help="First day, YYYY-MM-DD (default: start of the generated reporting range)")
+    query.add_argument('--to', dest='end', type=parse_date,
+                       help="Last day, YYYY-MM-DD (default: end of the generated reporting range)")
+    query.set_defaults(handler=utilization)
+
+    listing = commands.add_parser('vessels', parents=[common], help="List the vessels in the index")
+    listing.set_defaults(handler=vessels)
+
+    args = parser.parse_args(argv)
+    if args.command == 'utilization' and args.end and (args.quarter or args.year):
+        parser.error("--to cannot be combined with --quarter or --year")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        index = read_query_index(args.index)
+    except FileNotFoundError:
+        raise SystemExit(f"error: {args.index} not found. Run: python generate_csv_files.py")
+    except ValueError as e:
+        raise SystemExit(f"error: {e}")
+    args.handler(args, index)
+
+
+if __name__ == '__main__':
+    main()
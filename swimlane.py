@@ -0,0 +1,142 @@
+"""
+Project x quarter swimlane for the analysis notebook.
+
+The notebook used to walk every project quarter by quarter to find the
+quarters in the data, then compute a project's days in each quarter one
+(project, quarter) pair at a time. Here the quarters of every year the
+projects span come from the period calendar, and all projects are clipped
+against all quarters in one broadcast (interval_engine.clip_to_periods).
+The breakdown, the pivot and the per-vessel days are then read off the
+resulting matrix.
+
+    swimlane = build_swimlane(streamer_df)
+    quarterly_breakdown_df = swimlane_breakdown(streamer_df, swimlane)
+    quarterly_pivot = swimlane_pivot(streamer_df, swimlane)
+    vessel_days_df = vessel_quarter_days(streamer_df, swimlane, ['Q1-2025', 'Q2-2025'])
+"""
+
+import numpy as np
+import pandas as pd
+
+from interval_engine import to_day_numbers, day_numbers_to_timestamps, clip_to_periods, merged_days_by_group
+from period_calendar import build_periods
+
+# Breakdown columns copied from each project's source row; a source column
+# that is missing (e.g. under a different header) gives None, as in the notebook
+BREAKDOWN_SOURCE_COLUMNS = {
+    'Vessel': 'Vessel',
+    'Survey Type': 'Activity',
+    'Avg. Day Rate': 'Day Rate',
+    'Total Cost': 'TGS Cost',
+    'Total Revenue': 'TGS Revenue',
+}
+
+
+def build_swimlane(df):
+    """
+    Days of every project with both dates in every quarter it overlaps.
+
+    Returns a dict with:
+      rows           - positions in df of the projects with both dates
+      starts, ends   - their first and last day, as int64 day numbers
+      quarters       - labels ('Q1-2025') of the quarters at least one
+                       project overlaps, in calendar order
+      quarter_starts,
+      quarter_ends   - first and last day of those quarters
+      days           - int64 matrix of days (inclusive), one row per entry
+                       of rows and one column per quarter
+    """
+    starts, start_ok = to_day_numbers(df['Mobilisation Start'])
+    ends, end_ok = to_day_numbers(df['Demobilisation End'])
+    rows = np.flatnonzero(start_ok & end_ok)
+    if len(rows) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {'rows': rows, 'starts': empty, 'ends': empty, 'quarters': [],
+                'quarter_starts': empty, 'quarter_ends': empty, 'days': np.zeros((0, 0), dtype=np.int64)}
+
+    # Quarters of every year from the first start to the last end
+    bounds = day_numbers_to_timestamps([starts[rows].min(), ends[rows].max()])
+    first_year, last_year = (bounds.astype('datetime64[Y]').astype(int) + 1970).tolist()
+    periods = build_periods('quarter', first_year, max(first_year, last_year))
+    _, _, days = clip_to_periods(starts[rows], ends[rows], periods['starts'], periods['ends'])
+
+    # Keep the quarters some project overlaps
+    touched = np.flatnonzero(days.any(axis=0))
+    return {
+        'rows': rows,
+        'starts': starts[rows],
+        'ends': ends[rows],
+        'quarters': [periods['breakdown_labels'][i] for i in touched],
+        'quarter_starts': periods['starts'][touched],
+        'quarter_ends': periods['ends'][touched],
+        'days': days[:, touched].astype(np.int64),
+    }
+
+
+def swimlane_breakdown(df, swimlane):
+    """
+    Long table with a row per project and quarter it overlaps (Project,
+    Vessel, Survey Type, Quarter, Days in Quarter, Avg. Day Rate, Total Cost,
+    Total Revenue), ordered by project then quarter.
+    """
+    project_idx, quarter_idx = np.nonzero(swimlane['days'])
+    source_rows = swimlane['rows'][project_idx]
+    breakdown = {'Project': df['Survey Name'].to_numpy(dtype=object)[source_rows]}
+    for name, column in BREAKDOWN_SOURCE_COLUMNS.items():
+        if column in df.columns:
+            breakdown[name] = df[column].to_numpy(dtype=object)[source_rows]
+        else:
+            breakdown[name] = None
+    breakdown['Quarter'] = np.array(swimlane['quarters'], dtype=object)[quarter_idx]
+    breakdown['Days in Quarter'] = swimlane['days'][project_idx, quarter_idx]
+    columns = ['Project', 'Vessel', 'Survey Type', 'Quarter', 'Days in Quarter',
+               'Avg. Day Rate', 'Total Cost', 'Total Revenue']
+    return pd.DataFrame(breakdown, columns=columns)
+
+
+def swimlane_pivot(df, swimlane):
+    """
+    Wide swimlane: days per project (rows, summed over projects sharing a
+    Survey Name) and quarter (columns, in calendar order). Projects without
+    a name or without days are left out, like pivot_table on the breakdown.
+    """
+    names = df['Survey Name'].to_numpy(dtype=object)[swimlane['rows']]
+    keep = pd.notna(names) & swimlane['days'].any(axis=1)
+    pivot = pd.DataFrame(swimlane['days'][keep], index=pd.Index(names[keep], name='Project'),
+                         columns=pd.Index(swimlane['quarters'], name='Quarter'))
+    pivot = pivot.groupby(level=0, sort=True).sum()
+    return pivot.loc[:, pivot.any(axis=0)]
+
+
+def vessel_quarter_days(df, swimlane, quarters):
+    """
+    Unique days each vessel worked in each of quarters (labels from
+    swimlane['quarters']), with overlapping projects counted once.
+
+    Returns a frame (Vessel, Quarter, Days) with a row per vessel and quarter
+    in which the vessel has a project: vessels in the order they first appear
+    in the breakdown, then quarters in the order given.
+    """
+    columns = np.array([swimlane['quarters'].index(quarter) for quarter in quarters
+                        if quarter in swimlane['quarters']], dtype=np.int64)
+    if len(columns) == 0:
+        return pd.DataFrame({'Vessel': [], 'Quarter': [], 'Days': np.array([], dtype=np.int64)})
+    project_idx, column_idx = np.nonzero(swimlane['days'][:, columns])
+    vessels = df['Vessel'].to_numpy(dtype=object)[swimlane['rows'][project_idx]]
+    has_vessel = pd.notna(vessels)
+    project_idx, column_idx, vessels = project_idx[has_vessel], column_idx[has_vessel], vessels[has_vessel]
+
+    # Clip each project to the quarter and merge per (vessel, quarter)
+    quarter_idx = columns[column_idx]
+    clip_starts = np.maximum(swimlane['starts'][project_idx], swimlane['quarter_starts'][quarter_idx])
+    clip_ends = np.minimum(swimlane['ends'][project_idx], swimlane['quarter_ends'][quarter_idx])
+    vessel_codes, vessel_names = pd.factorize(vessels)
+    groups = vessel_codes * len(columns) + column_idx
+    days = merged_days_by_group(groups, clip_starts, clip_ends, len(vessel_names) * len(columns))
+
+    present = np.flatnonzero(np.bincount(groups, minlength=len(days)))
+    return pd.DataFrame({
+        'Vessel': np.asarray(vessel_names, dtype=object)[present // len(columns)],
+        'Quarter': np.array(swimlane['quarters'], dtype=object)[columns[present % len(columns)]],
+        'Days': days[present],
+    })
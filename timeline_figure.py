@@ -0,0 +1,172 @@
+"""
+The dashboard's Gantt timeline as a Plotly figure.
+
+Kept out of streamlit_dashboard.py so figure_cache.py can build (and warm)
+the timeline without starting a Streamlit app.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from dashboard_data import gantt_tasks
+from period_calendar import build_periods, period_bounds_as_dates
+
+# Define phase colors
+PHASE_COLORS = {
+    'MC Project Duration (All Activities)': '#006400',         # DARK GREEN for Multi-Client
+    'Proprietary Project Duration (All Activities)': '#00008B', # DARK BLUE for Proprietary
+    'Non-Productive Time': '#D3D3D3'                            # Light gray
+}
+
+
+def build_timeline_figure(index, start_year, end_year, window=None, active_positions=None):
+    """
+    Timeline figure of a vessel index (see dashboard_data.build_vessel_index)
+    for the selected years. With a window (first and last date) and the
+    index positions of the projects active in it, the other projects are
+    dimmed and the window is shaded.
+    """
+    quarter_periods = build_periods('quarter', start_year, end_year)
+    range_start = pd.Timestamp(f'{start_year}-01-01')
+    range_end = pd.Timestamp(f'{end_year}-12-31')
+    vessel_order = index['vessel_order']
+
+    # Create the Gantt chart from the vessel index
+    gantt_df = gantt_tasks(index, range_start, range_end)
+
+    # Filter out any rows with NaT values
+    gantt_df = gantt_df.dropna(subset=['Start', 'Finish'])
+
+    fig = go.Figure()
+
+    # Draw one trace per phase so the figure stays small no matter how many bars there are.
+    # Non-productive time goes first so project bars are always drawn on top of it.
+    timeline_df = gantt_df[gantt_df['Task'].isin(vessel_order)].sort_values('Start', kind='stable')
+    duration_days = (timeline_df['Finish'] - timeline_df['Start']).dt.days
+    survey_lines = np.where(timeline_df['SurveyName'] != '', 'Survey: ' + timeline_df['SurveyName'] + '<br>', '')
+    timeline_customdata = np.column_stack([
+        timeline_df['Resource'],
+        timeline_df['Phase'],
+        survey_lines,
+        timeline_df['Start'].dt.strftime('%Y-%m-%d'),
+        timeline_df['Finish'].dt.strftime('%Y-%m-%d'),
+        duration_days,
+    ])
+    timeline_hovertemplate = (
+        "<b>%{customdata[0]}</b><br>" +
+        "Vessel: %{y}<br>" +
+        "Phase: %{customdata[1]}<br>" +
+        "%{customdata[2]}" +
+        "Start: %{customdata[3]}<br>" +
+        "End: %{customdata[4]}<br>" +
+        "Days: %{customdata[5]}<br>" +
+        "<extra></extra>"
+    )
+
+    for phase in ['Non-Productive Time',
+                  'MC Project Duration (All Activities)',
+                  'Proprietary Project Duration (All Activities)']:
+        in_phase = (timeline_df['Phase'] == phase).to_numpy()
+        if not in_phase.any():
+            continue
+        phase_tasks = timeline_df[in_phase]
+        
+        # Dim the projects outside the active window
+        opacity = 1.0
+        if active_positions is not None and phase != 'Non-Productive Time':
+            opacity = np.where(np.isin(phase_tasks['IndexPosition'], active_positions), 1.0, 0.25)
+        
+        # Bar length is the duration in milliseconds (Plotly's unit for date axes)
+        fig.add_trace(go.Bar(
+            name=phase,
+            x=(phase_tasks['Finish'] - phase_tasks['Start']).dt.total_seconds().to_numpy() * 1000,
+            y=phase_tasks['Task'],
+            orientation='h',
+            base=phase_tasks['Start'],
+            # Show the legend label on project bars only
+            text=phase_tasks['Resource'] if phase != 'Non-Productive Time' else None,
+            textposition='inside',
+            textfont=dict(color='white', size=10),
+            marker=dict(
+                color=PHASE_COLORS.get(phase, '#D3D3D3'),
+                opacity=opacity,
+                line=dict(color='white', width=0.5)
+            ),
+            customdata=timeline_customdata[in_phase],
+            hovertemplate=timeline_hovertemplate,
+            showlegend=False
+        ))
+
+    # Add quarter markers
+    quarter_starts, quarter_ends = period_bounds_as_dates(quarter_periods)
+    quarters = [
+        (q_name, pd.Timestamp(q_start), pd.Timestamp(q_end))
+        for q_name, q_start, q_end in zip(quarter_periods['labels'], quarter_starts, quarter_ends)
+    ]
+
+    # Month ticks; include the year once the range spans more than one year
+    month_ticks = pd.date_range(start=range_start, end=range_end, freq='MS')
+    month_tick_format = '%b' if start_year == end_year else '%b %Y'
+
+    # Update layout
+    fig.update_layout(
+        barmode='stack',
+        height=600,
+        xaxis=dict(
+            title='',
+            type='date',
+            tickformat='%b',  # Show month names
+            tickmode='array',
+            tickvals=month_ticks,
+            ticktext=month_ticks.strftime(month_tick_format),
+            side='top',  # Put x-axis on top
+            showgrid=True,
+            gridcolor='lightgray',
+            range=[range_start, range_end + pd.Timedelta(days=15)]
+        ),
+        yaxis=dict(
+            title='',
+            categoryorder='array',
+            categoryarray=vessel_order[::-1],  # Reverse order to show from top to bottom
+            showgrid=True,
+            gridcolor='lightgray'
+        ),
+        plot_bgcolor='white',
+        showlegend=False,
+        margin=dict(l=150, r=50, t=100, b=50),
+        hovermode='closest'
+    )
+
+    # Add quarter separators as vertical lines
+    for q_name, q_start, q_end in quarters:
+        fig.add_vline(
+            x=q_start.timestamp() * 1000,  # Plotly expects milliseconds for date axes (timestamp() returns seconds)
+            line_width=2,
+            line_dash="dash",
+            line_color="gray",
+            opacity=0.5
+        )
+        
+        # Add quarter labels
+        fig.add_annotation(
+            x=q_start + (q_end - q_start) / 2,
+            y=1.05,
+            text=q_name,
+            showarrow=False,
+            xref='x',
+            yref='paper',
+            font=dict(size=12, color='black', family='Arial Black'),
+            bgcolor='lightyellow',
+            bordercolor='gray',
+            borderwidth=1,
+            borderpad=4
+        )
+
+    # Shade the active window
+    if active_positions is not None:
+        fig.add_vrect(
+            x0=pd.Timestamp(window[0]), x1=pd.Timestamp(window[1]) + pd.Timedelta(days=1),
+            fillcolor='gold', opacity=0.25, line_width=0, layer='below'
+        )
+    return fig
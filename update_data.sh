@@ -1,6 +1,7 @@
 #!/bin/bash
 # Script to update all derived data files after updating the source CSV
-# Usage: ./update_data.sh
+# Usage: ./update_data.sh [--full]
+#   --full  Ignore the manifest and rebuild every output from scratch
 
 set -e  # Exit on error
 
@@ -43,9 +44,25 @@ echo ""
 # Run the generator script
 echo "Regenerating CSV files from source data..."
 echo ""
-python3 generate_csv_files.py
+python3 generate_csv_files.py "$@"
 
 if [ $? -eq 0 ]; then
+    # Regression checks for the vectorized code that produced the files above
+    echo ""
+    if ! python3 check_engines.py; then
+        echo ""
+        echo "❌ ERROR: The engine checks failed - the files above may be wrong!"
+        exit 1
+    fi
+
+    # Build the dashboard's default timeline figure now, so the first visitor
+    # after the update does not wait for it (skipped without the dashboard's packages)
+    if python3 -c "import plotly" 2>/dev/null; then
+        echo ""
+        echo "Warming the dashboard figure cache..."
+        python3 figure_cache.py || echo "⚠️  Could not warm the figure cache; the dashboard will build the figure on first view."
+    fi
+    
     echo ""
     echo "=================================================="
     echo "✅ SUCCESS! All data files have been updated."
@@ -55,6 +72,8 @@ if [ $? -eq 0 ]; then
     echo "  - Enhanced_Streamer_Projects.csv"
     echo "  - Vessel_Quarterly_Pivot_2025.csv"
     echo "  - quarterly_breakdown_data.csv"
+    echo "  - Quarterly_Review_Breakdown.xlsx (unless --no-excel)"
+    echo "  - swg_query_index.bin (for swg_query.py)"
     echo ""
     echo "You can now run the dashboard with:"
     echo "  streamlit run streamlit_dashboard.py"
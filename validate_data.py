@@ -2,92 +2,261 @@
 """
 Validation script to ensure data consistency across all files.
 This script verifies that all derived files are properly synchronized with the source file.
+
+Usage:
+    python validate_data.py           # load every file and check columns and row counts
+    python validate_data.py --fast    # headers and row counts only, without parsing the files
+    python validate_data.py --deep    # headers and row counts, then recompute vessel-quarter days
+                                      # from the source and check the pivot and breakdown against them
 """
 
+import argparse
+import csv
+import os
 import pandas as pd
+import numpy as np
 import sys
 from datetime import datetime
 
-def validate_data_flow():
+from source_schema import SOURCE_FILE, SOURCE_ENCODING, load_source, format_coercion_report, normalize_header
+from period_calendar import build_periods
+from interval_engine import to_day_numbers
+
+ENHANCED_FILE = "Enhanced_Streamer_Projects.csv"
+PIVOT_FILE = "Vessel_Quarterly_Pivot_2025.csv"
+BREAKDOWN_FILE = "quarterly_breakdown_data.csv"
+
+# Mismatching cells listed per deep check before the rest are summarised
+MAX_REPORTED_MISMATCHES = 5
+
+def read_header(path):
+    """Column names from the first line of a CSV, without reading the rest."""
+    with open(path, newline='', encoding=SOURCE_ENCODING) as f:
+        return normalize_header(next(csv.reader(f), []))
+
+def count_rows(path, block_size=1 << 20):
+    """
+    Count the data rows of a CSV (non-blank lines after the header) by
+    scanning raw bytes. Quoted fields spanning several lines are counted once
+    per line, which none of our files contain.
+    """
+    n_lines = n_blank = 0
+    previous = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            data = np.frombuffer(previous + block, dtype=np.uint8)
+            newline = data == ord('\n')
+            n_lines += int(newline[1:].sum())
+            # A newline followed by another line break is an empty line,
+            # which pandas skips, so leave it out of the count
+            n_blank += int((newline[:-1] & ((data[1:] == ord('\n')) | (data[1:] == ord('\r')))).sum())
+            previous = block[-1:]
+    if previous != b'\n':
+        n_lines += 1    # last line without a trailing newline
+    return max(n_lines - n_blank - 1, 0)
+
+def table_shape(path, fast):
+    """(columns, number of rows) of a CSV, parsed with pandas unless fast is set."""
+    if fast:
+        return read_header(path), count_rows(path)
+    df = pd.read_csv(path)
+    return list(df.columns), len(df)
+
+def source_vessel_period_days(periods):
+    """
+    Recompute merged days per vessel and period straight from the source.
+
+    Independent of the generator's interval engine: every vessel gets a day
+    bitmap over the reporting range, filled from a difference array of its
+    projects, so overlapping projects are counted once. Returns (vessel
+    names, days array of shape (n_vessels, n_periods), coercion report).
+    """
+    source_df, coercion_report = load_source(SOURCE_FILE, usecols=['Vessel', 'Mobilisation Start', 'Demobilisation End'])
+    starts, has_start = to_day_numbers(source_df['Mobilisation Start'])
+    ends, has_end = to_day_numbers(source_df['Demobilisation End'])
+
+    # Ongoing projects run to the end of the last year, as in the generator
+    year_end = np.datetime64(f"{periods['end_year']}-12-31", 'D').astype(np.int64)
+    ends = np.where(has_end, ends, year_end)
+
+    first_day = periods['starts'][0]
+    n_days = periods['ends'][-1] - first_day + 1
+    clip_starts = np.maximum(starts, first_day) - first_day
+    clip_ends = np.minimum(ends, first_day + n_days - 1) - first_day
+    keep = has_start & (clip_starts <= clip_ends)
+
+    # Rows without a vessel are grouped under '', like the pivot's blank vessel
+    vessel_keys = source_df['Vessel'].astype(str).where(source_df['Vessel'].notna(), '')
+    codes, vessel_names = pd.factorize(vessel_keys[keep].to_numpy())
+    n_vessels = len(vessel_names)
+
+    # +1 at each project start, -1 the day after it ends; a running sum > 0 means busy
+    width = n_days + 1
+    diff = (np.bincount(codes * width + clip_starts[keep], minlength=n_vessels * width)
+            - np.bincount(codes * width + clip_ends[keep] + 1, minlength=n_vessels * width))
+    busy = np.cumsum(diff.reshape(n_vessels, width), axis=1)[:, :n_days] > 0
+    period_offsets = periods['starts'] - first_day
+    days = np.add.reduceat(busy, period_offsets, axis=1) if n_vessels else np.zeros((0, len(period_offsets)))
+    return pd.Index(vessel_names), days.astype(np.int64), coercion_report
+
+def compare_days(expected, actual, vessel_names, periods, what):
+    """Describe the vessel-period cells where actual differs from expected."""
+    bad_vessels, bad_periods = np.nonzero(expected != actual)
+    messages = [f"{what}: {vessel_names[v] or '(no vessel)'} {periods['labels'][p]} has "
+                f"{actual[v, p]} days, source gives {expected[v, p]}"
+                for v, p in zip(bad_vessels[:MAX_REPORTED_MISMATCHES], bad_periods[:MAX_REPORTED_MISMATCHES])]
+    if len(bad_vessels) > MAX_REPORTED_MISMATCHES:
+        messages.append(f"{what}: ... and {len(bad_vessels) - MAX_REPORTED_MISMATCHES} more mismatching cells")
+    return messages
+
+def deep_check(periods):
+    """
+    Recompute vessel-period days from the source and compare them with the
+    pivot's Days columns and the per vessel-period sums of the breakdown.
+
+    Returns (error messages, total vessel-days recomputed, coercion report
+    of the source columns used).
+    """
+    errors = []
+    vessel_names, expected, coercion_report = source_vessel_period_days(periods)
+    n_vessels, n_periods = expected.shape
+
+    # Pivot: one row per vessel, one Days column per period
+    days_cols = [f'{label} Days' for label in periods['column_labels']]
+    pivot_df = pd.read_csv(PIVOT_FILE, usecols=['Vessel'] + days_cols, dtype={'Vessel': str}, keep_default_na=False)
+    pivot_rows = vessel_names.get_indexer(pivot_df['Vessel'])
+    unknown = pivot_rows < 0
+    extra_days = pivot_df.loc[unknown, days_cols].to_numpy().sum(axis=1) > 0
+    for vessel in pivot_df.loc[unknown, 'Vessel'][extra_days]:
+        errors.append(f"Pivot: vessel '{vessel}' has days but no projects in {periods['range_label']} in the source")
+    pivot_days = np.zeros((n_vessels, n_periods), dtype=np.int64)
+    pivot_days[pivot_rows[~unknown]] = pivot_df.loc[~unknown, days_cols].to_numpy()
+    missing = np.setdiff1d(np.flatnonzero(expected.sum(axis=1) > 0), pivot_rows[~unknown])
+    for v in missing[:MAX_REPORTED_MISMATCHES]:
+        errors.append(f"Pivot: vessel '{vessel_names[v]}' is missing")
+    errors += compare_days(expected, pivot_days, vessel_names, periods, "Pivot")
+
+    # Breakdown: project durations per vessel and period must add up to the merged days
+    column = periods['breakdown_column']
+    breakdown_df = pd.read_csv(BREAKDOWN_FILE, usecols=['Vessel', column, 'Duration'],
+                               dtype={'Vessel': str, column: str}, keep_default_na=False)
+    rows = vessel_names.get_indexer(breakdown_df['Vessel'])
+    cols = pd.Index(periods['breakdown_labels']).get_indexer(breakdown_df[column])
+    known = (rows >= 0) & (cols >= 0)
+    if not known.all():
+        errors.append(f"Breakdown: {int((~known).sum())} rows have a vessel or {column.lower()} "
+                      f"with no source projects in {periods['range_label']}")
+    breakdown_days = np.bincount(rows[known] * n_periods + cols[known],
+                                 weights=breakdown_df['Duration'].to_numpy()[known],
+                                 minlength=n_vessels * n_periods).reshape(n_vessels, n_periods)
+    # Durations split with --attribution equal carry two decimals, so the sums are rounded
+    errors += compare_days(expected, np.rint(breakdown_days).astype(np.int64), vessel_names, periods, "Breakdown")
+    return errors, int(expected.sum()), coercion_report
+
+def validate_data_flow(fast=False, deep=False):
     """Validate that all derived files are consistent with the source."""
-    
+
     print("=" * 60)
-    print("Data Flow Validation")
+    print("Data Flow Validation" + (" (fast)" if fast else " (deep)" if deep else ""))
     print("=" * 60)
     print()
-    
+
     errors = []
     warnings = []
-    
+
+    # Deep mode parses what it cross-checks itself, so the structural checks
+    # only need headers and row counts
+    shape_only = fast or deep
+
     # Check 1: Source file exists
     print("1. Checking source file...")
     try:
-        source_df = pd.read_csv("Streamer Projects - SWG - AI.csv")
-        print(f"   ✓ Source file loaded: {len(source_df)} projects")
+        if shape_only:
+            source_columns, n_source_rows = table_shape(SOURCE_FILE, shape_only)
+            print(f"   ✓ Source file found: {n_source_rows} projects")
+        else:
+            source_df, coercion_report = load_source(SOURCE_FILE)
+            n_source_rows = len(source_df)
+            print(f"   ✓ Source file loaded: {n_source_rows} projects")
+
+            # Cells that did not match the declared schema
+            report_lines = format_coercion_report(coercion_report)
+            if coercion_report['coerced']:
+                warnings.append(f"{len(coercion_report['coerced'])} source cells could not be parsed "
+                                f"and are treated as missing")
+            if report_lines:
+                print("   ⚠️  Some source cells did not match the expected schema:")
+                for line in report_lines:
+                    print(f"      {line}")
+            else:
+                print("   ✓ All date and numeric cells match the expected format")
     except FileNotFoundError:
-        errors.append("Source file 'Streamer Projects - SWG - AI.csv' not found")
+        errors.append(f"Source file '{SOURCE_FILE}' not found")
         print("   ❌ Source file not found!")
         return errors, warnings
-    
+
     # Check 2: Enhanced file exists and has same number of rows
-    print("2. Checking Enhanced_Streamer_Projects.csv...")
+    print(f"2. Checking {ENHANCED_FILE}...")
     try:
-        enhanced_df = pd.read_csv("Enhanced_Streamer_Projects.csv")
-        if len(enhanced_df) != len(source_df):
-            errors.append(f"Enhanced file has {len(enhanced_df)} rows, source has {len(source_df)}")
+        enhanced_columns, n_enhanced_rows = table_shape(ENHANCED_FILE, shape_only)
+        if n_enhanced_rows != n_source_rows:
+            errors.append(f"Enhanced file has {n_enhanced_rows} rows, source has {n_source_rows}")
             print(f"   ❌ Row count mismatch!")
         else:
-            print(f"   ✓ Enhanced file loaded: {len(enhanced_df)} projects")
-            
+            print(f"   ✓ Enhanced file loaded: {n_enhanced_rows} projects")
+
         # Check for calculated columns
-        required_cols = ['Mobilization (days)', 'Deployment (days)', 'Production (days)', 
+        required_cols = ['Mobilization (days)', 'Deployment (days)', 'Production (days)',
                         'Recovery (days)', 'Demobilization (days)', 'Project Duration']
-        missing_cols = [col for col in required_cols if col not in enhanced_df.columns]
+        missing_cols = [col for col in required_cols if col not in enhanced_columns]
         if missing_cols:
             errors.append(f"Enhanced file missing columns: {missing_cols}")
             print(f"   ❌ Missing calculated columns!")
         else:
             print(f"   ✓ All calculated columns present")
     except FileNotFoundError:
-        errors.append("Enhanced_Streamer_Projects.csv not found")
+        errors.append(f"{ENHANCED_FILE} not found")
         print("   ❌ Enhanced file not found!")
-    
+
     # Check 3: Vessel Quarterly Pivot exists
-    print("3. Checking Vessel_Quarterly_Pivot_2025.csv...")
+    print(f"3. Checking {PIVOT_FILE}...")
     try:
-        pivot_df = pd.read_csv("Vessel_Quarterly_Pivot_2025.csv")
-        print(f"   ✓ Pivot file loaded: {len(pivot_df)} vessels")
-        
+        pivot_columns, n_pivot_rows = table_shape(PIVOT_FILE, shape_only)
+        print(f"   ✓ Pivot file loaded: {n_pivot_rows} vessels")
+
         # Check for required columns
         required_q_cols = ['Q1 Days', 'Q2 Days', 'Q3 Days', 'Q4 Days']
-        missing_q_cols = [col for col in required_q_cols if col not in pivot_df.columns]
+        missing_q_cols = [col for col in required_q_cols if col not in pivot_columns]
         if missing_q_cols:
             errors.append(f"Pivot file missing columns: {missing_q_cols}")
             print(f"   ❌ Missing quarter columns!")
         else:
             print(f"   ✓ All quarter columns present")
     except FileNotFoundError:
-        errors.append("Vessel_Quarterly_Pivot_2025.csv not found")
+        errors.append(f"{PIVOT_FILE} not found")
         print("   ❌ Pivot file not found!")
-    
+
     # Check 4: Quarterly breakdown exists
-    print("4. Checking quarterly_breakdown_data.csv...")
+    print(f"4. Checking {BREAKDOWN_FILE}...")
     try:
-        quarterly_df = pd.read_csv("quarterly_breakdown_data.csv")
-        print(f"   ✓ Quarterly breakdown loaded: {len(quarterly_df)} entries")
-        
+        breakdown_columns, n_breakdown_rows = table_shape(BREAKDOWN_FILE, shape_only)
+        print(f"   ✓ Quarterly breakdown loaded: {n_breakdown_rows} entries")
+
         # Check for required columns
         required_qb_cols = ['Project', 'Vessel', 'Survey Type', 'Quarter', 'Duration']
-        missing_qb_cols = [col for col in required_qb_cols if col not in quarterly_df.columns]
+        missing_qb_cols = [col for col in required_qb_cols if col not in breakdown_columns]
         if missing_qb_cols:
             errors.append(f"Quarterly breakdown missing columns: {missing_qb_cols}")
             print(f"   ❌ Missing required columns!")
         else:
             print(f"   ✓ All required columns present")
     except FileNotFoundError:
-        errors.append("quarterly_breakdown_data.csv not found")
+        errors.append(f"{BREAKDOWN_FILE} not found")
         print("   ❌ Quarterly breakdown file not found!")
-    
+
     # Check 5: Dated files exist (today's date)
     print("5. Checking dated files...")
     today = datetime.now().strftime('%Y%m%d')
@@ -96,24 +265,41 @@ def validate_data_flow():
         f"Vessel_Quarterly_Pivot_2025_{today}.csv",
         f"quarterly_breakdown_data_{today}.csv"
     ]
-    
-    dated_found = 0
-    for dated_file in dated_files:
-        try:
-            pd.read_csv(dated_file)
-            dated_found += 1
-        except FileNotFoundError:
-            pass
-    
+
+    # Existence is enough here; their content is checked through the undated copies
+    dated_found = sum(os.path.exists(dated_file) for dated_file in dated_files)
+
     if dated_found == 0:
         warnings.append(f"No dated files found for {today}. Files may be from a previous run.")
         print(f"   ⚠️  No dated files found for today ({today})")
     else:
         print(f"   ✓ Found {dated_found}/3 dated files for {today}")
-    
+
+    # Check 6: Numbers agree with the source
+    if deep and not errors:
+        print("6. Recomputing vessel-quarter days from the source...")
+        periods = build_periods('quarter', 2025)
+        try:
+            deep_errors, total_days, coercion_report = deep_check(periods)
+            for line in format_coercion_report(coercion_report):
+                print(f"   ⚠️  {line}")
+            if coercion_report['coerced']:
+                warnings.append(f"{len(coercion_report['coerced'])} source cells could not be parsed "
+                                f"and are treated as missing")
+        except (ValueError, TypeError) as e:
+            # e.g. a Days or Duration column that is missing or not numeric
+            deep_errors, total_days = [f"Could not cross-check the derived files: {e}"], 0
+        if deep_errors:
+            errors.extend(deep_errors)
+            print(f"   ❌ {len(deep_errors)} mismatch(es) between the source and the derived files!")
+        else:
+            print(f"   ✓ Pivot days and breakdown sums match the source ({total_days} vessel-days)")
+    elif deep:
+        print("6. Skipping the source cross-check until the errors above are fixed")
+
     print()
     print("=" * 60)
-    
+
     # Summary
     if errors:
         print("❌ VALIDATION FAILED")
@@ -144,6 +330,17 @@ def validate_data_flow():
         print("All data files are properly synchronized!")
         return True
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the derived files match the source file.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--fast', action='store_true',
+                      help="Only check headers and row counts, without parsing the files")
+    mode.add_argument('--deep', action='store_true',
+                      help="Check headers and row counts, then recompute vessel-quarter days from "
+                           "the source and compare them with the pivot and the quarterly breakdown")
+    return parser.parse_args(argv)
+
 if __name__ == '__main__':
-    success = validate_data_flow()
+    args = parse_args()
+    success = validate_data_flow(fast=args.fast, deep=args.deep)
     sys.exit(0 if success else 1)